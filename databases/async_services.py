@@ -0,0 +1,64 @@
+"""Awaitbare Fassade für services.py zur Verwendung in async-Endpunkten.
+
+Die Services sind synchron (Pony), ein direkter Aufruf blockiert den Event-Loop für die Dauer der DB-Abfragen.
+Über diese Fassade laufen sie im Thread-Pool von anyio, dessen Größe an db_max_connections gebunden ist
+(database.configure_connection_limit). Aufruf wie bei services: await async_services.Person.get_user_by_id(...)
+Jeder Aufruf läuft in einer eigenen db_session und Transaktion; mehrere Aufrufe in einem Endpunkt sehen deshalb
+nicht zwingend denselben Stand der Daten (anders als synchrone GET-Endpunkte, utilities/request_session.py)."""
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from typing import AsyncIterator, Callable, Iterator, TypeVar
+
+from anyio import to_thread
+
+from databases import services
+
+T = TypeVar('T')
+
+
+async def run_sync(func: Callable[..., T], *args, **kwargs) -> T:
+    """Führt eine beliebige blockierende Funktion (z.B. Scheduler-Aufrufe mit DB-Zugriff) im Thread-Pool aus."""
+    return await to_thread.run_sync(functools.partial(func, *args, **kwargs))
+
+
+async def iterate_in_thread(iterator_factory: Callable[[], Iterator[T]]) -> AsyncIterator[T]:
+    """Durchläuft einen blockierenden Generator (z.B. mit eigener db_session) vollständig in einem eigenen Thread,
+    ein Element je await. Starlette würde einen synchronen Generator in wechselnden Threads des Thread-Pools
+    fortsetzen, Pony bindet die db_session aber an den Thread. Bricht der Client ab, wird der Generator im selben
+    Thread geschlossen."""
+    loop = asyncio.get_running_loop()
+    executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='iterate')
+    done = object()
+    iterator = None
+    try:
+        iterator = await loop.run_in_executor(executor, lambda: iter(iterator_factory()))
+        while (item := await loop.run_in_executor(executor, next, iterator, done)) is not done:
+            yield item
+    finally:
+        if iterator is not None and hasattr(iterator, 'close'):
+            await loop.run_in_executor(executor, iterator.close)
+        executor.shutdown(wait=False)
+
+
+class _AsyncService:
+    def __init__(self, service: type):
+        self._service = service
+
+    def __getattr__(self, name: str):
+        func = getattr(self._service, name)
+
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            return await run_sync(func, *args, **kwargs)
+
+        setattr(self, name, wrapper)
+        return wrapper
+
+
+Person = _AsyncService(services.Person)
+Team = _AsyncService(services.Team)
+Project = _AsyncService(services.Project)
+AvailDay = _AsyncService(services.AvailDay)
+PlanPeriod = _AsyncService(services.PlanPeriod)
+Availables = _AsyncService(services.Availables)
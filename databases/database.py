@@ -1,21 +1,52 @@
 from enum import Enum
 
+from anyio import to_thread
 from pony.orm import Database, sql_debug
 
 import settings
-from databases import models
+from databases import models, migrations
 from .enum_converter import EnumConverter
 
 
 # zum Deployen müssen server_remote_access, local und from_outside False sein
 # zum lokalen Testen mit lokaler Datenbank muss local True sein, frm_outside und server_remote_access False sein
-server_remote_access = False
-local = False  # True: sqlite-database, False: postgresql-database
-from_outside = False  # False: calling database from same API
+# (Einstellungen db_server_remote_access, db_local, db_from_outside)
+server_remote_access = settings.settings.db_server_remote_access
+local = settings.settings.db_local  # True: sqlite-database, False: postgresql-database
+from_outside = settings.settings.db_from_outside  # False: calling database from same API
 
 # sql_debug(True)
 
 
+def postgres_connection_options() -> dict:
+    """Zusätzliche Verbindungsparameter für psycopg2 aus den Settings."""
+    s = settings.settings
+    options = {'connect_timeout': s.db_connect_timeout_seconds}
+    if s.db_statement_timeout_ms:
+        options['options'] = f'-c statement_timeout={s.db_statement_timeout_ms}'
+    if s.db_keepalives_idle_seconds:
+        options |= {'keepalives': 1, 'keepalives_idle': s.db_keepalives_idle_seconds,
+                    'keepalives_interval': s.db_keepalives_interval_seconds,
+                    'keepalives_count': s.db_keepalives_count}
+    return options
+
+
+def configure_connection_limit():
+    """Pony hält eine Verbindung pro Thread. Die synchronen Endpunkte laufen im Thread-Pool von anyio, dessen
+    Größe damit die Zahl der Verbindungen aus Requests begrenzt (dazu kommen Mail-Worker und Scheduler).
+    Muss im Event-Loop aufgerufen werden."""
+    to_thread.current_default_thread_limiter().total_tokens = settings.settings.db_max_connections
+
+
+def pool_metrics() -> dict[str, int]:
+    """Auslastung der Verbindungen aus Requests. Muss im Event-Loop aufgerufen werden."""
+    limiter = to_thread.current_default_thread_limiter()
+    statistics = limiter.statistics()
+    return {'max_connections': int(limiter.total_tokens),
+            'connections_in_use': statistics.borrowed_tokens,
+            'requests_waiting': statistics.tasks_waiting}
+
+
 def generate_db_mappings(db: Database, file: str):
 
     if not local:
@@ -26,7 +57,8 @@ def generate_db_mappings(db: Database, file: str):
         else:
             host = settings.settings.host_sql
         db.bind(provider=settings.settings.provider_sql, user=settings.settings.user_sql,
-                password=settings.settings.password_sql, host=host, database=settings.settings.database_sql)
+                password=settings.settings.password_sql, host=host, database=settings.settings.database_sql,
+                **postgres_connection_options())
         ##########################################################################################################
     else:
         provider = settings.settings.provider
@@ -36,6 +68,7 @@ def generate_db_mappings(db: Database, file: str):
     # Register the type converter with the database
     db.provider.converter_classes.append((Enum, EnumConverter))
 
+    migrations.run(db)
     db.generate_mapping(create_tables=True)
 
 
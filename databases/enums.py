@@ -14,3 +14,10 @@ class AuthorizationTypes(Enum):
     dispatcher = 'dispatcher'
     actor = 'actor'
     google_calendar = 'google_calendar'
+
+
+class MailStatus(Enum):
+    pending = 'pending'
+    sending = 'sending'
+    sent = 'sent'
+    failed = 'failed'
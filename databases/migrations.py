@@ -0,0 +1,178 @@
+"""Versionierte Schema-Migrationen für SQLite und PostgreSQL.
+
+Pony legt mit generate_mapping(create_tables=True) nur fehlende Tabellen an, aber keine neuen Spalten oder
+Indizes in vorhandenen Tabellen. Die Migrationen laufen nach db.bind() und vor db.generate_mapping(), die
+angewendeten Versionen stehen in der Tabelle schema_migrations. Jede Migration prüft selbst, ob ihre Tabellen
+schon existieren: In einer neuen Datenbank legt generate_mapping() Spalten und Indizes (aus den composite_index-
+und index-Angaben in models.py) an, die Migration wird dann nur als angewendet eingetragen.
+
+Neue Migrationen werden mit einer fortlaufenden Nummer an MIGRATIONS angehängt."""
+import datetime
+from typing import Callable
+
+from pony.orm import Database, db_session
+
+from databases.models import normalize_email
+
+VERSION_TABLE = 'schema_migrations'
+
+
+def _quote(db: Database, name: str) -> str:
+    return db.provider.quote_name(db.provider.normalize_name(name))
+
+
+def _table_exists(db: Database, table: str) -> bool:
+    table = db.provider.normalize_name(table)
+    if db.provider.dialect == 'PostgreSQL':
+        return bool(db.select('SELECT 1 FROM information_schema.tables '
+                              'WHERE table_schema = current_schema() AND table_name = $table'))
+    return bool(db.select("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = $table"))
+
+
+def _column_exists(db: Database, table: str, column: str) -> bool:
+    table, column = db.provider.normalize_name(table), db.provider.normalize_name(column)
+    if db.provider.dialect == 'PostgreSQL':
+        return bool(db.select('SELECT 1 FROM information_schema.columns WHERE table_schema = current_schema() '
+                              'AND table_name = $table AND column_name = $column'))
+    return any(row[1] == column for row in db.execute(f'PRAGMA table_info({_quote(db, table)})').fetchall())
+
+
+def _create_index(db: Database, table: str, columns: list[str]):
+    """Gleicher Name wie bei Pony (idx_<tabelle>__<spalten>), damit neue und migrierte Datenbanken übereinstimmen."""
+    name = f'idx_{table.lower()}__{"_".join(columns).lower()}'
+    db.execute(f'CREATE INDEX IF NOT EXISTS {_quote(db, name)} ON {_quote(db, table)} '
+               f'({", ".join(_quote(db, c) for c in columns)})')
+
+
+def add_person_email_normalized(db: Database):
+    """Spalte Person.email_normalized anlegen und mit models.normalize_email() befüllen (Login-Lookup über den
+    Unique-Index). Befüllt wird in Python, weil lower() unter SQLite nur ASCII umwandelt. Adressen, die sich nur in
+    Groß-/Kleinschreibung unterscheiden, bekommen den Wert nur bei der zuletzt geänderten Person, die übrigen
+    behalten NULL und werden ausgegeben; sie müssen von Hand bereinigt werden."""
+    if not _table_exists(db, 'Person') or _column_exists(db, 'Person', 'email_normalized'):
+        return
+    table, column = _quote(db, 'Person'), _quote(db, 'email_normalized')
+    id_, email, last_modified = (_quote(db, c) for c in ('id', 'email', 'last_modified'))
+    db.execute(f'ALTER TABLE {table} ADD COLUMN {column} VARCHAR(50)')
+    owners: dict[str, str] = {}
+    for person_id, address, _ in db.select(f'SELECT {id_}, {email}, {last_modified} FROM {table} '
+                                           f'ORDER BY {last_modified} DESC'):
+        normalized = normalize_email(address)
+        if normalized in owners:
+            print(f'Migration add_person_email_normalized: {address} ist doppelt (wie {owners[normalized]}), '
+                  f'Login über diese Adresse nur für die zuletzt geänderte Person', flush=True)
+            continue
+        owners[normalized] = address
+        db.execute(f'UPDATE {table} SET {column} = $normalized WHERE {id_} = $person_id')
+    db.execute(f'CREATE UNIQUE INDEX {_quote(db, "unq_person__email_normalized")} ON {table} ({column})')
+
+
+def add_hot_path_indexes(db: Database):
+    """Indizes für die häufigen Filter in services.py (AvailDays einer Person/Planperiode, offene Planperioden
+    eines Teams, Planperiode zu einem Datum)."""
+    for table, columns in (('AvailDay', ['day']),
+                           ('AvailDay', ['availables', 'day']),  # in Migration 4 durch Unique-Index ersetzt
+                           ('Availables', ['person', 'plan_period']),  # in Migration 3 durch Unique-Index ersetzt
+                           ('PlanPeriod', ['team', 'closed']),
+                           ('PlanPeriod', ['team', 'start', 'end'])):
+        if _table_exists(db, table):
+            _create_index(db, table, columns)
+
+
+def make_availables_unique(db: Database):
+    """Unique-Key (person, plan_period) für Availables, Voraussetzung für den Upsert in services.py.
+    Vorhandene Duplikate werden zusammengeführt: Die AvailDays wandern zum zuletzt geänderten Availables,
+    die übrigen werden gelöscht."""
+    if not _table_exists(db, 'Availables'):
+        return
+    availables, avail_day = _quote(db, 'Availables'), _quote(db, 'AvailDay')
+    id_, person, plan_period, last_modified, availables_col = (
+        _quote(db, c) for c in ('id', 'person', 'plan_period', 'last_modified', 'availables'))
+    duplicates = db.select(f'SELECT {person}, {plan_period} FROM {availables} '
+                           f'GROUP BY {person}, {plan_period} HAVING COUNT(*) > 1')
+    for person_id, plan_period_id in duplicates:
+        keep, *remove = db.select(f'SELECT {id_} FROM {availables} '
+                                  f'WHERE {person} = $person_id AND {plan_period} = $plan_period_id '
+                                  f'ORDER BY {last_modified} DESC')
+        for availables_id in remove:
+            db.execute(f'UPDATE {avail_day} SET {availables_col} = $keep WHERE {availables_col} = $availables_id')
+            db.execute(f'DELETE FROM {availables} WHERE {id_} = $availables_id')
+    db.execute(f'DROP INDEX IF EXISTS {_quote(db, "idx_availables__person_plan_period")}')
+    db.execute(f'CREATE UNIQUE INDEX IF NOT EXISTS {_quote(db, "unq_availables__person_plan_period")} '
+               f'ON {availables} ({person}, {plan_period})')
+
+
+def make_avail_days_unique(db: Database):
+    """Unique-Key (availables, day, time_of_day) für AvailDay, damit das Setzen einer Tageszeit in actors_new
+    idempotent ist (INSERT ... ON CONFLICT DO NOTHING). Von doppelten Einträgen bleibt der zuletzt geänderte
+    erhalten. Der Unique-Index ersetzt den Index (availables, day) aus Migration 2."""
+    if not _table_exists(db, 'AvailDay'):
+        return
+    avail_day = _quote(db, 'AvailDay')
+    id_, availables, day, time_of_day, last_modified = (
+        _quote(db, c) for c in ('id', 'availables', 'day', 'time_of_day', 'last_modified'))
+    duplicates = db.select(f'SELECT {availables}, {day}, {time_of_day} FROM {avail_day} '
+                           f'GROUP BY {availables}, {day}, {time_of_day} HAVING COUNT(*) > 1')
+    for availables_id, day_value, time_of_day_value in duplicates:
+        keep, *remove = db.select(f'SELECT {id_} FROM {avail_day} WHERE {availables} = $availables_id '
+                                  f'AND {day} = $day_value AND {time_of_day} = $time_of_day_value '
+                                  f'ORDER BY {last_modified} DESC')
+        for avail_day_id in remove:
+            db.execute(f'DELETE FROM {avail_day} WHERE {id_} = $avail_day_id')
+    db.execute(f'DROP INDEX IF EXISTS {_quote(db, "idx_availday__availables_day")}')
+    db.execute(f'CREATE UNIQUE INDEX IF NOT EXISTS {_quote(db, "unq_availday__availables_day_time_of_day")} '
+               f'ON {avail_day} ({availables}, {day}, {time_of_day})')
+
+
+def add_plan_period_remainder(db: Database):
+    """Spalte PlanPeriod.remainder anlegen. Bisher hatte jede Planperiode mit Remainder einen eigenen
+    Scheduler-Job (Job-Id = Id der Planperiode), jetzt verschickt utilities/reminders.py die Remainder aller
+    fälligen Planperioden gemeinsam. Die Planperioden der noch ausstehenden Jobs bekommen remainder = TRUE,
+    die Jobs werden gelöscht."""
+    if not _table_exists(db, 'PlanPeriod') or _column_exists(db, 'PlanPeriod', 'remainder'):
+        return
+    plan_period, id_, remainder = _quote(db, 'PlanPeriod'), _quote(db, 'id'), _quote(db, 'remainder')
+    db.execute(f'ALTER TABLE {plan_period} ADD COLUMN {remainder} BOOLEAN NOT NULL DEFAULT FALSE')
+    for table, column in (('SchedulerJob', 'plan_period_id'), ('APSchedulerJob', 'plan_period')):
+        if not _table_exists(db, table):
+            continue
+        table, column = _quote(db, table), _quote(db, column)
+        db.execute(f'UPDATE {plan_period} SET {remainder} = TRUE '
+                   f'WHERE {id_} IN (SELECT {column} FROM {table} WHERE {column} IS NOT NULL)')
+        db.execute(f'DELETE FROM {table} WHERE {column} IS NOT NULL')
+
+
+def drop_legacy_apscheduler_job(db: Database):
+    """Tabelle APSchedulerJob (gepickelte Jobs je Planperiode) entfernen. Migration 5 hat ihre Zeilen bereits
+    gelöscht, die Jobs liegen im PonyJobStore (SchedulerJob)."""
+    if _table_exists(db, 'APSchedulerJob'):
+        db.execute(f'DROP TABLE {_quote(db, "APSchedulerJob")}')
+
+
+MIGRATIONS: list[tuple[int, Callable[[Database], None]]] = [
+    (1, add_person_email_normalized),
+    (2, add_hot_path_indexes),
+    (3, make_availables_unique),
+    (4, make_avail_days_unique),
+    (5, add_plan_period_remainder),
+    (6, drop_legacy_apscheduler_job),
+]
+
+
+def run(db: Database):
+    """Wendet alle noch fehlenden Migrationen in einer Transaktion an. Unter PostgreSQL serialisiert ein
+    Advisory-Lock parallel startende Prozesse, SQLite sperrt die Datenbank beim ersten Schreibzugriff."""
+    with db_session:
+        if db.provider.dialect == 'PostgreSQL':
+            db.execute(f"SELECT pg_advisory_xact_lock(hashtext('{VERSION_TABLE}'))")
+        version_table = _quote(db, VERSION_TABLE)
+        db.execute(f'CREATE TABLE IF NOT EXISTS {version_table} '
+                   f'(version INTEGER PRIMARY KEY, name VARCHAR(100) NOT NULL, applied_at TIMESTAMP NOT NULL)')
+        applied = set(db.select(f'SELECT version FROM {version_table}'))
+        for version, migration in MIGRATIONS:
+            if version in applied:
+                continue
+            migration(db)
+            name, applied_at = migration.__name__, datetime.datetime.utcnow()
+            db.execute(f'INSERT INTO {version_table} (version, name, applied_at) VALUES ($version, $name, $applied_at)')
+            print(f'Migration {version} angewendet: {name}', flush=True)
@@ -1,9 +1,10 @@
 from datetime import date
 from datetime import datetime
 from uuid import UUID
-from pony.orm import Database, PrimaryKey, Required, Set, Optional, composite_key, IntegrityError, Json
+from pony.orm import Database, PrimaryKey, Required, Set, Optional, composite_key, IntegrityError, Json, LongStr, \
+    composite_index
 
-from databases.enums import TimeOfDay
+from databases.enums import TimeOfDay, MailStatus
 
 
 db_actors = Database()
@@ -13,6 +14,10 @@ class CustomError(Exception):
     pass
 
 
+def normalize_email(email: str) -> str:
+    return email.strip().lower()
+
+
 class Project(db_actors.Entity):
     id = PrimaryKey(UUID, auto=True)
     name = Required(str, 50, unique=True)
@@ -36,6 +41,8 @@ class Person(db_actors.Entity):
     l_name = Required(str, 50)
     artist_name = Optional(str, 50)
     email = Required(str, 50, unique=True)
+    # Kleingeschriebene E-Mail für den Login; wird in before_insert/before_update gesetzt
+    email_normalized = Optional(str, 50, unique=True, nullable=True)
     username = Required(str, 50, unique=True)
     password = Required(str)
     created_at = Required(date, default=lambda: date.today())
@@ -48,6 +55,9 @@ class Person(db_actors.Entity):
 
     composite_key(f_name, l_name, project)
 
+    def before_insert(self):
+        self.email_normalized = normalize_email(self.email)
+
     def before_update(self):
         """Wenn sich der Wert von team_of_actor geändert hat, werden die aktuellen availables-Eiträge
         der Person gelöscht. die verbundenen avail_day-Einträge werden dann automatisch gelöscht."""
@@ -57,6 +67,7 @@ class Person(db_actors.Entity):
             for availables in self.availabless:
                 if not availables.plan_period.closed:
                     availables.delete()
+        self.email_normalized = normalize_email(self.email)
         self.last_modified = datetime.utcnow()
 
 
@@ -92,6 +103,8 @@ class Availables(db_actors.Entity):
     person = Required(Person)
     avail_days = Set('AvailDay')
 
+    composite_key(person, plan_period)
+
     def before_update(self):
         self.last_modified = datetime.utcnow()
 
@@ -103,11 +116,15 @@ class PlanPeriod(db_actors.Entity):
     deadline = Required(date)
     notes = Optional(str)
     closed = Required(bool, default=False)
+    remainder = Required(bool, default=False)  # Remainder an die Actors am Tag der Deadline (utilities/reminders.py)
     created_at = Required(date, default=lambda: date.today())
     last_modified = Required(datetime, default=lambda: datetime.utcnow())
     team = Required(Team)
     availabless = Set(Availables)
-    apscheduler_job = Optional('APSchedulerJob', cascade_delete=True)
+    deadline_reminders = Set('DeadlineReminder', cascade_delete=True)
+
+    composite_index(team, closed)
+    composite_index(team, start, end)
 
     @property
     def dispatcher(self):
@@ -132,19 +149,67 @@ class PlanPeriod(db_actors.Entity):
 
 class AvailDay(db_actors.Entity):
     id = PrimaryKey(UUID, auto=True)
-    day = Required(date)
+    day = Required(date, index=True)
     created_at = Required(date, default=lambda: date.today())
     last_modified = Required(datetime, default=lambda: datetime.utcnow())
     time_of_day = Required(TimeOfDay)
     availables = Required(Availables)
 
+    composite_key(availables, day, time_of_day)
+
     def before_update(self):
         self.last_modified = datetime.utcnow()
 
 
-class APSchedulerJob(db_actors.Entity):
+class SchedulerJob(db_actors.Entity):
+    """Job-Store des APSchedulers (utilities/jobstore.py). job_state enthält den gepickelten Zustand
+    (Job.__getstate__()), next_run_time den UTC-Timestamp der nächsten Ausführung (None bei pausierten Jobs)."""
+    id = PrimaryKey(str, 191)
+    next_run_time = Optional(float, index=True)
+    job_state = Required(bytes, lazy=False)
+    plan_period_id = Optional(UUID, index=True)
+
+
+class DeadlineReminder(db_actors.Entity):
+    """Verschickte Remainder einer Planperiode (utilities/reminders.py). Der Unique-Key (plan_period, deadline)
+    verhindert, dass für dieselbe Deadline ein zweites Mal Remainder verschickt werden. Wird die Deadline
+    verschoben, gibt es zur neuen Deadline wieder einen Remainder."""
+    id = PrimaryKey(UUID, auto=True)
     plan_period = Required(PlanPeriod)
-    job = Required(bytes)
+    deadline = Required(date)
+    sent_at = Required(datetime, default=lambda: datetime.utcnow())
+    recipients = Required(int, default=0)
+
+    composite_key(plan_period, deadline)
+
+
+class SchedulerLease(db_actors.Entity):
+    """Lease des Prozesses, der die Scheduler-Jobs ausführt (utilities/scheduler_leader.py).
+    Der Besitzer verlängert expires_at regelmäßig, nach Ablauf kann ein anderer Prozess übernehmen."""
+    name = PrimaryKey(str, 50)
+    owner = Required(str, 200)
+    expires_at = Required(datetime)
+
+
+class OutgoingMail(db_actors.Entity):
+    """Spool der ausgehenden E-Mails. Versendet werden sie von den Workern in utilities/mail_queue.py.
+    status enthält den Wert eines enums.MailStatus (als str, damit das Feld in Pony-Queries verwendet werden kann)."""
+    id = PrimaryKey(UUID, auto=True)
+    send_to = Required(str)
+    subject = Required(str)
+    message = Required(LongStr)
+    status = Required(str, 10, default=MailStatus.pending.value)
+    attempts = Required(int, default=0)
+    next_attempt_at = Required(datetime, default=lambda: datetime.utcnow())
+    last_error = Optional(LongStr)
+    sent_at = Optional(datetime)
+    created_at = Required(datetime, default=lambda: datetime.utcnow())
+    last_modified = Required(datetime, default=lambda: datetime.utcnow())
+
+    composite_index(status, next_attempt_at)
+
+    def before_update(self):
+        self.last_modified = datetime.utcnow()
 
 
 # todo: Damit eine Person an mehreren Projekten teilnehmen kann, ist eine Änderung in der Personklasse notwendig: Zum
@@ -1,9 +1,7 @@
-import pickle
 from datetime import date, datetime, timedelta
 from typing import Optional, Any, List, Union
 from uuid import UUID
 
-import apscheduler.job
 from pydantic import BaseModel, EmailStr, field_validator, ConfigDict, Field
 from .enums import TimeOfDay
 
@@ -142,9 +140,37 @@ class PlanPeriodShow(PlanPeriod):
         return [v for v in values]
 
 
-class PlanPerEtFilledIn(BaseModel):
-    plan_period: PlanPeriodShow
-    filled_in: bool
+class PlanPeriodOfActor(BaseModel):
+    """Sicht auf eine offene Planperiode aus Perspektive eines einzelnen Actors.
+    Enthält neben den Feldern der Planperiode nur die Tage/Tageszeiten und die Anmerkungen dieses Actors."""
+    model_config = ConfigDict(from_attributes=True)
+
+    id: UUID
+    start: date
+    end: date
+    deadline: date
+    notes: Optional[str] = None
+    closed: bool
+    avail_days: dict[date, List[TimeOfDay]] = Field(default_factory=dict)
+    notes_of_availables: str = ''
+
+    @property
+    def filled_in(self) -> bool:
+        return bool(self.avail_days)
+
+    def is_selected(self, day: date, time_of_day_name: str) -> bool:
+        return any(t_o_d.name == time_of_day_name for t_o_d in self.avail_days.get(day, []))
+
+    @property
+    def all_days(self) -> List[date]:
+        return [self.start + timedelta(days=i) for i in range((self.end - self.start).days + 1)]
+
+    @property
+    def calender_week_days(self):
+        kw__day_wd = {d.isocalendar()[1]: [] for d in self.all_days}
+        for day in self.all_days:
+            kw__day_wd[day.isocalendar()[1]].append((day, date.weekday(day)))
+        return kw__day_wd
 
 
 class AvailDayCreate(BaseModel):
@@ -166,6 +192,34 @@ class AvailDayShow(AvailDay):
     pass
 
 
+class SelectionChange(BaseModel):
+    """Eine Zelle im Kalender von actors_new. time_of_day ist der Name eines TimeOfDay-Werts (z.B. 'morning')."""
+    day: date
+    time_of_day: str
+    selected: bool
+
+    @field_validator('time_of_day')
+    def time_of_day_name(cls, value):
+        if value not in TimeOfDay.__members__:
+            raise ValueError(f'unbekannte Tageszeit: {value}')
+        return value
+
+
+class SelectionBatch(BaseModel):
+    """Gesammelte Klicks eines Actors in einer Planperiode. Bei replace enthält changes den vollständigen
+    Zielzustand: Alle nicht genannten Tageszeiten der Planperiode werden entfernt."""
+    plan_period_id: UUID
+    changes: List[SelectionChange] = Field(default_factory=list)
+    replace: bool = False
+
+
+class SelectionDiff(BaseModel):
+    """Tatsächlich geänderte Zellen als (Tag, Name der Tageszeit)."""
+    plan_period_id: UUID
+    selected: List[tuple[date, str]] = Field(default_factory=list)
+    unselected: List[tuple[date, str]] = Field(default_factory=list)
+
+
 # --------------------------------------------------------------------------------------
 
 
@@ -179,16 +233,15 @@ class RemainderDeadlineCreate(BaseModel):
     args: List = Field(default_factory=list)
 
 
-class APSchedulerJob(BaseModel):
-    model_config = ConfigDict(from_attributes=True, arbitrary_types_allowed=True)
-
-    plan_period: PlanPeriod
-    job: apscheduler.job.Job
+class OutgoingMail(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
 
-    @field_validator('job', mode='before')
-    def pickled_job_to_job(cls, pickled_job):
-        print('in schema:', pickle.loads(pickled_job))
-        return pickle.loads(pickled_job)
+    id: UUID
+    send_to: str
+    subject: str
+    message: str
+    status: str
+    attempts: int
 
 
 # --------------------------------------------------------------------------------------
@@ -207,6 +260,7 @@ class Token(BaseModel):
 class TokenData(BaseModel):
     id: Union[UUID, str, None] = None
     authorizations: List[str]
+    exp: Optional[int] = None
 
 
 ProjectCreate.model_rebuild()
@@ -1,23 +1,97 @@
 import datetime
 import json
-import pickle
 import secrets
-from typing import Optional, Union
-from uuid import UUID
+from collections import defaultdict
+from email.message import Message
+from typing import Iterator, Optional, Union
+from uuid import UUID, uuid4
 
-import apscheduler.job
-from pony.orm import db_session, select
+from pony.orm import db_session, select, flush, commit, count, exists, max as max_
 from pydantic import EmailStr
 
 from databases import schemas, models
-from utilities import utils
-from .enums import TimeOfDay
+from utilities import utils, cache
+from utilities.plan_period_index import PlanPeriodIndex, PlanPeriodInterval
+from .enums import TimeOfDay, MailStatus
 
 
 class CustomError(Exception):
     pass
 
 
+def _insert_many(entity, rows: list[dict], ignore_conflicts: bool = False) -> int:
+    """Fügt alle Zeilen mit einem einzigen executemany-Aufruf in die Tabelle der Entity ein.
+    Pony würde für jede neue Entity ein eigenes INSERT absetzen. Die eingefügten Zeilen landen nicht im
+    Pony-Cache der laufenden db_session. Mit ignore_conflicts werden Zeilen übersprungen, die gegen einen
+    Unique-Key verstoßen (ON CONFLICT DO NOTHING). Gibt die Anzahl der eingefügten Zeilen zurück."""
+    if not rows:
+        return 0
+    db = entity._database_
+    provider = db.provider
+    attrs = [entity._adict_[name] for name in rows[0]]
+    placeholder = '?' if provider.paramstyle == 'qmark' else '%s'
+    sql = 'INSERT INTO %s (%s) VALUES (%s)' % (provider.quote_name(entity._table_),
+                                               ', '.join(provider.quote_name(attr.column) for attr in attrs),
+                                               ', '.join([placeholder] * len(attrs)))
+    if ignore_conflicts:
+        sql += ' ON CONFLICT DO NOTHING'
+    flush()
+    cursor = db.get_connection().cursor()
+    cursor.executemany(sql, [tuple(None if row[attr.name] is None else attr.converters[0].py2sql(row[attr.name])
+                                   for attr in attrs) for row in rows])
+    return cursor.rowcount
+
+
+def _upsert_availables(person_id: UUID, plan_period_id: UUID, notes: str | None = None) -> UUID:
+    """Legt das Availables der Person für die Planperiode an, falls es noch nicht existiert, und gibt dessen id
+    zurück. Ein einziges INSERT ... ON CONFLICT über den Unique-Key (person, plan_period), so dass auch parallele
+    Requests kein zweites Availables anlegen (PostgreSQL und SQLite >= 3.35). Mit notes werden die Anmerkungen
+    gesetzt. Das Availables darf in der laufenden db_session noch nicht geladen sein."""
+    entity = models.Availables
+    provider = entity._database_.provider
+    now = datetime.datetime.utcnow()
+    values = {'id': uuid4(), 'notes': notes or '', 'created_at': now.date(), 'last_modified': now,
+              'plan_period': plan_period_id, 'person': person_id}
+    attrs = [entity._adict_[name] for name in values]
+    column = {attr.name: provider.quote_name(attr.column) for attr in attrs}
+    placeholder = '?' if provider.paramstyle == 'qmark' else '%s'
+    if notes is None:
+        on_conflict = f'{column["person"]} = excluded.{column["person"]}'
+    else:
+        on_conflict = (f'{column["notes"]} = excluded.{column["notes"]}, '
+                       f'{column["last_modified"]} = excluded.{column["last_modified"]}')
+    sql = (f'INSERT INTO {provider.quote_name(entity._table_)} ({", ".join(column.values())}) '
+           f'VALUES ({", ".join([placeholder] * len(attrs))}) '
+           f'ON CONFLICT ({column["person"]}, {column["plan_period"]}) DO UPDATE SET {on_conflict} '
+           f'RETURNING {column["id"]}')
+    flush()
+    cursor = entity._database_.get_connection().cursor()
+    cursor.execute(sql, tuple(attr.converters[0].py2sql(values[attr.name]) for attr in attrs))
+    return entity._adict_['id'].converters[0].sql2py(cursor.fetchone()[0])
+
+
+def _plan_period_of_actor(person_id: UUID, day: datetime.date) -> PlanPeriodInterval | None:
+    """Planperiode des Teams des Actors, die day enthält. Team und Planperioden kommen aus dem metadata_cache,
+    bei einem Treffer ohne Datenbankzugriff."""
+    team_id = Person.get_team_of_actor_id(person_id)
+    if team_id is None:
+        return None
+    return PlanPeriod.get_plan_period_index(team_id).find(day)
+
+
+def _open_plan_period_id(person_id: UUID, day: datetime.date) -> UUID | None:
+    """Id der offenen Planperiode des Actors, die day enthält, für schreibende Zugriffe. Der Index aus dem
+    metadata_cache bestimmt nur die Id. Ob die Planperiode offen ist und day enthält, wird in der laufenden
+    db_session aus der Datenbank gelesen: Ein anderer Worker-Prozess kann sie inzwischen geschlossen haben, ohne dass
+    der Cache dieses Prozesses invalidiert wurde."""
+    if (interval := _plan_period_of_actor(person_id, day)) is None:
+        return None
+    plan_period = models.PlanPeriod.get(id=interval.id)
+    if plan_period is None or plan_period.closed or not plan_period.start <= day <= plan_period.end:
+        return None
+    return plan_period.id
+
+
 class Person:
     @staticmethod
     @db_session
@@ -54,14 +128,21 @@ class Person:
 
         person_db = models.Person[user_id]
         person_db.password = hashed_psw
+        commit()
+        cache.invalidate_principal(user_id)
+        cache.metadata_cache.invalidate('teams_of_dispatcher', 'planperiods_of_team')
         return schemas.Person.model_validate(person_db), new_psw
 
     @staticmethod
     @db_session
     def delete_person_from_project(person_id: UUID):
         person_to_delete = models.Person[person_id]
+        deleted = schemas.Person.model_validate(person_to_delete)
         person_to_delete.delete()
-        return schemas.Person.model_validate(person_to_delete)
+        commit()
+        cache.invalidate_principal(person_id)
+        cache.metadata_cache.invalidate()
+        return deleted
 
     @staticmethod
     @db_session
@@ -77,6 +158,14 @@ class Person:
         else:
             person_in_db.team_of_actor = None
         person_in_db.set(f_name=person.f_name, l_name=person.l_name)
+        commit()
+        if person.project_of_admin or person.teams_of_dispatcher:
+            # betrifft auch die bisherigen Admins/Dispatcher
+            cache.principal_cache.clear()
+        else:
+            cache.invalidate_principal(person.id)
+        cache.metadata_cache.invalidate('teams_of_dispatcher', 'planperiods_of_team', 'team_of_actor')
+        cache.invalidate_selection(person.id)
         return schemas.PersonShow.model_validate(person_in_db)
 
     @staticmethod
@@ -97,19 +186,35 @@ class Person:
     @staticmethod
     @db_session
     def find_user_by_email(email: str) -> schemas.PersonShow | None:
-        person = models.Person.get(lambda p: p.email.lower() == email.lower())
+        person = models.Person.get(email_normalized=models.normalize_email(email))
         if person:
             return schemas.PersonShow.model_validate(person)
         return None
 
+    @staticmethod
+    @db_session
+    def update_password_hash(person_id: UUID, hashed_psw: str):
+        models.Person[person_id].password = hashed_psw
+        commit()
+        cache.invalidate_principal(person_id)
+
     @staticmethod
     @db_session
     def set_new_actor_account_settings(person_id: UUID, new_email: EmailStr, new_password: str):
         user = models.Person[person_id]
         hashed_psw = utils.hash_psw(new_password)
         user.set(email=new_email, password=hashed_psw)
+        commit()
+        cache.invalidate_principal(person_id)
         return schemas.Person.model_validate(user)
 
+    @staticmethod
+    @cache.metadata_cache.cached('team_of_actor')
+    @db_session
+    def get_team_of_actor_id(person_id: UUID) -> UUID | None:
+        team = models.Person[person_id].team_of_actor
+        return team.id if team else None
+
     @staticmethod
     @db_session
     def get_actors_in_dispatcher_teams(dispatcher_id: UUID) -> list[schemas.PersonShow]:
@@ -122,14 +227,23 @@ class Team:
     def update_team_from_project(team_id: UUID, new_team_name: str):
         team_to_update = models.Team[team_id]
         team_to_update.name = new_team_name
+        commit()
+        cache.principal_cache.clear()
+        cache.metadata_cache.invalidate('teams_of_dispatcher', 'planperiods_of_team')
         return schemas.Team.model_validate(team_to_update)
 
     @staticmethod
     @db_session
     def delete_team_from_project(team_id: UUID):
         team_to_delete = models.Team[team_id]
+        deleted = schemas.Team.model_validate(team_to_delete)
         team_to_delete.delete()
-        return schemas.Team.model_validate(team_to_delete)
+        commit()
+        cache.principal_cache.clear()
+        cache.metadata_cache.invalidate('teams_of_dispatcher', 'planperiods_of_team', 'team_of_actor',
+                                        'plan_period_index')
+        cache.selection_cache.clear()
+        return deleted
 
     @staticmethod
     @db_session
@@ -141,8 +255,12 @@ class Team:
         return [schemas.Team.model_validate(t) for t in teams]
 
     @staticmethod
+    @cache.metadata_cache.cached('teams_of_dispatcher')
     @db_session
-    def get_teams_of_dispatcher(dispatcher_id: UUID) -> list[schemas.Team]:
+    def get_teams_of_dispatcher(dispatcher_id: UUID, version: tuple | None = None) -> list[schemas.Team]:
+        """version (aus Project.get_version_from_user_id()) ist nur Teil des Cache-Schlüssels. Schreibt ein anderer
+        Prozess, ändert sich die Version in der Datenbank und der Eintrag dieses Prozesses wird nicht mehr
+        getroffen, so dass der ETag zur Antwort passt."""
         return [schemas.Team.model_validate(t) for t in models.Person[dispatcher_id].teams_of_dispatcher]
 
     @staticmethod
@@ -150,21 +268,43 @@ class Team:
     def create_new_team(team: schemas.TeamCreate, person_id: str):
         person = models.Person[UUID(person_id)]
         new_team = models.Team(name=team.name, dispatcher=person)
+        commit()
+        cache.metadata_cache.invalidate('teams_of_dispatcher')
         return schemas.TeamShow.model_validate(new_team)
 
 
+def _project_version(project_id: UUID) -> tuple:
+    project = models.Project[project_id]
+    persons = select((count(p), max_(p.last_modified)) for p in models.Person if p.project.id == project_id).get()
+    teams = select((count(t), max_(t.last_modified))
+                   for t in models.Team if t.dispatcher.project.id == project_id).get()
+    return project.last_modified, persons, teams
+
+
 class Project:
     @staticmethod
+    @cache.metadata_cache.cached('project_of_user')
     @db_session
     def get_project_from_user_id(user_id) -> schemas.Project:
         project = models.Person[user_id].project
         return schemas.Project.model_validate(project)
 
+    @staticmethod
+    @db_session
+    def get_version_from_user_id(user_id: UUID) -> tuple:
+        """Version der Personen und Teams des Projekts für ETag/Last-Modified (utilities/conditional.py):
+        Anzahl und jüngstes last_modified je Tabelle. Gelöschte Einträge ändern die Anzahl, geänderte das
+        Datum, ohne dass die Einträge selbst geladen werden."""
+        return _project_version(models.Person[user_id].project.id)
+
     @staticmethod
     @db_session
     def update_project_name(user_id: UUID, project_name: str):
         project = models.Person[user_id].project_of_admin
         project.name = project_name
+        commit()
+        cache.principal_cache.clear()
+        cache.metadata_cache.invalidate('project_of_user', 'teams_of_dispatcher', 'planperiods_of_team')
         return schemas.Project.model_validate(project)
 
     @staticmethod
@@ -189,8 +329,12 @@ class Project:
         cascade_delete wegen Sicherheitsgründen auf False gestellt ist.'''
         for team in project_to_delete.teams:
             team.delete()
+        deleted = schemas.Project.model_validate(project_to_delete)
         project_to_delete.delete()
-        return schemas.Project.model_validate(project_to_delete)
+        commit()
+        cache.principal_cache.clear()
+        cache.metadata_cache.invalidate()
+        return deleted
 
 
 class AvailDay:
@@ -207,23 +351,48 @@ class AvailDay:
                 available_days[plan_period_id] = {}
             available_days[plan_period_id][date_av] = val
 
-        plan_periods = []
-
+        pp_ids = [UUID(pp_id) for pp_id in available_days]
+        # Availables samt Anmerkungen per Upsert, die Availables-Entities werden nicht geladen.
+        availables_ids = {UUID(pp_id): _upsert_availables(user_id, UUID(pp_id), dates.pop('infos'))
+                          for pp_id, dates in available_days.items()}
+        plan_period_of_availables = {av_id: pp_id for pp_id, av_id in availables_ids.items()}
+        plan_periods_db = {pp.id: pp for pp in select(pp for pp in models.PlanPeriod if pp.id in pp_ids)}
+        stored_avail_days: defaultdict[UUID, dict[tuple[datetime.date, TimeOfDay], UUID]] = defaultdict(dict)
+        av_ids = list(plan_period_of_availables)
+        for av_d in select(ad for ad in models.AvailDay if ad.availables.id in av_ids):
+            stored_avail_days[plan_period_of_availables[av_d.availables.id]][(av_d.day, av_d.time_of_day)] = av_d.id
+
+        # Nur die Differenz zwischen gespeicherten und übermittelten Tagen wird geschrieben.
+        # Unveränderte Einträge bleiben samt created_at erhalten.
+        ids_to_delete: list[UUID] = []
+        rows_to_insert: list[dict] = []
         for pp_id, dates in available_days.items():
-            availables_in_db = models.Availables.get(
-                lambda a: a.person == models.Person[user_id] and a.plan_period == models.PlanPeriod[pp_id])
-            if availables_in_db:
-                availables = availables_in_db
-                availables.avail_days.clear()
-            else:
-                availables = models.Availables(plan_period=models.PlanPeriod[pp_id], person=models.Person[user_id])
-            availables.notes = dates.pop('infos')
+            stored = stored_avail_days[UUID(pp_id)]
+            wanted = {(d, TimeOfDay(v)) for d, v in dates.items() if v != 'x'}
+            ids_to_delete.extend(av_d_id for key, av_d_id in stored.items() if key not in wanted)
+            rows_to_insert.extend({'id': uuid4(), 'day': d, 'time_of_day': time_of_day,
+                                   'availables': availables_ids[UUID(pp_id)],
+                                   'created_at': datetime.date.today(), 'last_modified': datetime.datetime.utcnow()}
+                                  for d, time_of_day in sorted(wanted - stored.keys(), key=lambda k: k[0]))
 
-            av_days = {models.AvailDay(day=d, time_of_day=TimeOfDay(v), availables=availables)
-                       for d, v in dates.items() if v != 'x'}
-            plan_periods.append(schemas.PlanPeriod.model_validate(models.PlanPeriod[pp_id]))
+        if ids_to_delete:
+            models.AvailDay.select(lambda ad: ad.id in ids_to_delete).delete(bulk=True)
+        _insert_many(models.AvailDay, rows_to_insert, ignore_conflicts=True)
+        commit()
+        cache.invalidate_selection(user_id)
 
-        return plan_periods
+        return [schemas.PlanPeriod.model_validate(plan_periods_db[pp_id]) for pp_id in pp_ids]
+
+    @staticmethod
+    @db_session
+    def get_avail_days_from_planperiod_version(planperiod_id: UUID) -> tuple:
+        """Version für get_avail_days_from_planperiod(), siehe Project.get_version_from_user_id()."""
+        plan_period = models.PlanPeriod[planperiod_id]
+        availabless = select((count(a), max_(a.last_modified))
+                             for a in models.Availables if a.plan_period.id == planperiod_id).get()
+        avail_days = select((count(ad), max_(ad.last_modified))
+                            for ad in models.AvailDay if ad.availables.plan_period.id == planperiod_id).get()
+        return plan_period.last_modified, availabless, avail_days
 
     @staticmethod
     @db_session
@@ -235,6 +404,55 @@ class AvailDay:
                       for availables in availabless}
         return avail_days
 
+    @staticmethod
+    def iter_avail_day_rows(dispatcher_id: UUID, plan_period_ids: list[UUID],
+                            chunk_rows: int) -> Iterator[list[tuple]]:
+        """Zeilen (plan_period_id, person_id, f_name, l_name, notes, day, time_of_day) aller Availables der
+        Planperioden, die zu Teams des Dispatchers gehören - mit einer einzigen Join-Abfrage statt Lazy Loading je
+        Person. Availables ohne Tage ergeben eine Zeile mit day/time_of_day None, damit deren Anmerkungen nicht
+        fehlen. Sortiert nach Planperiode, Name, Tag.
+        Generator mit eigener db_session, der den Cursor in Blöcken von chunk_rows Zeilen liest (unter PostgreSQL
+        ein serverseitiger Cursor). Pony bindet die db_session an den Thread, der Generator muss deshalb vollständig
+        in einem Thread durchlaufen werden (async_services.iterate_in_thread)."""
+        if not plan_period_ids:
+            return
+        provider = models.db_actors.provider
+        q = provider.quote_name
+        av, ad, pe, pp, te = models.Availables, models.AvailDay, models.Person, models.PlanPeriod, models.Team
+        placeholder = '?' if provider.paramstyle == 'qmark' else '%s'
+        sql = (f'SELECT av.{q(av.plan_period.column)}, pe.{q(pe.id.column)}, pe.{q(pe.f_name.column)}, '
+               f'pe.{q(pe.l_name.column)}, av.{q(av.notes.column)}, ad.{q(ad.day.column)}, '
+               f'ad.{q(ad.time_of_day.column)} '
+               f'FROM {q(av._table_)} av '
+               f'JOIN {q(pe._table_)} pe ON pe.{q(pe.id.column)} = av.{q(av.person.column)} '
+               f'JOIN {q(pp._table_)} pp ON pp.{q(pp.id.column)} = av.{q(av.plan_period.column)} '
+               f'JOIN {q(te._table_)} te ON te.{q(te.id.column)} = pp.{q(pp.team.column)} '
+               f'LEFT JOIN {q(ad._table_)} ad ON ad.{q(ad.availables.column)} = av.{q(av.id.column)} '
+               f'WHERE te.{q(te.dispatcher.column)} = {placeholder} '
+               f'AND av.{q(av.plan_period.column)} IN ({", ".join([placeholder] * len(plan_period_ids))}) '
+               f'ORDER BY pp.{q(pp.start.column)}, pe.{q(pe.l_name.column)}, pe.{q(pe.f_name.column)}, '
+               f'ad.{q(ad.day.column)}')
+        uuid_converter = pe.id.converters[0]
+        day_converter, time_of_day_converter = ad.day.converters[0], ad.time_of_day.converters[0]
+        with db_session:
+            connection = models.db_actors.get_connection()
+            if provider.dialect == 'PostgreSQL':
+                # psycopg2 lädt bei einem normalen Cursor das gesamte Ergebnis in den Speicher. withhold, weil Pony
+                # lesende Sessions im Autocommit-Modus betreibt.
+                cursor = connection.cursor(name=f'avail_day_export_{uuid4().hex}', withhold=True)
+            else:
+                cursor = connection.cursor()
+            try:
+                cursor.execute(sql, [uuid_converter.py2sql(dispatcher_id)]
+                               + [uuid_converter.py2sql(pp_id) for pp_id in plan_period_ids])
+                while rows := cursor.fetchmany(chunk_rows):
+                    yield [(uuid_converter.sql2py(pp_id), uuid_converter.sql2py(person_id), f_name, l_name,
+                            notes or '', day_converter.sql2py(day) if day is not None else None,
+                            time_of_day_converter.sql2py(time_of_day) if time_of_day is not None else None)
+                           for pp_id, person_id, f_name, l_name, notes, day, time_of_day in rows]
+            finally:
+                cursor.close()
+
     @staticmethod
     @db_session
     def get_avail_days_from_plan_period_and_person(person_id: UUID, plan_period_id: UUID) -> list[schemas.AvailDay]:
@@ -260,49 +478,139 @@ class AvailDay:
 
     @staticmethod
     @db_session
-    def create_avail_day(person_id: UUID, avail_day: schemas.AvailDayCreate):
-        team_db = models.Person[person_id].team_of_actor
-        plan_period_db = (models.PlanPeriod.select()
-                          .filter(lambda pp: pp.start <= avail_day.day)
-                          .filter(lambda pp: pp.end >= avail_day.day)
-                          .filter(lambda pp: pp.team == team_db).first())
-        person_db = models.Person[person_id]
-        availables_in_db = (models.Availables.get(lambda a: a.person == person_db and a.plan_period == plan_period_db)
-                            or models.Availables(plan_period=plan_period_db, person=person_db))
-        avail_day_db = models.AvailDay(
-            day=avail_day.day, time_of_day=avail_day.time_of_day, availables=availables_in_db)
-        print(avail_day_db.time_of_day)
-        return schemas.AvailDay.model_validate(avail_day_db)
-
-    @staticmethod
-    @db_session
-    def delete_avail_day(person_id: UUID, date: datetime.date, time_of_day: TimeOfDay):
-        plan_period_db = models.PlanPeriod.get(
-            lambda pp: pp.start <= date and date <= pp.end and pp.team == models.Person[person_id].team_of_actor)
-        availables_in_db = models.Availables.get(person=models.Person[person_id], plan_period=plan_period_db)
-        avail_day_in_db = models.AvailDay.get(day=date, time_of_day=time_of_day, availables=availables_in_db)
-        avail_day_in_db.delete()
+    def get_selected_times(person_id: UUID) -> frozenset[tuple[datetime.date, TimeOfDay]]:
+        """Ausgewählte Tage/Tageszeiten des Actors in den offenen Planperioden, geladen mit einer Abfrage über die
+        Unique-Keys von Availables (person, plan_period) und AvailDay (availables, day, time_of_day).
+        Pro Person im selection_cache gehalten, set_selected_time() schreibt den Cache mit. Änderungen aus anderen
+        Worker-Prozessen werden nach Ablauf der TTL sichtbar."""
+        key = str(person_id)
+        if (selected := cache.selection_cache.get(key)) is None:
+            avail_days = select(ad for ad in models.AvailDay
+                                if ad.availables.person.id == person_id and not ad.availables.plan_period.closed)
+            selected = frozenset((ad.day, ad.time_of_day) for ad in avail_days)
+            cache.selection_cache.set(key, selected)
+        return selected
+
+    @staticmethod
+    @db_session
+    def set_selected_time(person_id: UUID, day: datetime.date, time_of_day: TimeOfDay, selected: bool) -> bool:
+        """Wählt die Tageszeit des Actors an day aus (selected=True) oder entfernt sie. Idempotent: Der Zielzustand
+        wird mit INSERT ... ON CONFLICT DO NOTHING bzw. DELETE hergestellt, unabhängig vom bisherigen Zustand und
+        auch bei parallelen Requests mehrerer Worker. Gibt zurück, ob sich der gespeicherte Zustand geändert hat."""
+        if (plan_period_id := _open_plan_period_id(person_id, day)) is None:
+            raise ValueError(f'Für den {day.strftime("%d.%m.%Y")} gibt es keine offene Planperiode.')
+        if selected:
+            availables_id = _upsert_availables(person_id, plan_period_id)
+            changed = _insert_many(models.AvailDay,
+                                   [{'id': uuid4(), 'day': day, 'time_of_day': time_of_day,
+                                     'availables': availables_id, 'created_at': datetime.date.today(),
+                                     'last_modified': datetime.datetime.utcnow()}],
+                                   ignore_conflicts=True) > 0
+        else:
+            # Enums werden in Pony-Queries nicht unterstützt, time_of_day wird deshalb in Python gefiltert.
+            ids = [ad.id for ad in select(ad for ad in models.AvailDay
+                                          if ad.availables.person.id == person_id
+                                          and ad.availables.plan_period.id == plan_period_id and ad.day == day)
+                   if ad.time_of_day == time_of_day]
+            changed = bool(ids) and models.AvailDay.select(lambda ad: ad.id in ids).delete(bulk=True) > 0
+        commit()
+        cache.update_selection(person_id, selected={(day, time_of_day)} if selected else set(),
+                               unselected=set() if selected else {(day, time_of_day)})
+        return changed
+
+    @staticmethod
+    @db_session
+    def toggle_selected_time(person_id: UUID, day: datetime.date, time_of_day: TimeOfDay) -> bool:
+        """Kehrt den in der Datenbank gespeicherten Zustand der Tageszeit um (nicht den des selection_cache, der
+        Änderungen anderer Worker erst nach Ablauf der TTL enthält). Gibt den neuen Zustand zurück."""
+        # Enums werden in Pony-Queries nicht unterstützt, time_of_day wird deshalb in Python gefiltert.
+        is_selected = any(ad.time_of_day == time_of_day
+                          for ad in select(ad for ad in models.AvailDay
+                                           if ad.availables.person.id == person_id and ad.day == day
+                                           and not ad.availables.plan_period.closed))
+        AvailDay.set_selected_time(person_id, day, time_of_day, not is_selected)
+        return not is_selected
+
+    @staticmethod
+    @db_session
+    def apply_selection(person_id: UUID, batch: schemas.SelectionBatch) -> schemas.SelectionDiff:
+        """Wendet die gesammelten Änderungen eines Actors in einer Planperiode in einer Transaktion an: eine Abfrage
+        für die Planperiode, eine für die gespeicherten AvailDays, danach höchstens ein Upsert des Availables, ein
+        DELETE und ein INSERT für alle Zellen. Wird eine Zelle mehrfach genannt, gilt die letzte Änderung.
+        Zurückgegeben werden nur die Zellen, deren gespeicherter Zustand sich geändert hat."""
+        plan_period = select(pp for pp in models.PlanPeriod for p in models.Person
+                             if pp.id == batch.plan_period_id and p.id == person_id
+                             and pp.team == p.team_of_actor and not pp.closed).first()
+        if plan_period is None:
+            raise ValueError('Die Planperiode ist nicht mehr für Eintragungen geöffnet.')
+        wanted: dict[tuple[datetime.date, TimeOfDay], bool] = {}
+        for change in batch.changes:
+            if not plan_period.start <= change.day <= plan_period.end:
+                raise ValueError(f'Der {change.day.strftime("%d.%m.%Y")} liegt nicht in der Planperiode.')
+            wanted[(change.day, TimeOfDay[change.time_of_day])] = change.selected
+
+        availables_id = _upsert_availables(person_id, plan_period.id) if any(wanted.values()) else None
+        stored = {(ad.day, ad.time_of_day): ad.id
+                  for ad in select(ad for ad in models.AvailDay
+                                   if ad.availables.person.id == person_id
+                                   and ad.availables.plan_period == plan_period)}
+        if batch.replace:
+            for key in stored:
+                wanted.setdefault(key, False)
+        to_select = sorted((key for key, selected in wanted.items() if selected and key not in stored),
+                           key=lambda k: (k[0], k[1].name))
+        to_unselect = sorted((key for key, selected in wanted.items() if not selected and key in stored),
+                             key=lambda k: (k[0], k[1].name))
+
+        if to_unselect:
+            ids = [stored[key] for key in to_unselect]
+            models.AvailDay.select(lambda ad: ad.id in ids).delete(bulk=True)
+        _insert_many(models.AvailDay,
+                     [{'id': uuid4(), 'day': day, 'time_of_day': time_of_day, 'availables': availables_id,
+                       'created_at': datetime.date.today(), 'last_modified': datetime.datetime.utcnow()}
+                      for day, time_of_day in to_select],
+                     ignore_conflicts=True)
+        commit()
+        cache.update_selection(person_id, selected=set(to_select), unselected=set(to_unselect))
+
+        return schemas.SelectionDiff(plan_period_id=plan_period.id,
+                                     selected=[(day, time_of_day.name) for day, time_of_day in to_select],
+                                     unselected=[(day, time_of_day.name) for day, time_of_day in to_unselect])
 
 
 class PlanPeriod:
     @staticmethod
     @db_session
-    def get_open_plan_periods(user_id: UUID) -> list[schemas.PlanPerEtFilledIn]:
-        person = models.Person.get(id=user_id)
-        actor_team = person.team_of_actor
-        plan_periods = models.PlanPeriod.select(lambda pp: pp.team == actor_team and not pp.closed)
-
-        plan_p_et_filled_in: list[schemas.PlanPerEtFilledIn] = []
+    def get_open_plan_periods_of_actor(user_id: UUID) -> list[schemas.PlanPeriodOfActor]:
+        """Lädt die offenen Planperioden des Teams eines Actors zusammen mit den eigenen Availables und AvailDays
+        des Actors. Unabhängig von der Anzahl der Planperioden werden genau 4 Abfragen ausgeführt
+        (Person, Planperioden, Availables, AvailDays)."""
+        person = models.Person[user_id]
+        team = person.team_of_actor
+        if not team:
+            return []
+        plan_periods = select(pp for pp in models.PlanPeriod
+                              if pp.team == team and not pp.closed).order_by(models.PlanPeriod.start)[:]
+        availabless = select(a for a in models.Availables
+                             if a.person == person and a.plan_period.team == team and not a.plan_period.closed)[:]
+        avail_days = select(ad for ad in models.AvailDay
+                            if ad.availables.person == person and ad.availables.plan_period.team == team
+                            and not ad.availables.plan_period.closed)[:]
+
+        avail_days_of_availables: defaultdict[UUID, defaultdict[datetime.date, list[TimeOfDay]]] = defaultdict(
+            lambda: defaultdict(list))
+        for avail_day in avail_days:
+            avail_days_of_availables[avail_day.availables.id][avail_day.day].append(avail_day.time_of_day)
+        availables_of_plan_period = {availables.plan_period.id: availables for availables in availabless}
+
+        plan_periods_of_actor = []
         for pp in plan_periods:
-            if not pp.availabless.select(lambda av: av.person == person):
-                filled_in = False
-            else:
-                filled_in = True if list(pp.availabless.select(lambda av: av.person == person).first().avail_days) else False
-
-            plan_p_et_filled_in.append(schemas.PlanPerEtFilledIn(plan_period=schemas.PlanPeriodShow.model_validate(pp),
-                                                                 filled_in=filled_in))
-            plan_p_et_filled_in.sort(key=lambda pp_e_fi: pp_e_fi.plan_period.start)
-        return plan_p_et_filled_in
+            availables = availables_of_plan_period.get(pp.id)
+            plan_periods_of_actor.append(schemas.PlanPeriodOfActor(
+                id=pp.id, start=pp.start, end=pp.end, deadline=pp.deadline, notes=pp.notes, closed=pp.closed,
+                avail_days=dict(avail_days_of_availables[availables.id]) if availables else {},
+                notes_of_availables=(availables.notes if availables else '') or ''))
+        return plan_periods_of_actor
 
     @staticmethod
     @db_session
@@ -316,17 +624,40 @@ class PlanPeriod:
 
     @staticmethod
     @db_session
-    def get_planperiods_of_team(team_id: UUID) -> list[schemas.PlanPeriod]:
+    def get_planperiods_of_team_version(team_id: UUID) -> tuple:
+        """Version für get_planperiods_of_team(), siehe Project.get_version_from_user_id().
+        Das Team und sein Dispatcher sind Teil der Antwort und über die Projekt-Version abgedeckt."""
+        team = models.Team[team_id]
+        plan_periods = select((count(pp), max_(pp.last_modified))
+                              for pp in models.PlanPeriod if pp.team.id == team_id).get()
+        return _project_version(team.dispatcher.project.id), plan_periods
+
+    @staticmethod
+    @cache.metadata_cache.cached('planperiods_of_team')
+    @db_session
+    def get_planperiods_of_team(team_id: UUID, version: tuple | None = None) -> list[schemas.PlanPeriod]:
+        """version aus get_planperiods_of_team_version(), nur Teil des Cache-Schlüssels
+        (siehe Team.get_teams_of_dispatcher())."""
         planperiods = models.Team[team_id].plan_periods
         return [schemas.PlanPeriod.model_validate(pp) for pp in planperiods]
 
+    @staticmethod
+    @cache.metadata_cache.cached('plan_period_index')
+    @db_session
+    def get_plan_period_index(team_id: UUID) -> PlanPeriodIndex:
+        """Intervall-Index der Planperioden des Teams (utilities/plan_period_index.py). Wird beim Anlegen, Ändern
+        und Löschen von Planperioden invalidiert."""
+        return PlanPeriodIndex([PlanPeriodInterval(pp.start, pp.end, pp.id, pp.deadline, pp.notes, pp.closed)
+                                for pp in select(pp for pp in models.PlanPeriod if pp.team.id == team_id)])
+
     @staticmethod
     @db_session
     def get_notes_and_deadline(date_start: datetime.date, date_end: datetime.date, user_id: UUID):
-        team_db = models.Person[user_id].team_of_actor
-        plan_period_db = models.PlanPeriod.select(
-            lambda pp: pp.start == date_start and pp.end == date_end and pp.team == team_db).first()
-        return plan_period_db.notes, plan_period_db.deadline, plan_period_db.id
+        plan_period = _plan_period_of_actor(user_id, date_start)
+        if plan_period is None or plan_period.start != date_start or plan_period.end != date_end:
+            raise ValueError(f'Keine Planperiode vom {date_start.strftime("%d.%m.%Y")} '
+                             f'bis {date_end.strftime("%d.%m.%Y")} gefunden.')
+        return plan_period.notes, plan_period.deadline, plan_period.id
 
     @staticmethod
     @db_session
@@ -335,13 +666,17 @@ class PlanPeriod:
 
         planperiod_db.set(start=planperiod.start, end=planperiod.end, deadline=planperiod.deadline,
                           closed=planperiod.closed, notes=planperiod.notes)
+        commit()
+        cache.metadata_cache.invalidate('planperiods_of_team', 'plan_period_index')
+        cache.selection_cache.clear()
 
         return schemas.PlanPeriod.model_validate(planperiod_db)
 
     @staticmethod
     @db_session
     def create_new_plan_period(team_id: UUID, date_start: datetime.date | None, date_end: datetime.date,
-                               deadline: datetime.date, notes: str, plan_period_id: UUID | None):
+                               deadline: datetime.date, notes: str, plan_period_id: UUID | None,
+                               remainder: bool = False):
         max_date: datetime.date | None = None
         if planperiods := models.PlanPeriod.select(lambda pp: pp.team.id == team_id):
             max_date: datetime.date = max(pp.end for pp in planperiods)
@@ -357,10 +692,13 @@ class PlanPeriod:
             raise ValueError('Das Enddatum darf nicht vor dem Startdatum liegen.')
         if plan_period_id:
             plan_period = models.PlanPeriod(id=plan_period_id, start=date_start, end=date_end, deadline=deadline,
-                                            notes=notes, team=models.Team.get(lambda t: t.id == team_id))
+                                            notes=notes, remainder=remainder,
+                                            team=models.Team.get(lambda t: t.id == team_id))
         else:
             plan_period = models.PlanPeriod(start=date_start, end=date_end, deadline=deadline, notes=notes,
-                                            team=models.Team.get(lambda t: t.id == team_id))
+                                            remainder=remainder, team=models.Team.get(lambda t: t.id == team_id))
+        commit()
+        cache.metadata_cache.invalidate('planperiods_of_team', 'plan_period_index')
         return schemas.PlanPeriod.model_validate(plan_period)
 
     @staticmethod
@@ -374,6 +712,9 @@ class PlanPeriod:
         planperiod_to_delete = models.PlanPeriod[planperiod_id]
         deleted_planperiod = schemas.PlanPeriod.model_validate(planperiod_to_delete)
         planperiod_to_delete.delete()
+        commit()
+        cache.metadata_cache.invalidate('planperiods_of_team', 'plan_period_index')
+        cache.selection_cache.clear()
         return deleted_planperiod
 
 
@@ -381,11 +722,29 @@ class Availables:
     @staticmethod
     @db_session
     def get_not_feedbacked_availables(plan_period_id: str) -> list[schemas.Person]:
-        persons_with_availables = list([availables.person for availables in models.PlanPeriod[UUID(plan_period_id)].availabless
-                                        if (availables.notes or availables.avail_days)])
-        persons_without_availables = [person for person in models.PlanPeriod[UUID(plan_period_id)].team.actors
-                                      if person not in persons_with_availables]
-        return [schemas.Person.model_validate(p) for p in persons_without_availables]
+        plan_period_id = UUID(plan_period_id)
+        return Availables.get_not_feedbacked_availables_of_plan_periods([plan_period_id])[plan_period_id]
+
+    @staticmethod
+    @db_session
+    def get_not_feedbacked_availables_of_plan_periods(
+            plan_period_ids: list[UUID]) -> dict[UUID, list[schemas.Person]]:
+        """Actors der Teams der Planperioden, die in der jeweiligen Planperiode weder Anmerkungen noch AvailDays
+        eingetragen haben. Eine Abfrage mit NOT EXISTS für alle Planperioden, danach werden die Personen und ihre
+        Projekte mit je einer weiteren Abfrage geladen."""
+        pairs = select((pp.id, p.id) for pp in models.PlanPeriod for p in models.Person
+                       if pp.id in plan_period_ids and p.team_of_actor == pp.team
+                       and not exists(a for a in models.Availables
+                                      if a.person == p and a.plan_period == pp
+                                      and (a.notes or exists(ad for ad in models.AvailDay if ad.availables == a))))[:]
+        person_ids = list({person_id for _, person_id in pairs})
+        persons = {p.id: schemas.Person.model_validate(p)
+                   for p in select(p for p in models.Person if p.id in person_ids).prefetch(models.Person.project)}
+
+        not_feedbacked: dict[UUID, list[schemas.Person]] = {pp_id: [] for pp_id in plan_period_ids}
+        for pp_id, person_id in sorted(pairs, key=lambda pair: (persons[pair[1]].f_name, persons[pair[1]].l_name)):
+            not_feedbacked[pp_id].append(persons[person_id])
+        return not_feedbacked
 
     @staticmethod
     @db_session
@@ -398,46 +757,154 @@ class Availables:
     @staticmethod
     @db_session
     def update_notes_for_person_planperiod(person_id: UUID, plan_period_id: UUID, notes: str):
-        availables_in_db = models.Availables.get(
-            lambda a: a.person == models.Person[person_id] and a.plan_period == models.PlanPeriod[plan_period_id])
-        if not availables_in_db:
-            availables_in_db = models.Availables(
-                plan_period=models.PlanPeriod[plan_period_id], person=models.Person[person_id])
-        availables_in_db.notes = notes
-        return schemas.AvailablesShow.model_validate(availables_in_db)
+        availables_id = _upsert_availables(person_id, plan_period_id, notes or '')
+        return schemas.AvailablesShow.model_validate(models.Availables[availables_id])
 
 
 class APSchedulerJob:
     @staticmethod
     @db_session
-    def get_scheduler_jobs() -> list[schemas.APSchedulerJob]:
-        jobs_db = models.APSchedulerJob.select()
-        return [schemas.APSchedulerJob.model_validate(job) for job in jobs_db]
+    def get_job_state(job_id: str) -> bytes | None:
+        job_db = models.SchedulerJob.get(id=job_id)
+        return bytes(job_db.job_state) if job_db else None
+
+    @staticmethod
+    @db_session
+    def get_job_states(max_next_run_time: float | None = None) -> list[tuple[str, bytes]]:
+        """Zustände aller Jobs bzw. der bis max_next_run_time fälligen Jobs, sortiert nach next_run_time."""
+        jobs_db = models.SchedulerJob.select()
+        if max_next_run_time is not None:
+            jobs_db = jobs_db.filter(lambda j: j.next_run_time <= max_next_run_time)
+        return [(j.id, bytes(j.job_state)) for j in jobs_db.order_by(models.SchedulerJob.next_run_time)]
+
+    @staticmethod
+    @db_session
+    def get_next_run_time() -> float | None:
+        return select(j.next_run_time for j in models.SchedulerJob if j.next_run_time is not None).min()
+
+    @staticmethod
+    @db_session
+    def add_job_state(job_id: str, next_run_time: float | None, job_state: bytes,
+                      plan_period_id: UUID | None) -> bool:
+        """Gibt False zurück, wenn es schon einen Job mit job_id gibt. INSERT ... ON CONFLICT DO NOTHING, damit auch
+        zwei Prozesse, die denselben Job gleichzeitig anlegen, keinen IntegrityError bekommen."""
+        return _insert_many(models.SchedulerJob,
+                            [{'id': job_id, 'next_run_time': next_run_time, 'job_state': job_state,
+                              'plan_period_id': plan_period_id}],
+                            ignore_conflicts=True) > 0
+
+    @staticmethod
+    @db_session
+    def update_job_state(job_id: str, next_run_time: float | None, job_state: bytes) -> bool:
+        if not (job_db := models.SchedulerJob.get_for_update(id=job_id)):
+            return False
+        job_db.set(next_run_time=next_run_time, job_state=job_state)
+        return True
+
+    @staticmethod
+    @db_session
+    def delete_job_state(job_id: str) -> bool:
+        return bool(models.SchedulerJob.select(lambda j: j.id == job_id).delete(bulk=True))
 
     @staticmethod
     @db_session
-    def add_job_to_db(job: apscheduler.job.Job):
-        print(f'add_job_to_db: {job=}')
-        planperiod_db = models.PlanPeriod[UUID(job.id)]
-        pickled_job = pickle.dumps(job)
-        models.APSchedulerJob(plan_period=planperiod_db, job=pickled_job)
+    def delete_all_job_states():
+        models.SchedulerJob.select().delete(bulk=True)
+
+
+class DeadlineReminder:
+    @staticmethod
+    @db_session
+    def get_due_plan_periods(day: datetime.date) -> list[schemas.PlanPeriod]:
+        """Offene Planperioden aller Teams mit Remainder und Deadline day, für deren Deadline noch keine Remainder
+        verschickt wurden. Eine Abfrage, Team und Dispatcher werden mitgeladen."""
+        plan_periods = select(pp for pp in models.PlanPeriod
+                              if pp.remainder and not pp.closed and pp.deadline == day
+                              and not exists(r for r in models.DeadlineReminder
+                                             if r.plan_period == pp and r.deadline == pp.deadline))
+        return [schemas.PlanPeriod.model_validate(pp)
+                for pp in plan_periods.prefetch(models.PlanPeriod.team, models.Team.dispatcher)]
 
     @staticmethod
     @db_session
-    def update_job_in_db(job: apscheduler.job.Job):
-        job_db = next((j for j in models.APSchedulerJob.select() if job.id == str(j.plan_period.id)), None)
-        job_db.job = pickle.dumps(job)
+    def complete(plan_period_id: UUID, deadline: datetime.date, recipients: int, msgs: list[Message]) -> bool:
+        """Trägt die Remainder der Planperiode zur Deadline ein und legt die Mails im Spool ab, beides in einer
+        Transaktion. Existiert der Eintrag schon (Neustart, zweiter Prozess), wird nichts abgelegt und False
+        geliefert."""
+        if not _insert_many(models.DeadlineReminder,
+                            [{'id': uuid4(), 'plan_period': plan_period_id, 'deadline': deadline,
+                              'sent_at': datetime.datetime.utcnow(), 'recipients': recipients}],
+                            ignore_conflicts=True):
+            return False
+        OutgoingMail.enqueue(msgs)
+        return True
+
 
+class SchedulerLease:
     @staticmethod
     @db_session
-    def delete_job_from_db(job_id: str):
-        plan_period_db = models.PlanPeriod.get(id=UUID(job_id))
-        jobs_db_to_delete = models.APSchedulerJob.select(lambda asp: asp.plan_period == plan_period_db)
-        for job_db_to_delete in jobs_db_to_delete:
-            job_db_to_delete.delete()
-        jobs_db_to_delete = [schemas.APSchedulerJob.model_validate(jd) for jd in jobs_db_to_delete]
-        return jobs_db_to_delete
+    def acquire(name: str, owner: str, lease_seconds: float) -> bool:
+        """Übernimmt oder verlängert die Lease. Liefert False, solange ein anderer Besitzer eine gültige Lease hält."""
+        now = datetime.datetime.utcnow()
+        expires_at = now + datetime.timedelta(seconds=lease_seconds)
+        lease = models.SchedulerLease.get_for_update(name=name)
+        if lease is None:
+            models.SchedulerLease(name=name, owner=owner, expires_at=expires_at)
+            return True
+        if lease.owner != owner and lease.expires_at > now:
+            return False
+        lease.set(owner=owner, expires_at=expires_at)
+        return True
 
+    @staticmethod
+    @db_session
+    def release(name: str, owner: str):
+        lease = models.SchedulerLease.get_for_update(name=name)
+        if lease and lease.owner == owner:
+            lease.delete()
+
+
+class OutgoingMail:
+    @staticmethod
+    @db_session
+    def enqueue(msgs: list[Message]) -> list[UUID]:
+        """Die Mails werden sofort committet (auch innerhalb einer Request-Session), damit die benachrichtigten
+        Worker sie finden."""
+        mail_ids = [models.OutgoingMail(send_to=msg['To'], subject=msg['Subject'], message=msg.as_string()).id
+                    for msg in msgs]
+        commit()
+        return mail_ids
+
+    @staticmethod
+    @db_session
+    def claim_due_mails(limit: int, lease: datetime.timedelta) -> list[schemas.OutgoingMail]:
+        """Reserviert bis zu limit fällige Mails für einen Worker. Mails im Status 'sending', deren Reservierung
+        abgelaufen ist (z.B. weil der Worker abgestürzt ist), werden erneut vergeben."""
+        now = datetime.datetime.utcnow()
+        statuses = [MailStatus.pending.value, MailStatus.sending.value]
+        mails = (models.OutgoingMail.select(lambda m: m.status in statuses and m.next_attempt_at <= now)
+                 .order_by(lambda m: m.next_attempt_at).for_update(skip_locked=True)[:limit])
+        for mail in mails:
+            mail.set(status=MailStatus.sending.value, next_attempt_at=now + lease)
+        return [schemas.OutgoingMail.model_validate(m) for m in mails]
+
+    @staticmethod
+    @db_session
+    def mark_sent(mail_id: UUID):
+        models.OutgoingMail[mail_id].set(status=MailStatus.sent.value, sent_at=datetime.datetime.utcnow(),
+                                         last_error='')
+
+    @staticmethod
+    @db_session
+    def mark_failed(mail_id: UUID, error: str, max_attempts: int, retry_delay: datetime.timedelta):
+        """Nach einem fehlgeschlagenen Versuch wird die Mail mit exponentiell wachsender Wartezeit erneut eingeplant,
+        nach max_attempts Versuchen endgültig als 'failed' markiert."""
+        mail = models.OutgoingMail[mail_id]
+        mail.attempts += 1
+        mail.last_error = error
+        if mail.attempts >= max_attempts:
+            mail.status = MailStatus.failed.value
+        else:
+            mail.status = MailStatus.pending.value
+            mail.next_attempt_at = datetime.datetime.utcnow() + retry_delay * 2 ** (mail.attempts - 1)
 
-# todo: get_not_feedbacked_availables verbessern, sodass alle personen gelistet werden, die noch keine Einträge
-#  in Terminen oder Notes gemacht haben.
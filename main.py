@@ -1,3 +1,4 @@
+import datetime
 from contextlib import asynccontextmanager
 
 import uvicorn
@@ -5,27 +6,39 @@ import uvicorn
 from fastapi import FastAPI
 from fastapi.staticfiles import StaticFiles
 
-from databases import database, services
+from databases import database
 from routers import auth, actors, supervisor, admin, dispatcher, index, actors_new
+from utilities import mail_queue, reminders
+from utilities.password_service import password_service
 from utilities.scheduler import scheduler
-from databases import schemas
+from utilities.scheduler_leader import SchedulerLeader
+
+
+scheduler_leader = SchedulerLeader(scheduler)
 
 
 def scheduler_startup():
-    scheduler.start()
+    """Die Jobs liegen im PonyJobStore und werden vom Scheduler bei Fälligkeit geladen. Der Job für die Remainder
+    zur Deadline (utilities/reminders.py) läuft periodisch und zusätzlich gleich nach dem Start.
+    Der Scheduler startet pausiert und führt Jobs erst aus, wenn dieser Prozess die Leader-Lease hält."""
+    scheduler.start(paused=True)
     print('scheduler started', flush=True)
-    jobs: list[schemas.APSchedulerJob] = services.APSchedulerJob.get_scheduler_jobs()
-    print(f'To load: {[asj.job.__getstate__() for asj in jobs]}', flush=True)
-    for job in jobs:
-        scheduler.add_job(**job.job.__getstate__())
-        print(f'geladene Jobs: {[j.__getstate__() for j in scheduler.get_jobs()]}', flush=True)
+    scheduler.add_job(func=reminders.tick, trigger='interval', minutes=reminders.TICK_MINUTES, id=reminders.JOB_ID,
+                      next_run_time=datetime.datetime.now(reminders.TIMEZONE), max_instances=1, coalesce=True,
+                      replace_existing=True)
+    scheduler_leader.start()
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     database.start_db()
+    database.configure_connection_limit()
     scheduler_startup()
+    mail_queue.start_workers()
     yield
+    scheduler_leader.stop()
+    mail_queue.stop_workers()
+    password_service.shutdown()
 
 
 app = FastAPI(lifespan=lifespan)
@@ -1,12 +1,14 @@
+import time
 from datetime import datetime, timedelta
 from fastapi import Depends, HTTPException, status, Request
 from fastapi.security.oauth2 import OAuth2PasswordBearer
 from jose import JWTError, jwt
 
-from databases import schemas, services
+from databases import schemas, services, async_services
 from databases.enums import AuthorizationTypes
 from settings import settings
-from utilities import utils
+from utilities.cache import principal_cache
+from utilities.password_service import password_service
 
 SECRET_KEY = settings.secret_key
 ALGORITHM = settings.algorithm
@@ -30,25 +32,66 @@ def create_access_token(data: dict) -> str:
     return encoded_jwt
 
 
-def verify_access_token(token: str, role: AuthorizationTypes=None) -> schemas.TokenData:
+def decode_access_token(token: str) -> dict:
     try:
-        payload = jwt.decode(token=token, key=SECRET_KEY, algorithms=ALGORITHM)
-        if not (u_id := payload.get('user_id')):
-            raise credentials_exception
-        if role and role.value not in payload['roles']:
-            raise credentials_exception
-        token_data = schemas.TokenData(id=u_id, authorizations=payload['roles'])
+        return jwt.decode(token=token, key=SECRET_KEY, algorithms=ALGORITHM)
     except JWTError:
         raise credentials_exception
-    return token_data
+
+
+def token_data_from_claims(claims: dict, role: AuthorizationTypes = None) -> schemas.TokenData:
+    if not (u_id := claims.get('user_id')):
+        raise credentials_exception
+    if role and role.value not in claims['roles']:
+        raise credentials_exception
+    return schemas.TokenData(id=u_id, authorizations=claims['roles'], exp=claims.get('exp'))
+
+
+def verify_access_token(token: str, role: AuthorizationTypes=None) -> schemas.TokenData:
+    return token_data_from_claims(decode_access_token(token), role)
 
 
 def get_current_user_cookie(request: Request, token_key: str, role: AuthorizationTypes | None):
+    """Das Token wird pro Request nur einmal dekodiert, die Claims werden in request.state gemerkt.
+    Die Rollenprüfung findet bei jedem Aufruf statt."""
     token: str | None = request.cookies.get(token_key)
     if not token:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail='you have to log in first')
 
-    return verify_access_token(token, role)
+    decoded_tokens: dict[str, dict] = getattr(request.state, 'decoded_tokens', None)
+    if decoded_tokens is None:
+        decoded_tokens = request.state.decoded_tokens = {}
+    if token not in decoded_tokens:
+        decoded_tokens[token] = decode_access_token(token)
+
+    return token_data_from_claims(decoded_tokens[token], role)
+
+
+def get_current_user(request: Request, token_data: schemas.TokenData) -> schemas.PersonShow:
+    """Liefert den Benutzer zum Token. Innerhalb eines Requests wird er in request.state gemerkt,
+    über Requests hinweg im principal_cache unter (user_id, exp) - höchstens bis zum Ablauf des Tokens.
+    Änderungen an der Person invalidieren den Cache (services.Person)."""
+    principal = getattr(request.state, 'principal', None)
+    if principal is not None and str(principal.id) == str(token_data.id):
+        return principal
+
+    key = (str(token_data.id), token_data.exp)
+    if (principal := principal_cache.get(key)) is None:
+        principal = services.Person.get_user_by_id(token_data.id)
+        remaining = token_data.exp - time.time() if token_data.exp else None
+        if principal is not None and (remaining is None or remaining > 0):
+            principal_cache.set(key, principal, ttl=remaining)
+    request.state.principal = principal
+    return principal
+
+
+def get_current_principal(request: Request) -> schemas.PersonShow | None:
+    """FastAPI-Dependency für Seiten mit Cookie-Login: der eingeloggte Benutzer oder None."""
+    try:
+        token_data = get_current_user_cookie(request, 'hcc_plan_auth', None)
+    except HTTPException:
+        return None
+    return get_current_user(request, token_data)
 
 
 def get_authorization_types(user: schemas.PersonShow) -> list[AuthorizationTypes]:
@@ -62,15 +105,19 @@ def get_authorization_types(user: schemas.PersonShow) -> list[AuthorizationTypes
     return auth_types
 
 
-def authenticate_user(username: str, passwort: str) -> schemas.PersonShow | str:
+async def authenticate_user(username: str, passwort: str) -> schemas.PersonShow | str:
+    """bcrypt läuft im Thread-Pool des password_service, damit der Event-Loop frei bleibt.
+    Entspricht der gespeicherte Hash nicht mehr der Hash-Policy, wird er nach erfolgreicher Prüfung ersetzt."""
     if username == SUPERVISOR_USERNAME:
-        if utils.verify(passwort, SUPERVISOR_PASSWORD):
+        if await password_service.verify(passwort, SUPERVISOR_PASSWORD):
             return 'supervisor'
-    if not (user := services.Person.find_user_by_email(email=username)):
+    if not (user := await async_services.Person.find_user_by_email(email=username)):
         raise credentials_exception
-    if not utils.verify(passwort, user.password):
+    valid, new_hash = await password_service.verify_and_update(passwort, user.password)
+    if not valid:
         raise credentials_exception
-    print(f'{user=}', flush=True)
+    if new_hash:
+        await async_services.Person.update_password_hash(user.id, new_hash)
     return user
 
 
@@ -219,9 +219,33 @@ class MainFrame(ttk.Frame):
 
 
 class HelperRequests:
+    # Letzte Antworten der bedingten GET-Requests, Schlüssel: (url, params, Authorization-Header)
+    _etag_cache: dict[tuple, requests.Response] = {}
+    _etag_cache_lock = threading.Lock()
+
     def __init__(self):
         pass
 
+    @classmethod
+    def get_conditional(cls, url: str, params: dict = None, headers: dict = None) -> requests.Response:
+        """GET mit If-None-Match. Antwortet der Server mit 304 Not Modified, wird die zwischengespeicherte
+        Antwort zurückgegeben, die Daten werden dann weder übertragen noch vom Server serialisiert."""
+        headers = dict(headers or {})
+        key = (url, tuple(sorted((params or {}).items())), headers.get('Authorization'))
+        with cls._etag_cache_lock:
+            cached = cls._etag_cache.get(key)
+        if cached is not None:
+            headers['If-None-Match'] = cached.headers['ETag']
+        response = requests.get(url, params=params, headers=headers)
+        if response.status_code == 304 and cached is not None:
+            return cached
+        with cls._etag_cache_lock:
+            if response.ok and 'ETag' in response.headers:
+                cls._etag_cache[key] = response
+            else:
+                cls._etag_cache.pop(key, None)
+        return response
+
     @classmethod
     def get_all_actors(cls, parent, host: str, access_token: str) -> list[schemas.PersonShow]:
         response = requests.get(f'{host}/dispatcher/actors',
@@ -234,8 +258,8 @@ class HelperRequests:
 
     @classmethod
     def get_teams_dispatcher(cls, parent, host: str, access_token: str):
-        response = requests.get(f'{host}/dispatcher/teams',
-                                headers={'Authorization': f'Bearer {access_token}'})
+        response = HelperRequests.get_conditional(f'{host}/dispatcher/teams',
+                                                  headers={'Authorization': f'Bearer {access_token}'})
         try:
             return sorted([schemas.Team(**t) for t in response.json()], key=lambda t: t.name)
         except Exception as e:
@@ -243,8 +267,8 @@ class HelperRequests:
 
     @staticmethod
     def get_teams_admin(parent, host: str, access_token):
-        response = requests.get(f'{host}/admin/teams',
-                                headers={'Authorization': f'Bearer {access_token}'})
+        response = HelperRequests.get_conditional(f'{host}/admin/teams',
+                                                  headers={'Authorization': f'Bearer {access_token}'})
         data = response.json()
         try:
             teams = [schemas.Team.parse_obj(team) for team in data]
@@ -254,9 +278,9 @@ class HelperRequests:
 
     @classmethod
     def get_planperiods(cls, parent, host: str, access_token: str, team_id: str):
-        response = requests.get(f'{host}/dispatcher/planperiods',
-                                params={'team_id': team_id},
-                                headers={'Authorization': f'Bearer {access_token}'})
+        response = HelperRequests.get_conditional(f'{host}/dispatcher/planperiods',
+                                                  params={'team_id': team_id},
+                                                  headers={'Authorization': f'Bearer {access_token}'})
         try:
             planperiods = sorted([schemas.PlanPeriod(**pp) for pp in response.json()], key=lambda v: v.start, reverse=True)
             return planperiods
@@ -757,8 +781,8 @@ class ChangePersonNames(CommonTopLevel):
         self.bt_cancel.grid(row=0, column=1, padx=(5, 0))
 
     def get_persons(self) -> list[schemas.PersonShow] | None:
-        response = requests.get(f'{self.parent.host}/admin/persons',
-                                headers={'Authorization': f'Bearer {self.access_token}'})
+        response = HelperRequests.get_conditional(f'{self.parent.host}/admin/persons',
+                                                  headers={'Authorization': f'Bearer {self.access_token}'})
         try:
             all_persons: list[schemas.PersonShow] = sorted([schemas.PersonShow(**p)
                                                        for p in response.json()], key=lambda p: p.f_name)
@@ -963,8 +987,8 @@ class AssignPersonToPosition(CommonTopLevel):
                         self.vars_all_checks_team[id_team].set(False)
 
     def get_persons(self):
-        response = requests.get(f'{self.parent.host}/admin/persons',
-                                headers={'Authorization': f'Bearer {self.access_token}'})
+        response = HelperRequests.get_conditional(f'{self.parent.host}/admin/persons',
+                                                  headers={'Authorization': f'Bearer {self.access_token}'})
         try:
             all_persons = sorted([schemas.PersonShow(**p) for p in response.json()], key=lambda p: p.f_name)
             return all_persons
@@ -972,8 +996,8 @@ class AssignPersonToPosition(CommonTopLevel):
             return response.json(), e
 
     def get_teams(self):
-        response = requests.get(f'{self.parent.host}/admin/teams',
-                                headers={'Authorization': f'Bearer {self.access_token}'})
+        response = HelperRequests.get_conditional(f'{self.parent.host}/admin/teams',
+                                                  headers={'Authorization': f'Bearer {self.access_token}'})
         data = response.json()
         if type(data) == dict and data.get('status_code') == 401:
             tk.messagebox.showerror(parent=self, message='Nicht authorisiert!')
@@ -1080,8 +1104,8 @@ class DeletePerson(CommonTopLevel):
         self.destroy()
 
     def get_persons(self):
-        response = requests.get(f'{self.parent.host}/admin/persons',
-                                headers={'Authorization': f'Bearer {self.access_token}'})
+        response = HelperRequests.get_conditional(f'{self.parent.host}/admin/persons',
+                                                  headers={'Authorization': f'Bearer {self.access_token}'})
         try:
             all_persons = sorted([schemas.PersonShow(**p) for p in response.json()], key=lambda p: p.f_name)
             return all_persons
@@ -1249,9 +1273,9 @@ class GetAvailDays(CommonTopLevel):
             tk.messagebox.showerror(parent=self, message='Bitte zuerst eine Planperiode auswählen.')
             return
         planperiod_id = self.all_planperiods[self.var_combo_planperiods.get()].id
-        response = requests.get(f'{self.host}/dispatcher/avail_days',
-                                params={'planperiod_id': planperiod_id},
-                                headers={'Authorization': f'Bearer {self.access_token}'})
+        response = HelperRequests.get_conditional(f'{self.host}/dispatcher/avail_days',
+                                                  params={'planperiod_id': planperiod_id},
+                                                  headers={'Authorization': f'Bearer {self.access_token}'})
         avail_days = response.json()
         try:
             avail_days = {person_id: {'days': [schemas.AvailDay.parse_obj(ad) for ad in av_days['days']], 'notes': av_days['notes']}
@@ -1320,8 +1344,8 @@ class CreateTeam(CommonTopLevel):
         self.destroy()
 
     def get_persons(self):
-        response = requests.get(f'{self.parent.host}/admin/persons',
-                                headers={'Authorization': f'Bearer {self.access_token}'})
+        response = HelperRequests.get_conditional(f'{self.parent.host}/admin/persons',
+                                                  headers={'Authorization': f'Bearer {self.access_token}'})
         all_persons = sorted([schemas.Person(**p) for p in response.json()], key=lambda p: p.f_name)
         return all_persons
 
@@ -3,15 +3,16 @@ from fastapi.templating import Jinja2Templates
 from pydantic import EmailStr
 from starlette.responses import RedirectResponse
 
-from databases import services
+from databases import services, async_services
 from databases.enums import AuthorizationTypes
-from oauth2_authentication import get_current_user_cookie, verify_actor_username
+from oauth2_authentication import get_current_user_cookie, verify_actor_username, get_current_user
 from utilities import send_mail
+from utilities.request_session import DBSessionRoute
 from utilities.send_mail import send_confirmed_avail_days
 
 templates = Jinja2Templates(directory='templates')
 
-router = APIRouter(prefix='/actors', tags=['Actors'])
+router = APIRouter(prefix='/actors', tags=['Actors'], route_class=DBSessionRoute)
 
 
 @router.get('/plan-periods')
@@ -23,14 +24,14 @@ def actor_plan_periods(request: Request):
         return RedirectResponse(redirect_url, status_code=status.HTTP_303_SEE_OTHER)
     user_id = token_data.id
 
-    user = services.Person.get_user_by_id(user_id)
+    user = get_current_user(request, token_data)
     name_project = user.project.name
-    plan_per_et_filled_in = services.PlanPeriod.get_open_plan_periods(user_id)
+    plan_periods = services.PlanPeriod.get_open_plan_periods_of_actor(user_id)
 
     response = templates.TemplateResponse('index_actor.html',
                                           context={'request': request, 'name_project': name_project,
                                                    'f_name': user.f_name, 'l_name': user.l_name,
-                                                   'plan_periods': plan_per_et_filled_in, 'actor_id': user.id})
+                                                   'plan_periods': plan_periods})
 
     return response
 
@@ -49,17 +50,23 @@ async def actor_plan_periods_handler(request: Request):
     user_id = token_data.id
     formdata = await request.form()
 
-    plan_periods = services.AvailDay.available_days_to_db(dict(formdata), user_id)
+    plan_periods = await async_services.AvailDay.available_days_to_db(dict(formdata), user_id)
 
-    user = services.Person.get_user_by_id(user_id)
-
-    await send_confirmed_avail_days(user.id)
+    await send_confirmed_avail_days(user_id)
 
     return templates.TemplateResponse('alert_post_success.html', context={'request': request})
 
 
 @router.get('/new_passwort')
-def send_new_password(request: Request, user_email: EmailStr):
+def confirm_new_password(request: Request, user_email: str = ''):
+    """Frühere Links auf GET /actors/new_passwort zeigen nur noch eine Bestätigung an. Das Passwort wird erst mit
+    dem POST aus diesem Formular zurückgesetzt, GET-Endpunkte dürfen nicht schreiben (DBSessionRoute)."""
+    return templates.TemplateResponse('confirm_new_passwort.html',
+                                      context={'request': request, 'user_email': user_email})
+
+
+@router.post('/new_passwort')
+def send_new_password(request: Request, user_email: EmailStr = Form(...)):
     try:
         user = verify_actor_username(username=user_email)
         if not user:
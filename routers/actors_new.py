@@ -1,6 +1,4 @@
-import pprint
-from collections import defaultdict
-from datetime import date, timedelta, datetime
+from datetime import datetime
 from uuid import UUID
 
 from fastapi import HTTPException, status, APIRouter, Request, Depends, Form
@@ -8,15 +6,17 @@ from fastapi.templating import Jinja2Templates
 from pydantic import EmailStr
 from starlette.responses import RedirectResponse, JSONResponse, HTMLResponse
 
-from databases import services, schemas
+from databases import async_services, schemas
 from databases.enums import AuthorizationTypes, TimeOfDay
 from oauth2_authentication import get_current_user_cookie, verify_actor_username
 from utilities import send_mail
+from utilities.calendar_model import CalendarModel
+from utilities.request_session import DBSessionRoute
 from utilities.send_mail import send_confirmed_avail_days
 
 templates = Jinja2Templates(directory='templates')
 
-router = APIRouter(prefix='/actors_new', tags=['Actors'])
+router = APIRouter(prefix='/actors_new', tags=['Actors'], route_class=DBSessionRoute)
 
 
 # Globale Konstanten
@@ -57,92 +57,19 @@ period_translation = {
     "evening": "Abend"
 }
 
-# Globale Variablen
-selected_times: defaultdict[str, set] = defaultdict(set)  # Dictionary für ausgewählte Zeiten (später durch DB ersetzen)
-user_notes = {}  # Dictionary für Anmerkungen (später durch DB ersetzen)
-
 
 @router.get("/api/calendar-data", name="calendar_data", response_class=HTMLResponse)
 async def get_calendar_data(request: Request):
-    # Planungs-Perioden (müssen nach 'start' sortiert sein)
-    plan_periods = [
-        {'start': date(2024, 11, 1), 'end': date(2024, 11, 11), 'deadline': date(2024, 11, 10),
-         'message': 'Planungsperiode 1\nErledige deine Einträge bitte bis zur Deadline.'},
-        {'start': date(2024, 11, 12), 'end': date(2024, 11, 24), 'deadline': date(2024, 11, 23),
-         'message': 'Planungsperiode 2'},
-        {'start': date(2024, 11, 25), 'end': date(2024, 12, 10), 'deadline': date(2024, 12, 9),
-         'message': 'Planungsperiode 3'},
-        {'start': date(2024, 12, 11), 'end': date(2025, 1, 10), 'deadline': date(2025, 1, 9),
-         'message': 'Planungsperiode 4'},
-        {'start': date(2025, 1, 11), 'end': date(2025, 1, 20), 'deadline': date(2025, 1, 19),
-         'message': 'Planungsperiode 5'},
-        {'start': date(2025, 1, 21), 'end': date(2025, 2, 10), 'deadline': date(2025, 2, 9),
-         'message': 'Planungsperiode 6'},
-        {'start': date(2025, 2, 11), 'end': date(2025, 2, 20), 'deadline': date(2025, 2, 19),
-         'message': 'Planungsperiode 7'},
-        {'start': date(2025, 2, 21), 'end': date(2025, 3, 10), 'deadline': date(2025, 3, 9),
-         'message': 'Planungsperiode 8'},
-        {'start': date(2025, 3, 11), 'end': date(2025, 3, 20), 'deadline': date(2025, 3, 19),
-         'message': 'Planungsperiode 9'},
-        {'start': date(2025, 3, 21), 'end': date(2025, 4, 10), 'deadline': date(2025, 4, 9),
-         'message': 'Planungsperiode 10'},
-        {'start': date(2025, 4, 11), 'end': date(2025, 4, 20), 'deadline': date(2025, 4, 19),
-         'message': 'Planungsperiode 11'},
-        {'start': date(2025, 4, 21), 'end': date(2025, 5, 10), 'deadline': date(2025, 5, 9),
-         'message': 'Planungsperiode 12'},
-        {'start': date(2025, 5, 10), 'end': date(2025, 5, 31), 'deadline': date(2025, 5, 9),
-         'message': 'Planungsperiode 13'},
-        {'start': date(2025, 6, 1), 'end': date(2025, 6, 30), 'deadline': date(2025, 5, 9),
-         'message': 'Planungsperiode 14'},
-        {'start': date(2025, 7, 1), 'end': date(2025, 7, 31), 'deadline': date(2025, 6, 9),
-         'message': 'Planungsperiode 15'}, ]
-
-    # Tage aller Planperioden, gruppieren nach Monat und plan_periods
-    grouped_dates = {}
-    period_deadlines = {}
-    period_messages = {}  # Dictionary für die Mitteilungen
-    period_first_month = {}  # Speichert den ersten Monat jeder Periode
-
     token_data = get_current_user_cookie(request, 'hcc_plan_auth', AuthorizationTypes.actor)
     current_user_id = token_data.id
 
-    plan_period_and_filled_in = services.PlanPeriod.get_open_plan_periods(current_user_id)
-
-    for period in plan_period_and_filled_in:
-        text_plan_period = f'{period.plan_period.start.strftime("%d.%m.%y")} - {period.plan_period.end.strftime("%d.%m.%y")}'
-        period_deadlines[text_plan_period] = period.plan_period.deadline
-        period_messages[text_plan_period] = period.plan_period.notes
-        # Ersten Monat für jede Periode speichern
-        period_first_month[text_plan_period] = period.plan_period.start.month
-
-        for day in range((period.plan_period.end - period.plan_period.start).days + 1):
-            day_date = period.plan_period.start + timedelta(days=day)
-            if day_date.month not in grouped_dates:
-                grouped_dates[day_date.month] = {
-                    'year': day_date.year,
-                    'periods': {}
-                }
-            if text_plan_period not in grouped_dates[day_date.month]['periods']:
-                grouped_dates[day_date.month]['periods'][text_plan_period] = []
-            grouped_dates[day_date.month]['periods'][text_plan_period].append(day_date)
-
-    # Sortierte Perioden basierend auf der Startdatum
-    sorted_periods = sorted(list({period for periods in grouped_dates.values()
-                                  for period in periods['periods'].keys()}),
-                            key=lambda x: (x.split(' - ')[0].split('.')[2],
-                                           x.split(' - ')[0].split('.')[1],
-                                           x.split(' - ')[0].split('.')[0]))
-    pprint.pprint(sorted_periods)
+    # Offene Planperioden aus Sicht des Actors (enthalten dessen Tage/Tageszeiten)
+    plan_periods_of_actor = await async_services.PlanPeriod.get_open_plan_periods_of_actor(current_user_id)
+    calendar_model = CalendarModel(plan_periods_of_actor)
 
     return templates.TemplateResponse("calendar_new.html", {
         "request": request,
-        "grouped_dates": grouped_dates,
-        "period_deadlines": period_deadlines,
-        "period_messages": period_messages,
-        "period_first_month": period_first_month,  # Übergebe die Information über den ersten Monat
-        "selected_times": selected_times,  # Füge selected_times zum Template Context hinzu
-        "user_notes": user_notes,  # Füge user_notes zum Template Context hinzu
-        "sorted_periods": sorted_periods,  # Neue Variable für das Template,
+        **calendar_model.template_context(),
         "colors_times_of_day": colors_times_of_day,
         "period_translation": period_translation
     })
@@ -194,7 +121,7 @@ async def select_time_new(request: Request):
         form = await request.form()
         date = form.get("date")
         period = form.get("period")
-        print(f"select_time_new: {date}, {period}")
+        selected = form.get("selected")  # Zielzustand 'true'/'false', ohne Angabe wird umgeschaltet
 
         if not date or not period:
             return templates.TemplateResponse(
@@ -207,23 +134,15 @@ async def select_time_new(request: Request):
 
         date_object = datetime.strptime(date, "%Y-%m-%d").date()
         time_of_day = TimeOfDay[period]
-        print(f"select_time_new: {date_object}, {time_of_day}")
 
         token_data = get_current_user_cookie(request, 'hcc_plan_auth', AuthorizationTypes.actor)
         current_user_id = UUID(token_data.id)
 
-        # Toggle selection status
-        is_checked = False
-        if date in selected_times and period in selected_times[date]:
-            selected_times[date].remove(period)
-            services.AvailDay.delete_avail_day(current_user_id, date_object, time_of_day)
+        if selected is None:
+            is_checked = await async_services.AvailDay.toggle_selected_time(current_user_id, date_object, time_of_day)
         else:
-            if date not in selected_times:
-                selected_times[date] = set()
-            selected_times[date].add(period)
-            services.AvailDay.create_avail_day(current_user_id,
-                                               schemas.AvailDayCreate(day=date_object, time_of_day=time_of_day))
-            is_checked = True
+            is_checked = selected == 'true'
+            await async_services.AvailDay.set_selected_time(current_user_id, date_object, time_of_day, is_checked)
 
         curr_icon_color = colors_times_of_day[period]['checked' if is_checked else 'unchecked']
         curr_notification_colors = {
@@ -239,7 +158,7 @@ async def select_time_new(request: Request):
                 "date": date_object,
                 "period": period,
                 "period_translation": period_translation,
-                "checked": is_checked,
+                "is_checked": is_checked,
                 "curr_icon_color": curr_icon_color,
                 "curr_notification_colors": curr_notification_colors
             }
@@ -262,6 +181,18 @@ async def select_time_new(request: Request):
         )
 
 
+@router.post("/api/selection", name="save_selection_new", response_model=schemas.SelectionDiff)
+async def save_selection_new(request: Request, batch: schemas.SelectionBatch):
+    """Speichert die im Browser gesammelten Klicks einer Planperiode (siehe calendar_new.html) in einer
+    Transaktion und gibt die tatsächlich geänderten Zellen zurück."""
+    token_data = get_current_user_cookie(request, 'hcc_plan_auth', AuthorizationTypes.actor)
+    current_user_id = UUID(token_data.id)
+    try:
+        return await async_services.AvailDay.apply_selection(current_user_id, batch)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+
+
 @router.post("/load-period-notes-new")
 async def load_period_notes_new(request: Request):
     form = await request.form()
@@ -274,12 +205,9 @@ async def load_period_notes_new(request: Request):
     token_data = get_current_user_cookie(request, 'hcc_plan_auth', AuthorizationTypes.actor)
     current_user_id = UUID(token_data.id)
 
-    message, deadline, plan_period_id = services.PlanPeriod.get_notes_and_deadline(
+    message, deadline, plan_period_id = await async_services.PlanPeriod.get_notes_and_deadline(
         start_date, end_date, current_user_id)
-    notes = services.Availables.get_notes_from_person_planperiod(current_user_id, plan_period_id)
-
-
-    print(f'load_period_notes_new: notes: {notes}, deadline: {deadline}')
+    notes = await async_services.Availables.get_notes_from_person_planperiod(current_user_id, plan_period_id)
 
     if period:
         return templates.TemplateResponse(
@@ -303,7 +231,6 @@ async def save_notes_new(request: Request):
         period = form.get("period")
         notes = form.get("notes")
         success = True
-        print(f"save_notes_new: {period}, {notes}")
 
         # Validiere die Eingaben
         if not period:
@@ -315,12 +242,8 @@ async def save_notes_new(request: Request):
                 }
             )
 
-        # Speichere oder lösche die Anmerkung
-        if notes:
-            user_notes[period] = notes
-        else:
-            if period in user_notes:
-                del user_notes[period]
+        # Leere Anmerkungen löschen die gespeicherten Anmerkungen
+        if not notes:
             success = False
 
         start_date, end_date = period.split(' - ')
@@ -328,8 +251,9 @@ async def save_notes_new(request: Request):
         end_date = datetime.strptime(end_date, '%d.%m.%y').date()
         token_data = get_current_user_cookie(request, 'hcc_plan_auth', AuthorizationTypes.actor)
         current_user_id = UUID(token_data.id)
-        _, _, plan_period_id = services.PlanPeriod.get_notes_and_deadline(start_date, end_date, current_user_id)
-        services.Availables.update_notes_for_person_planperiod(current_user_id, plan_period_id, notes)
+        _, _, plan_period_id = await async_services.PlanPeriod.get_notes_and_deadline(
+            start_date, end_date, current_user_id)
+        await async_services.Availables.update_notes_for_person_planperiod(current_user_id, plan_period_id, notes)
 
 
 
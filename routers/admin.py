@@ -1,40 +1,52 @@
 import datetime
 from uuid import UUID
 
-from fastapi import APIRouter, HTTPException, status, Depends
+from fastapi import APIRouter, HTTPException, status, Depends, Request, Response
 
-from databases import schemas, services
+from databases import schemas, async_services
 from databases.enums import AuthorizationTypes
 from oauth2_authentication import verify_access_token, oauth2_scheme
+from utilities.conditional import Validators
+from utilities.request_session import DBSessionRoute
 
-router = APIRouter(prefix='/admin', tags=['Admin'])
+router = APIRouter(prefix='/admin', tags=['Admin'], route_class=DBSessionRoute)
 
 
 @router.get('/persons', response_model=list[schemas.PersonShow])
-async def get_persons(access_token: str = Depends(oauth2_scheme)):
+async def get_persons(request: Request, response: Response, access_token: str = Depends(oauth2_scheme)):
     try:
         token_data = verify_access_token(access_token, role=AuthorizationTypes.admin)
     except Exception as e:
         return HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail=f'Error: {e}')
     user_id = token_data.id
     try:
-        persons = services.Person.get_all_persons(user_id)
+        validators = Validators(('admin/persons', str(user_id)),
+                                await async_services.Project.get_version_from_user_id(user_id))
+        if validators.matches(request):
+            return validators.not_modified()
+        persons = await async_services.Person.get_all_persons(user_id)
     except Exception as e:
         return HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail=f'Error: {e}')
+    validators.apply(response)
     return persons
 
 
 @router.get('/teams', response_model=list[schemas.Team])
-async def get_teams(access_token: str = Depends(oauth2_scheme)):
+async def get_teams(request: Request, response: Response, access_token: str = Depends(oauth2_scheme)):
     try:
         token_data = verify_access_token(access_token, role=AuthorizationTypes.admin)
     except Exception as e:
         return HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail=f'Error: {e}')
     user_id = token_data.id
     try:
-        teams = services.Team.get_all_project_teams(user_id)
+        validators = Validators(('admin/teams', str(user_id)),
+                                await async_services.Project.get_version_from_user_id(user_id))
+        if validators.matches(request):
+            return validators.not_modified()
+        teams = await async_services.Team.get_all_project_teams(user_id)
     except Exception as e:
         return HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail=f'Error: {e}')
+    validators.apply(response)
     return teams
 
 
@@ -46,7 +58,7 @@ async def get_project(access_token: str = Depends(oauth2_scheme)):
         return HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail=f'Error: {e}')
     user_id = token_data.id
 
-    project = services.Project.get_project_from_user_id(user_id)
+    project = await async_services.Project.get_project_from_user_id(user_id)
     return project
 
 
@@ -59,7 +71,7 @@ async def update_projekt_name(new_name: str, access_token: str = Depends(oauth2_
     user_id = token_data.id
 
     try:
-        updated_project = services.Project.update_project_name(user_id=user_id, project_name=new_name)
+        updated_project = await async_services.Project.update_project_name(user_id=user_id, project_name=new_name)
     except Exception as e:
         return HTTPException(status_code=status.HTTP_409_CONFLICT, detail=f'Error: {e}')
     return updated_project
@@ -73,7 +85,7 @@ async def add_new_person(person: schemas.PersonCreate, access_token: str = Depen
         raise e
     user_id = token_data.id
     try:
-        new_person = services.Person.create_person(user_id, person)
+        new_person = await async_services.Person.create_person(user_id, person)
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_409_CONFLICT, detail=f'Error: {e}'
@@ -88,7 +100,7 @@ async def add_new_team(team: schemas.TeamCreate, person: dict, access_token: str
     except Exception as e:
         return HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail=f'Error: {e}')
     try:
-        new_team = services.Team.create_new_team(team=team, person_id=person['id'])
+        new_team = await async_services.Team.create_new_team(team=team, person_id=person['id'])
     except Exception as e:
         return HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
                              detail=f'Fehler: {e}')
@@ -104,7 +116,7 @@ async def update_a_person(person: schemas.PersonShow, access_token: str = Depend
     admin_id: UUID = token_data.id
 
     try:
-        updated_person = services.Person.update_person(person, admin_id)
+        updated_person = await async_services.Person.update_person(person, admin_id)
     except Exception as e:
         return HTTPException(status_code=status.HTTP_409_CONFLICT, detail=f'Error: {e}')
     return updated_person
@@ -119,7 +131,7 @@ async def delete_person(person_id: str, access_token: str = Depends(oauth2_schem
     admin_id: UUID = token_data.id
 
     try:
-        deleted_person = services.Person.delete_person_from_project(person_id=UUID(person_id))
+        deleted_person = await async_services.Person.delete_person_from_project(person_id=UUID(person_id))
     except Exception as e:
         return HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
                              detail=f'Fehler: {e}')
@@ -135,7 +147,8 @@ async def update_team(team_id: str, new_team_name: str, access_token: str = Depe
     admin_id: UUID = token_data.id
 
     try:
-        updated_team = services.Team.update_team_from_project(team_id=UUID(team_id), new_team_name=new_team_name)
+        updated_team = await async_services.Team.update_team_from_project(team_id=UUID(team_id),
+                                                                         new_team_name=new_team_name)
     except Exception as e:
         return HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
                              detail=f'Fehler: {e}')
@@ -151,7 +164,7 @@ async def delete_team(team_id: str, access_token: str = Depends(oauth2_scheme)):
     admin_id: UUID = token_data.id
 
     try:
-        deleted_team = services.Team.delete_team_from_project(team_id=UUID(team_id))
+        deleted_team = await async_services.Team.delete_team_from_project(team_id=UUID(team_id))
     except Exception as e:
         return HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
                              detail=f'Fehler: {e}')
@@ -167,7 +180,7 @@ async def delete_account(project_id: str, access_token: str = Depends(oauth2_sch
     admin_id: UUID = token_data.id
 
     try:
-        deleted_account = services.Project.delete_a_account(project_id=UUID(project_id))
+        deleted_account = await async_services.Project.delete_a_account(project_id=UUID(project_id))
     except Exception as e:
         return HTTPException(status_code=status.HTTP_406_NOT_ACCEPTABLE, detail=f'Error: {e}')
     return deleted_account
@@ -6,14 +6,15 @@ from fastapi.security.oauth2 import OAuth2PasswordRequestForm
 from databases import schemas
 from databases.enums import AuthorizationTypes
 from oauth2_authentication import authenticate_user, create_access_token, get_authorization_types
+from utilities.request_session import DBSessionRoute
 
-router = APIRouter(tags=['Authentication'])
+router = APIRouter(tags=['Authentication'], route_class=DBSessionRoute)
 
 
 @router.post('/token')
 async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends()):
     try:
-        user = authenticate_user(form_data.username, form_data.password)
+        user = await authenticate_user(form_data.username, form_data.password)
     except Exception as e:
         raise e
     if user == 'supervisor':
@@ -29,7 +30,7 @@ async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(
 @router.post('/user-login-from-clown-control', status_code=status.HTTP_200_OK)
 async def user_login_from_clown_control(form_data: OAuth2PasswordRequestForm = Depends()):
     try:
-        user = authenticate_user(form_data.username, form_data.password)
+        user = await authenticate_user(form_data.username, form_data.password)
     except Exception as e:
         raise e
     auth_types = get_authorization_types(user)
@@ -1,19 +1,21 @@
+import csv
 import datetime
+import io
+import json
+from typing import Iterable, Iterator, Literal
 from uuid import UUID
-import pytz  # Neuer Import für Zeitzonen
 
-from fastapi import APIRouter, HTTPException, status, Depends
+from fastapi import APIRouter, HTTPException, status, Depends, Query, Request, Response
+from fastapi.responses import StreamingResponse
 
-from databases import schemas, services
+from databases import schemas, services, async_services
 from databases.enums import AuthorizationTypes
 from oauth2_authentication import verify_access_token, oauth2_scheme
-from utilities.scheduler import scheduler
-from utilities.send_mail import send_remainder_deadline, send_avail_days_to_actors
+from utilities.conditional import Validators
+from utilities.request_session import DBSessionRoute
+from utilities.send_mail import send_avail_days_to_actors
 
-# Konstante für die Zeitzone definieren
-TIMEZONE = pytz.timezone('Europe/Berlin')
-
-router = APIRouter(prefix='/dispatcher', tags=['Dispatcher'])
+router = APIRouter(prefix='/dispatcher', tags=['Dispatcher'], route_class=DBSessionRoute)
 
 
 @router.get('/project')
@@ -44,33 +46,12 @@ async def new_planperiod(team_id: str, date_start: str, date_end: str, deadline:
     date_end = datetime.date(*[int(v) for v in date_end.split('-')])
     deadline = datetime.date(*[int(v) for v in deadline.split('-')])
     try:
-        new_plan_period = services.PlanPeriod.create_new_plan_period(
+        new_plan_period = await async_services.PlanPeriod.create_new_plan_period(
             UUID(team_id), date_start, date_end, deadline,
-            notes, UUID(plan_period_id) if plan_period_id else None)
+            notes, UUID(plan_period_id) if plan_period_id else None, remainder)
     except ValueError as e:
         return HTTPException(status_code=status.HTTP_409_CONFLICT, detail=f'Fehler: {e}')
-    if remainder:
-        try:
-            scheduler.remove_job(str(new_plan_period.id))
-        except Exception as e:
-            print(f'Job nicht vorhanden: {e}')
-        try:
-            services.APSchedulerJob.delete_job_from_db(str(new_plan_period.id))
-        except Exception as e:
-            print(f'Job nicht in DB vorhanden: {e}')
-        
-        # Naive datetime erstellen
-        naive_date = datetime.datetime(new_plan_period.deadline.year, 
-                                      new_plan_period.deadline.month,
-                                      new_plan_period.deadline.day,
-                                       hour=0, minute=0, second=0)
-        # Zeitzone hinzufügen
-        run_date = TIMEZONE.localize(naive_date)
-        
-        job = scheduler.add_job(func=send_remainder_deadline, trigger='date', run_date=run_date,
-                                id=str(new_plan_period.id), args=[str(new_plan_period.id)])
-        services.APSchedulerJob.add_job_to_db(job=job)
-
+    # Die Remainder verschickt der periodische Job in utilities/reminders.py am Tag der Deadline.
     return new_plan_period
 
 
@@ -87,11 +68,6 @@ def delete_planperiod(planperiod_id: str, access_token: str = Depends(oauth2_sch
     except Exception as e:
         return HTTPException(status_code=status.HTTP_409_CONFLICT, detail=f'Error: {e}')
 
-    try:
-        scheduler.remove_job(planperiod_id)
-    except Exception as e:
-        print(f'Fehler in Route /dispatcher/planperiod: {e}')
-    print(f'rescheduled_jobs: {[j for j in scheduler.get_jobs()]}')
     return deleted_planperiod
 
 
@@ -108,22 +84,6 @@ def update_planperiod(planperiod: schemas.PlanPeriod, access_token: str = Depend
     except Exception as e:
         return HTTPException(status_code=status.HTTP_409_CONFLICT, detail=f'Error: {e}')
 
-    # Naive datetime erstellen (einen Tag vor Deadline)
-    naive_date = datetime.datetime(planperiod.deadline.year, 
-                                  planperiod.deadline.month,
-                                  planperiod.deadline.day,
-                                   hour=0, minute=0, second=0)
-    # Zeitzone hinzufügen
-    run_date = TIMEZONE.localize(naive_date)
-    
-    try:
-        job = scheduler.reschedule_job(str(planperiod.id), trigger='date', run_date=run_date)
-        services.APSchedulerJob.update_job_in_db(job=job)
-        print(f'rescheduled_jobs: {[j.__getstate__() for j in scheduler.get_jobs() if j.id == str(planperiod.id)]}',
-              flush=True)
-    except Exception as e:
-        print(f'Fehler in Route /dispatcher/planperiod: {e}', flush=True)
-
     if planperiod_updated.closed:
         send_avail_days_to_actors(str(planperiod.id))
 
@@ -139,7 +99,7 @@ async def get_planperiod_last_recent_date(team_id: str, access_token: str = Depe
     user_id = token_data.id
 
     try:
-        date = services.PlanPeriod.get_planperiods_last_recent_date(team_id)
+        date = await async_services.PlanPeriod.get_planperiods_last_recent_date(team_id)
     except Exception as e:
         return HTTPException(status_code=status.HTTP_409_CONFLICT, detail=f'Fehler: {e}')
 
@@ -147,30 +107,41 @@ async def get_planperiod_last_recent_date(team_id: str, access_token: str = Depe
 
 
 @router.get('/teams')
-async def get_teams(access_token: str = Depends(oauth2_scheme)):
+async def get_teams(request: Request, response: Response, access_token: str = Depends(oauth2_scheme)):
     try:
         token_data = verify_access_token(access_token, role=AuthorizationTypes.dispatcher)
     except Exception as e:
         return HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail=f'wrong cedentials: {e}')
     user_id = token_data.id
     try:
-        teams = services.Team.get_teams_of_dispatcher(user_id)
+        version = await async_services.Project.get_version_from_user_id(user_id)
+        validators = Validators(('dispatcher/teams', str(user_id)), version)
+        if validators.matches(request):
+            return validators.not_modified()
+        teams = await async_services.Team.get_teams_of_dispatcher(user_id, version)
     except Exception as e:
         return HTTPException(status_code=status.HTTP_409_CONFLICT, detail=f'Fehler: {e}')
+    validators.apply(response)
     return teams
 
 
 @router.get('/planperiods', response_model=list[schemas.PlanPeriod])
-def get_planperiods(team_id: str, access_token: str = Depends(oauth2_scheme)):
+def get_planperiods(team_id: str, request: Request, response: Response,
+                    access_token: str = Depends(oauth2_scheme)):
     try:
         token_data = verify_access_token(access_token, role=AuthorizationTypes.dispatcher)
     except Exception as e:
         return HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail=f'wrong cedentials: {e}')
     user_id = token_data.id
     try:
-        planperiods = services.PlanPeriod.get_planperiods_of_team(team_id=UUID(team_id))
+        version = services.PlanPeriod.get_planperiods_of_team_version(team_id=UUID(team_id))
+        validators = Validators(('dispatcher/planperiods', team_id), version)
+        if validators.matches(request):
+            return validators.not_modified()
+        planperiods = services.PlanPeriod.get_planperiods_of_team(team_id=UUID(team_id), version=version)
     except Exception as e:
         return HTTPException(status_code=status.HTTP_409_CONFLICT, detail=f'Fehler: {e}')
+    validators.apply(response)
     return planperiods
 
 
@@ -186,13 +157,19 @@ def get_clowns(access_token: str = Depends(oauth2_scheme)):
 
 
 @router.get('/avail_days')
-def get_avail_days(planperiod_id: str, access_token: str = Depends(oauth2_scheme)):
+def get_avail_days(planperiod_id: str, request: Request, response: Response,
+                   access_token: str = Depends(oauth2_scheme)):
     try:
         token_data = verify_access_token(access_token, role=AuthorizationTypes.dispatcher)
     except Exception as e:
         return HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail=f'wrong cedentials - {e}')
     user_id = token_data.id
+    validators = Validators(('dispatcher/avail_days', planperiod_id),
+                            services.AvailDay.get_avail_days_from_planperiod_version(planperiod_id=UUID(planperiod_id)))
+    if validators.matches(request):
+        return validators.not_modified()
     avail_days = services.AvailDay.get_avail_days_from_planperiod(planperiod_id=UUID(planperiod_id))
+    validators.apply(response)
     return avail_days
 
 
@@ -210,6 +187,57 @@ def avail_days_from_plan_period_and_person(plan_period_id: str, person_id: str,
     return {'avail_days': avail_days, 'notes': notes}
 
 
+AVAIL_DAY_EXPORT_FIELDS = ('plan_period_id', 'person_id', 'f_name', 'l_name', 'notes', 'day', 'time_of_day')
+EXPORT_CHUNK_ROWS = 500
+
+
+def _export_values(row: tuple) -> list:
+    plan_period_id, person_id, f_name, l_name, notes, day, time_of_day = row
+    return [str(plan_period_id), str(person_id), f_name, l_name, notes,
+            day.isoformat() if day else None, time_of_day.value if time_of_day else None]
+
+
+def _ndjson_chunks(chunks: Iterable[list[tuple]]) -> Iterator[str]:
+    for rows in chunks:
+        yield ''.join(json.dumps(dict(zip(AVAIL_DAY_EXPORT_FIELDS, _export_values(row))), ensure_ascii=False) + '\n'
+                      for row in rows)
+
+
+def _csv_chunks(chunks: Iterable[list[tuple]]) -> Iterator[str]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(AVAIL_DAY_EXPORT_FIELDS)
+    for rows in chunks:
+        writer.writerows(_export_values(row) for row in rows)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+@router.get('/avail-days-export')
+def export_avail_days(plan_period_ids: list[UUID] = Query(...),
+                      export_format: Literal['ndjson', 'csv'] = Query('ndjson', alias='format'),
+                      access_token: str = Depends(oauth2_scheme)):
+    """Alle Spieloptionen der angegebenen Planperioden als Zeilen (Person, Tag, Tageszeit, Anmerkungen),
+    gestreamt als NDJSON oder CSV. Availables ohne Tage erscheinen mit leerem day/time_of_day.
+    Die Zeilen werden blockweise (EXPORT_CHUNK_ROWS) aus der Datenbank gelesen und kodiert, Abfrage und Kodierung
+    laufen in einem eigenen Thread (async_services.iterate_in_thread)."""
+    try:
+        token_data = verify_access_token(access_token, role=AuthorizationTypes.dispatcher)
+    except Exception as e:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail=f'wrong credentials - {e}')
+    dispatcher_id = UUID(token_data.id)
+    encode = _csv_chunks if export_format == 'csv' else _ndjson_chunks
+    chunks = async_services.iterate_in_thread(
+        lambda: encode(services.AvailDay.iter_avail_day_rows(dispatcher_id, plan_period_ids, EXPORT_CHUNK_ROWS)))
+    if export_format == 'csv':
+        return StreamingResponse(chunks, media_type='text/csv',
+                                 headers={'Content-Disposition': 'attachment; filename="avail_days.csv"'})
+    return StreamingResponse(chunks, media_type='application/x-ndjson')
+
+
 # nur fürs Testen:
 @router.get('/not-feedbacked')
 def not_feedbacked_availables(planperiod_id: str, access_token: str = Depends(oauth2_scheme)):
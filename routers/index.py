@@ -5,28 +5,20 @@ from pydantic import EmailStr
 from starlette.datastructures import URL
 from starlette.responses import RedirectResponse
 
-from databases import services
+from databases import schemas, services
 from databases.enums import AuthorizationTypes
 from oauth2_authentication import verify_actor_username, get_current_user_cookie, \
-    authenticate_user, create_access_token, get_authorization_types
+    authenticate_user, create_access_token, get_authorization_types, get_current_user, get_current_principal
 from utilities import utils
+from utilities.request_session import DBSessionRoute
 
 templates = Jinja2Templates(directory='templates')
 
-router = APIRouter(prefix='', tags=['home'])
+router = APIRouter(prefix='', tags=['home'], route_class=DBSessionRoute)
 
 
 @router.get('/')
-def home(request: Request):
-    try:
-        token_data = get_current_user_cookie(request, 'hcc_plan_auth', None)
-    except Exception as e:
-        return templates.TemplateResponse('index.html', 
-                                        context={'request': request, 
-                                                'InvalidCredentials': False})
-    user_id = token_data.id
-
-    user = services.Person.get_user_by_id(user_id)
+def home(request: Request, user: schemas.PersonShow | None = Depends(get_current_principal)):
     if user is None:
         return templates.TemplateResponse('index.html', 
                                         context={'request': request, 
@@ -43,9 +35,9 @@ def home(request: Request):
 
 
 @router.post('/home')
-def home_2(request: Request, email: EmailStr = Form(...), password: str = Form(...)):
+async def home_2(request: Request, email: EmailStr = Form(...), password: str = Form(...)):
     try:
-        user = authenticate_user(email, password)
+        user = await authenticate_user(email, password)
     except Exception as e:
         return templates.TemplateResponse('index.html', 
                                         context={'request': request, 
@@ -84,14 +76,11 @@ def logout(request: Request):
 
 
 @router.get('/account')
-def account_settings(request: Request, confirmed_password: bool = True):
-    try:
-        token_data = get_current_user_cookie(request, 'hcc_plan_auth', None)
-    except Exception as e:
+def account_settings(request: Request, confirmed_password: bool = True,
+                     user: schemas.PersonShow | None = Depends(get_current_principal)):
+    if user is None:
         return templates.TemplateResponse('index.html', context={'request': request,
                                                                  'InvalidCredentials': False, 'logged_out': False})
-    user_id = token_data.id
-    user = services.Person.get_user_by_id(user_id)
     name_project = user.project.name
 
     return templates.TemplateResponse('account_settings_actor.html',
@@ -130,8 +119,7 @@ def google_calendar(request: Request):
         print(f'token_data: {token_data}', flush=True)
     except Exception as e:
         return templates.TemplateResponse('alert_invalid_credentials.html', context={'request': request})
-    user_id = token_data.id
-    user = services.Person.get_user_by_id(user_id)
+    user = get_current_user(request, token_data)
 
     return templates.TemplateResponse('google_calendar.html',
                                       context={'request': request,
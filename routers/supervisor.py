@@ -2,11 +2,14 @@ from uuid import UUID
 
 from fastapi import APIRouter, Request, HTTPException, status, Depends
 
-from databases import schemas, services
+from databases import schemas, async_services, database
 from databases.enums import AuthorizationTypes
 from oauth2_authentication import verify_access_token, oauth2_scheme
+from utilities.cache import metadata_cache
+from utilities.password_service import password_service
+from utilities.request_session import DBSessionRoute
 
-router = APIRouter(prefix='/su', tags=['Superuser'])
+router = APIRouter(prefix='/su', tags=['Superuser'], route_class=DBSessionRoute)
 
 
 @router.post('/account')
@@ -18,8 +21,15 @@ async def new_account(person: schemas.PersonCreate, project: schemas.ProjectCrea
     except Exception as e:
         raise e
     try:
-        new_admin = services.Project.create_account(person=person, project=project)
+        new_admin = await async_services.Project.create_account(person=person, project=project)
     except Exception as e:
         raise HTTPException(status_code=status.HTTP_406_NOT_ACCEPTABLE, detail=f'Error: {e}')
 
     return new_admin
+
+
+@router.get('/metrics')
+async def metrics(access_token: str = Depends(oauth2_scheme)):
+    verify_access_token(access_token, AuthorizationTypes.supervisor)
+    return {'db_pool': database.pool_metrics(), 'password_service': password_service.metrics(),
+            'metadata_cache': metadata_cache.metrics()}
@@ -24,6 +24,56 @@ class Settings(BaseSettings):
     post_ausg_server: str
     send_port: int
 
+    # Datenbank (databases/database.py)
+    db_local: bool = False  # True: sqlite-database, False: postgresql-database
+    db_from_outside: bool = False
+    db_server_remote_access: bool = False
+    db_max_connections: int = 20
+    db_connect_timeout_seconds: int = 10
+    db_statement_timeout_ms: int = 30000  # 0: kein Timeout
+    db_keepalives_idle_seconds: int = 60  # 0: keine TCP-Keepalives
+    db_keepalives_interval_seconds: int = 10
+    db_keepalives_count: int = 5
+
+    # Versand-Queue für E-Mails (utilities/mail_queue.py)
+    mail_workers: int = 2
+    mail_max_attempts: int = 5
+    mail_retry_delay_seconds: int = 60
+    mail_poll_interval_seconds: float = 5
+    smtp_pool_size: int = 2
+    smtp_noop_after_seconds: float = 30
+    smtp_starttls: bool = True  # False nur für lokale Test-Server ohne TLS, dann ohne Login
+
+    # Threads für bcrypt beim Login (utilities/password_service.py)
+    password_hash_workers: int = 2
+
+    # Hash-Policy für Passwörter (utilities/utils.py), 'bcrypt' oder 'argon2' (argon2id, benötigt argon2-cffi)
+    password_hash_scheme: str = 'bcrypt'
+    bcrypt_rounds: int = 12
+    argon2_memory_cost: int = 65536  # KiB
+    argon2_time_cost: int = 3
+    argon2_parallelism: int = 2
+
+    # Cache der eingeloggten Benutzer (utilities/cache.py)
+    principal_cache_size: int = 1024
+    principal_cache_ttl_seconds: float = 60
+
+    # Read-Through-Cache für Teams, Planperioden und Projekte (utilities/cache.py)
+    metadata_cache_size: int = 4096
+    metadata_cache_ttl_seconds: float = 30
+
+    # Auswahl der Actors im Kalender von actors_new (utilities/cache.py)
+    selection_cache_size: int = 1024
+    selection_cache_ttl_seconds: float = 30
+
+    # Remainder zur Deadline der Planperioden (utilities/reminders.py)
+    reminder_tick_minutes: float = 15
+    reminder_workers: int = 4
+
+    # Leader-Election für den Scheduler (utilities/scheduler_leader.py)
+    scheduler_lease_seconds: float = 15
+    scheduler_heartbeat_seconds: float = 5
+
     class Config:
         env_file = '.env'
 
@@ -0,0 +1,137 @@
+"""Gemeinsame Fixtures der Tests. Die Tests laufen gegen eine SQLite-Datenbank in einem temporären Verzeichnis,
+die Settings werden vor dem ersten Import von settings über Umgebungsvariablen gesetzt."""
+import datetime
+import os
+import tempfile
+import uuid
+
+import pytest
+
+# Von den Tests gestartete Prozesse (multiprocessing, spawn) importieren conftest erneut und nutzen dieselbe Datenbank.
+if not (_tmp_dir := os.environ.get('HCC_PLAN_TEST_DIR')):
+    _tmp_dir = os.environ['HCC_PLAN_TEST_DIR'] = tempfile.mkdtemp(prefix='hcc-plan-tests-')
+for name, value in {'PROVIDER': 'sqlite', 'SECRET_KEY': 'test-secret', 'ALGORITHM': 'HS256',
+                    'ACCESS_TOKEN_EXPIRE_MINUTES': '30', 'DB_ACTORS': os.path.join(_tmp_dir, 'actors.sqlite'),
+                    'SUPERVISOR_USERNAME': 'supervisor', 'SUPERVISOR_PASSWORD': 'supervisor',
+                    'PROVIDER_SQL': 'postgres', 'HOST_SQL': 'localhost', 'USER_SQL': 'test', 'DATABASE_SQL': 'test',
+                    'PASSWORD_SQL': 'test', 'SEND_ADDRESS': 'hcc-plan@example.com', 'SEND_PASSWORD': 'test',
+                    'POST_AUSG_SERVER': 'localhost', 'SEND_PORT': '8025', 'DB_LOCAL': 'true',
+                    'BCRYPT_ROUNDS': '4'}.items():
+    os.environ[name] = value
+
+
+@pytest.fixture(scope='session')
+def db():
+    from databases import database, models
+    database.start_db()
+    return models.db_actors
+
+
+@pytest.fixture
+def make_team(db):
+    """Legt Projekt, Dispatcher und Team an und liefert die Id des Teams. Die Passwörter werden nicht gehasht."""
+    from pony.orm import db_session
+    from databases import models
+
+    def make_team() -> uuid.UUID:
+        suffix = uuid.uuid4().hex[:8]
+        with db_session:
+            project = models.Project(name=f'Projekt {suffix}')
+            dispatcher = models.Person(f_name='Dis', l_name=suffix, email=f'dispatcher-{suffix}@example.com',
+                                       username=f'dispatcher-{suffix}', password='-', project=project,
+                                       project_of_admin=project)
+            return models.Team(name=f'Team {suffix}', dispatcher=dispatcher).id
+
+    return make_team
+
+
+@pytest.fixture
+def make_actor(db):
+    from pony.orm import db_session
+    from databases import models
+
+    def make_actor(team_id: uuid.UUID) -> uuid.UUID:
+        suffix = uuid.uuid4().hex[:8]
+        with db_session:
+            team = models.Team[team_id]
+            return models.Person(f_name='Actor', l_name=suffix, email=f'actor-{suffix}@example.com',
+                                 username=f'actor-{suffix}', password='-', project=team.dispatcher.project,
+                                 team_of_actor=team).id
+
+    return make_actor
+
+
+@pytest.fixture
+def make_plan_period(db):
+    from pony.orm import db_session
+    from databases import models
+
+    def make_plan_period(team_id: uuid.UUID, start: datetime.date, end: datetime.date, closed: bool = False,
+                         deadline: datetime.date | None = None, remainder: bool = False) -> uuid.UUID:
+        with db_session:
+            return models.PlanPeriod(team=models.Team[team_id], start=start, end=end, deadline=deadline or start,
+                                     closed=closed, remainder=remainder).id
+
+    return make_plan_period
+
+
+@pytest.fixture
+def capture_sql(db):
+    """Kontextmanager, der die an die Datenbank geschickten SQL-Anweisungen mit ihren Argumenten sammelt."""
+    from contextlib import contextmanager
+
+    @contextmanager
+    def capture_sql():
+        statements: list[tuple[str, object]] = []
+        exec_sql = db._exec_sql
+
+        def recording_exec_sql(sql, arguments=None, *args, **kwargs):
+            statements.append((sql, arguments))
+            return exec_sql(sql, arguments, *args, **kwargs)
+
+        db._exec_sql = recording_exec_sql
+        try:
+            yield statements
+        finally:
+            del db._exec_sql
+
+    return capture_sql
+
+
+@pytest.fixture(scope='session')
+def client(db):
+    """TestClient für die Router aus main.py, ohne dessen Lifespan (Scheduler, Mail-Worker)."""
+    from fastapi import FastAPI
+    from fastapi.staticfiles import StaticFiles
+    from fastapi.testclient import TestClient
+    from routers import actors, actors_new, admin, auth, dispatcher, index, supervisor
+
+    app = FastAPI()
+    app.mount('/static', StaticFiles(directory='static'), name='static')
+    for module in (index, auth, actors, actors_new, admin, supervisor, dispatcher):
+        app.include_router(module.router)
+    return TestClient(app)
+
+
+@pytest.fixture
+def access_token(db):
+    """Token wie bei /auth/token für eine Person mit den angegebenen Rollen."""
+    from databases.enums import AuthorizationTypes
+    from oauth2_authentication import create_access_token
+
+    def access_token(person_id: uuid.UUID, *roles: AuthorizationTypes) -> str:
+        return create_access_token(data={'user_id': str(person_id), 'roles': [role.value for role in roles]})
+
+    return access_token
+
+
+@pytest.fixture
+def dispatcher_of(db):
+    from pony.orm import db_session
+    from databases import models
+
+    def dispatcher_of(team_id: uuid.UUID) -> uuid.UUID:
+        with db_session:
+            return models.Team[team_id].dispatcher.id
+
+    return dispatcher_of
@@ -0,0 +1,82 @@
+import csv
+import datetime
+import io
+import json
+
+from pony.orm import db_session
+
+from databases import models, services
+from databases.enums import AuthorizationTypes, TimeOfDay
+from routers import dispatcher
+
+
+def _add_availables(plan_period_id, person_id, notes: str = '', days: tuple = ()):
+    with db_session:
+        availables = models.Availables(plan_period=models.PlanPeriod[plan_period_id],
+                                       person=models.Person[person_id], notes=notes)
+        for day, time_of_day in days:
+            models.AvailDay(day=day, time_of_day=time_of_day, availables=availables)
+
+
+def test_export_ndjson_and_csv(client, access_token, dispatcher_of, make_team, make_actor, make_plan_period,
+                               monkeypatch):
+    monkeypatch.setattr(dispatcher, 'EXPORT_CHUNK_ROWS', 2)
+    team_id = make_team()
+    with_days, notes_only = make_actor(team_id), make_actor(team_id)
+    january = make_plan_period(team_id, datetime.date(2031, 1, 1), datetime.date(2031, 1, 31))
+    february = make_plan_period(team_id, datetime.date(2031, 2, 1), datetime.date(2031, 2, 28))
+    _add_availables(january, with_days, days=((datetime.date(2031, 1, 2), TimeOfDay.morning),
+                                              (datetime.date(2031, 1, 3), TimeOfDay.evening)))
+    _add_availables(february, with_days, days=((datetime.date(2031, 2, 5), TimeOfDay.whole_day),))
+    _add_availables(january, notes_only, notes='nur abends')
+
+    other_team_id = make_team()
+    other_period = make_plan_period(other_team_id, datetime.date(2031, 1, 1), datetime.date(2031, 1, 31))
+    _add_availables(other_period, make_actor(other_team_id), days=((datetime.date(2031, 1, 2), TimeOfDay.morning),))
+
+    token = access_token(dispatcher_of(team_id), AuthorizationTypes.dispatcher)
+    params = {'plan_period_ids': [str(january), str(february), str(other_period)]}
+    headers = {'Authorization': f'Bearer {token}'}
+
+    response = client.get('/dispatcher/avail-days-export', params=params, headers=headers)
+    assert response.status_code == 200
+    assert response.headers['content-type'] == 'application/x-ndjson'
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert {row['plan_period_id'] for row in rows} == {str(january), str(february)}
+    assert [(row['person_id'], row['day'], row['time_of_day'], row['notes']) for row in rows
+            if row['person_id'] == str(with_days)] == [(str(with_days), '2031-01-02', 'v', ''),
+                                                        (str(with_days), '2031-01-03', 'a', ''),
+                                                        (str(with_days), '2031-02-05', 'g', '')]
+    with db_session:
+        l_name = models.Person[notes_only].l_name
+    assert [row for row in rows if row['person_id'] == str(notes_only)] == [
+        {'plan_period_id': str(january), 'person_id': str(notes_only), 'f_name': 'Actor', 'l_name': l_name,
+         'notes': 'nur abends', 'day': None, 'time_of_day': None}]
+
+    response = client.get('/dispatcher/avail-days-export', params=params | {'format': 'csv'}, headers=headers)
+    assert response.status_code == 200
+    assert response.headers['content-type'].startswith('text/csv')
+    csv_rows = list(csv.DictReader(io.StringIO(response.text)))
+    assert len(csv_rows) == len(rows) == 4
+    assert [(r['person_id'], r['day'], r['notes']) for r in csv_rows] == [
+        (r['person_id'], r['day'] or '', r['notes']) for r in rows]
+
+
+def test_export_rejects_unknown_format(client, access_token, dispatcher_of, make_team, make_plan_period):
+    team_id = make_team()
+    plan_period_id = make_plan_period(team_id, datetime.date(2031, 1, 1), datetime.date(2031, 1, 31))
+    token = access_token(dispatcher_of(team_id), AuthorizationTypes.dispatcher)
+    response = client.get('/dispatcher/avail-days-export',
+                          params={'plan_period_ids': [str(plan_period_id)], 'format': 'xml'},
+                          headers={'Authorization': f'Bearer {token}'})
+    assert response.status_code == 422
+
+
+def test_iter_avail_day_rows_reads_in_chunks(dispatcher_of, make_team, make_actor, make_plan_period):
+    team_id = make_team()
+    plan_period_id = make_plan_period(team_id, datetime.date(2031, 3, 1), datetime.date(2031, 3, 31))
+    _add_availables(plan_period_id, make_actor(team_id),
+                    days=tuple((datetime.date(2031, 3, d), TimeOfDay.morning) for d in range(1, 6)))
+    chunks = list(services.AvailDay.iter_avail_day_rows(dispatcher_of(team_id), [plan_period_id], 2))
+    assert [len(chunk) for chunk in chunks] == [2, 2, 1]
+    assert list(services.AvailDay.iter_avail_day_rows(dispatcher_of(team_id), [], 2)) == []
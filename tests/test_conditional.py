@@ -0,0 +1,122 @@
+import datetime
+
+from pony.orm import db_session
+
+from databases import models
+from databases.enums import AuthorizationTypes, TimeOfDay
+
+
+def _get(client, url: str, token: str, etag: str | None = None, **params):
+    headers = {'Authorization': f'Bearer {token}'}
+    if etag:
+        headers['If-None-Match'] = etag
+    return client.get(url, params=params, headers=headers)
+
+
+def _assert_revalidates(client, url: str, token: str, **params) -> str:
+    """200 mit ETag, danach 304 ohne Body für denselben ETag. Liefert den ETag."""
+    response = _get(client, url, token, **params)
+    assert response.status_code == 200
+    etag = response.headers['ETag']
+    assert etag.startswith('W/"')
+    assert response.headers['Cache-Control'] == 'private, no-cache'
+
+    not_modified = _get(client, url, token, etag, **params)
+    assert not_modified.status_code == 304
+    assert not_modified.content == b''
+    assert not_modified.headers['ETag'] == etag
+    return etag
+
+
+def test_admin_persons_etag_changes_after_insert_and_delete(client, access_token, dispatcher_of, make_team,
+                                                            make_actor):
+    team_id = make_team()
+    admin_id = dispatcher_of(team_id)
+    token = access_token(admin_id, AuthorizationTypes.admin)
+    etag = _assert_revalidates(client, '/admin/persons', token)
+
+    person_id = make_actor(team_id)
+    response = _get(client, '/admin/persons', token, etag)
+    assert response.status_code == 200
+    assert response.headers['ETag'] != etag
+    assert str(person_id) in {p['id'] for p in response.json()}
+    etag = _assert_revalidates(client, '/admin/persons', token)
+
+    deleted = client.delete('/admin/person', params={'person_id': str(person_id)},
+                            headers={'Authorization': f'Bearer {token}'})
+    assert deleted.status_code == 200
+    response = _get(client, '/admin/persons', token, etag)
+    assert response.status_code == 200
+    assert response.headers['ETag'] != etag
+    assert str(person_id) not in {p['id'] for p in response.json()}
+
+
+def test_admin_and_dispatcher_teams_etag_changes_after_insert(client, access_token, dispatcher_of, make_team):
+    team_id = make_team()
+    dispatcher_id = dispatcher_of(team_id)
+    admin_token = access_token(dispatcher_id, AuthorizationTypes.admin)
+    dispatcher_token = access_token(dispatcher_id, AuthorizationTypes.dispatcher)
+    admin_etag = _assert_revalidates(client, '/admin/teams', admin_token)
+    dispatcher_etag = _assert_revalidates(client, '/dispatcher/teams', dispatcher_token)
+    assert admin_etag != dispatcher_etag
+
+    with db_session:
+        new_team_id = models.Team(name=f'Team 2 {team_id}', dispatcher=models.Person[dispatcher_id]).id
+    for url, token, etag in (('/admin/teams', admin_token, admin_etag),
+                             ('/dispatcher/teams', dispatcher_token, dispatcher_etag)):
+        response = _get(client, url, token, etag)
+        assert response.status_code == 200
+        assert response.headers['ETag'] != etag
+        assert str(new_team_id) in {t['id'] for t in response.json()}
+
+
+def test_dispatcher_planperiods_etag_changes_after_insert_and_delete(client, access_token, dispatcher_of,
+                                                                     make_team, make_plan_period):
+    team_id = make_team()
+    token = access_token(dispatcher_of(team_id), AuthorizationTypes.dispatcher)
+    make_plan_period(team_id, datetime.date(2034, 1, 1), datetime.date(2034, 1, 31))
+    etag = _assert_revalidates(client, '/dispatcher/planperiods', token, team_id=str(team_id))
+
+    plan_period_id = make_plan_period(team_id, datetime.date(2034, 2, 1), datetime.date(2034, 2, 28))
+    response = _get(client, '/dispatcher/planperiods', token, etag, team_id=str(team_id))
+    assert response.status_code == 200
+    assert response.headers['ETag'] != etag
+    assert len(response.json()) == 2
+    etag = response.headers['ETag']
+
+    with db_session:
+        models.PlanPeriod[plan_period_id].delete()
+    response = _get(client, '/dispatcher/planperiods', token, etag, team_id=str(team_id))
+    assert response.status_code == 200
+    assert response.headers['ETag'] != etag
+    assert [pp['start'] for pp in response.json()] == ['2034-01-01']
+
+
+def test_dispatcher_avail_days_etag_changes_after_insert_and_delete(client, access_token, dispatcher_of,
+                                                                    make_team, make_actor, make_plan_period):
+    team_id = make_team()
+    token = access_token(dispatcher_of(team_id), AuthorizationTypes.dispatcher)
+    person_id = make_actor(team_id)
+    plan_period_id = make_plan_period(team_id, datetime.date(2034, 3, 1), datetime.date(2034, 3, 31))
+    with db_session:
+        availables = models.Availables(plan_period=models.PlanPeriod[plan_period_id],
+                                       person=models.Person[person_id])
+        models.AvailDay(day=datetime.date(2034, 3, 1), time_of_day=TimeOfDay.morning, availables=availables)
+        availables_id = availables.id
+    etag = _assert_revalidates(client, '/dispatcher/avail_days', token, planperiod_id=str(plan_period_id))
+
+    with db_session:
+        avail_day_id = models.AvailDay(day=datetime.date(2034, 3, 2), time_of_day=TimeOfDay.evening,
+                                       availables=models.Availables[availables_id]).id
+    response = _get(client, '/dispatcher/avail_days', token, etag, planperiod_id=str(plan_period_id))
+    assert response.status_code == 200
+    assert response.headers['ETag'] != etag
+    etag = response.headers['ETag']
+
+    with db_session:
+        models.AvailDay[avail_day_id].delete()
+    response = _get(client, '/dispatcher/avail_days', token, etag, planperiod_id=str(plan_period_id))
+    assert response.status_code == 200
+    assert response.headers['ETag'] != etag
+    assert _get(client, '/dispatcher/avail_days', token, response.headers['ETag'],
+                planperiod_id=str(plan_period_id)).status_code == 304
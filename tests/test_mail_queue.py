@@ -0,0 +1,122 @@
+import email
+import threading
+import time
+from datetime import timedelta
+from email import policy
+from email.message import EmailMessage
+
+import pytest
+from pony.orm import db_session
+
+from databases import models, services
+from databases.enums import MailStatus
+from utilities import mail_queue, smtp_pool
+from utilities.smtp_pool_benchmark import BenchmarkSMTPServer
+
+
+@pytest.fixture
+def smtp_server(monkeypatch):
+    """Lokaler SMTP-Server ohne TLS und Login; der Worker verschickt über einen eigenen Pool dorthin."""
+    server = BenchmarkSMTPServer(latency=0)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    monkeypatch.setattr(smtp_pool, 'POST_AUSG_SERVER', server.server_address[0])
+    monkeypatch.setattr(smtp_pool, 'SEND_PORT', server.server_address[1])
+    monkeypatch.setattr(smtp_pool, 'STARTTLS', False)
+    pool = smtp_pool.SMTPConnectionPool(size=1)
+    monkeypatch.setattr(mail_queue.smtp_pool, 'pool', pool)
+    monkeypatch.setattr(mail_queue, 'MARK_SENT_RETRY_SECONDS', 0.01)
+    monkeypatch.setattr(mail_queue, 'POLL_INTERVAL', 0.05)
+    yield server
+    pool.close_all()
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def worker(db, smtp_server):
+    mail_queue._stop.clear()
+    mail_worker = mail_queue.MailWorker(0)
+    mail_worker.start()
+    yield mail_worker
+    mail_queue._stop.set()
+    mail_queue.notify_new_mail()
+    mail_worker.join(10)
+
+
+def _message(send_to: str) -> EmailMessage:
+    msg = EmailMessage()
+    msg['From'] = 'hcc-plan@example.com'
+    msg['To'] = send_to
+    msg['Subject'] = f'Test an {send_to}'
+    msg.set_content('Test')
+    return msg
+
+
+def _wait_until_sent(mail_ids, timeout: float = 10) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        with db_session:
+            if all(models.OutgoingMail[mail_id].status == MailStatus.sent.value for mail_id in mail_ids):
+                return True
+        time.sleep(0.02)
+    return False
+
+
+def _received(server: BenchmarkSMTPServer) -> list[tuple[list[str], str]]:
+    return [(recipients, email.message_from_bytes(data, policy=policy.default)['Subject'])
+            for recipients, data in server.messages]
+
+
+def test_failing_mark_sent_is_retried(monkeypatch, smtp_server, worker):
+    mark_sent = services.OutgoingMail.mark_sent
+    calls = []
+
+    def flaky_mark_sent(mail_id):
+        calls.append(mail_id)
+        if len(calls) == 1:
+            raise RuntimeError('database is locked')
+        mark_sent(mail_id)
+
+    monkeypatch.setattr(services.OutgoingMail, 'mark_sent', staticmethod(flaky_mark_sent))
+    first_id, second_id = services.OutgoingMail.enqueue([_message('first@example.com'),
+                                                        _message('second@example.com')])
+
+    assert _wait_until_sent([first_id, second_id])
+    assert worker.is_alive()
+
+    assert calls == [first_id, first_id, second_id]
+    assert _received(smtp_server) == [(['first@example.com'], 'Test an first@example.com'),
+                                      (['second@example.com'], 'Test an second@example.com')]
+
+
+def test_mail_is_not_sent_twice_after_lease_expired(monkeypatch, smtp_server, worker):
+    """Kann der Versand nicht gespeichert werden, bis die Reservierung abläuft, wird die erneut vergebene Mail nur
+    noch als verschickt gespeichert."""
+    monkeypatch.setattr(mail_queue, 'LEASE', timedelta(seconds=0.2))
+    mark_sent = services.OutgoingMail.mark_sent
+    database_down = threading.Event()
+    database_down.set()
+    calls = []
+
+    def flaky_mark_sent(mail_id):
+        calls.append(mail_id)
+        if database_down.is_set():
+            raise RuntimeError('database is locked')
+        mark_sent(mail_id)
+
+    monkeypatch.setattr(services.OutgoingMail, 'mark_sent', staticmethod(flaky_mark_sent))
+    mail_id, = services.OutgoingMail.enqueue([_message('actor@example.com')])
+
+    deadline = time.monotonic() + 10
+    while mail_id not in mail_queue._sent_unconfirmed and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert mail_id in mail_queue._sent_unconfirmed
+    with db_session:
+        assert models.OutgoingMail[mail_id].status == MailStatus.sending.value
+    failed_calls = len(calls)
+    database_down.clear()
+    assert _wait_until_sent([mail_id])
+
+    assert len(calls) > failed_calls
+    assert mail_id not in mail_queue._sent_unconfirmed
+    assert _received(smtp_server) == [(['actor@example.com'], 'Test an actor@example.com')]
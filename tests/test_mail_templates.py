@@ -0,0 +1,109 @@
+from email.message import Message
+
+import pytest
+
+from utilities import send_mail
+from utilities.mail_templates import SEND_ADDRESS
+
+FOOTER = '--- Diese Email wurde automatisch generiert. Bitte nicht antworten. ---\n'
+
+
+def _parts(msg: Message) -> tuple[str, str]:
+    """Prüft den Aufbau multipart/alternative (erst Text, dann HTML) und liefert beide Teile dekodiert."""
+    assert msg.get_content_type() == 'multipart/alternative'
+    plain, html = msg.get_payload()
+    assert plain.get_content_type() == 'text/plain'
+    assert html.get_content_type() == 'text/html'
+    assert plain.get_content_charset() == html.get_content_charset() == 'utf-8'
+    return plain.get_payload(decode=True).decode(), html.get_payload(decode=True).decode()
+
+
+MAILS = {
+    'new_password': (
+        send_mail.NEW_PASSWORD,
+        {'project': 'Klinikclowns'},
+        {'name': 'Anna Beispiel', 'password': 'geheim<1>'},
+        'Account bei "Klinikclowns" Online-Planung',
+        'Hallo Anna Beispiel,\n\ndein neues Passwort für den Online-Zugang lautet:\n\ngeheim<1>\n'
+        'Du kannst dieses Passwort jederzeit unter "Einstellungen im Online-Portal" ändern.\n\n'
+        'Viele Grüße\nTeam hcc-plan\n'),
+    'confirmed_avail_days': (
+        send_mail.CONFIRMED_AVAIL_DAYS,
+        {'homepage': send_mail.HOMEPAGE, 'dispatcher': 'Dora Dispo', 'project': 'Klinikclowns'},
+        {'name': 'Anna Beispiel',
+         'plan_periods': [{'start': '01.03.35', 'end': '31.03.35', 'deadline': '15.02.35',
+                           'avail_days': ['02.03.(v)', '05.03.(g)'], 'notes': 'Keine'}]},
+        'HHH-Planung - deine Spieloptionen',
+        'Hallo Anna Beispiel,\n\n'
+        'deine Spieloptionen wurden von https://hcc-plan-api.onrender.com/ erfolgreich übertragen.\n\n'
+        'Das sind deine soeben übertragenen Tage, an denen du Visiten übernehmen kannst:\n\n'
+        'Abkürzungen: g = ganztags, v = vormittags, n = nachmittags\n\n'
+        'Zeitraum 01.03.35-31.03.35 (Deadline: 15.02.35):\n02.03.(v), 05.03.(g)\nAnmerkungen:\nKeine\n\n\n'
+        'Du kannst deine Spieloptionen jederzeit bis zur beim jeweiligen Planungszeitraum angegebenen Deadline '
+        'ändern oder ergänzen.\n\n'
+        'Viele Grüsse\nDora Dispo\n(Spielplanung Klinikclowns)\n\n' + FOOTER),
+    'remainder_deadline': (
+        send_mail.REMAINDER_DEADLINE,
+        {'period': '01.03.35 - 31.03.35', 'dispatcher': 'Dora Dispo', 'project': 'Klinikclowns',
+         'homepage': send_mail.HOMEPAGE},
+        {'name': 'Anna Beispiel'},
+        'Remainder: Abgabe deiner Spieloptionen',
+        'Hallo Anna Beispiel,\n\n'
+        'heute ist die Deadline für die Abgabe deiner Spieloptionen.\n'
+        'Es sind noch keine Rückmeldungen über den Online-Planungsservice von Klinikclowns '
+        'für die folgende Planung eingegangen:\n\n'
+        '- Zeitraum: 01.03.35 - 31.03.35.\n\n'
+        'Du solltest das noch heute erledigen, damit ich dich bei der Planung der Einsätze berücksichtigen kann.\n'
+        'Homepage Planungsservice: https://hcc-plan-api.onrender.com/\n\n'
+        'Dora Dispo\n(Spielplanung Klinikclowns)\n' + FOOTER),
+    'remainder_confirmation': (
+        send_mail.REMAINDER_CONFIRMATION,
+        {'dispatcher': 'Dora Dispo', 'period': '01.03.35 - 31.03.35'},
+        {'recipients': ['Anna Beispiel', 'Bert Muster']},
+        'hcc Remainder verschickt',
+        'Hallo Dora Dispo,\n\nes wurden Remainder verschickt.\nPlanungszeitraum: 01.03.35 - 31.03.35\n'
+        'Empfänger: Anna Beispiel, Bert Muster\n\nTeam hcc-dispo\n\n' + FOOTER),
+    'avail_days_to_actor': (
+        send_mail.AVAIL_DAYS_TO_ACTOR,
+        {'period': '01.03.2035-31.03.2035', 'dispatcher': 'Dora Dispo', 'project': 'Klinikclowns'},
+        {'name': 'Anna Beispiel', 'avail_days': ['02.03.2035 (Vormittag)', '05.03.2035 (Ganztag)']},
+        'Deine Spieloptionen: Planung von 01.03.2035-31.03.2035',
+        'Hallo Anna Beispiel,\n\n'
+        'für den im Betreff genannten Planungszeitraum können keine Spieloptionen mehr abgegeben werden.\n'
+        'Du hast im Online-Portal folgende Tage/Zeiten angegeben, an denen du verfügbar bist:\n\n'
+        '02.03.2035 (Vormittag)\n05.03.2035 (Ganztag)\n\n'
+        'Dora Dispo\n(Spielplanung Klinikclowns)\n' + FOOTER),
+    'online_availables_to_dispatcher': (
+        send_mail.ONLINE_AVAILABLES_TO_DISPATCHER,
+        {'period': '01.03.2035-31.03.2035', 'team': 'Nord'},
+        {'persons': [('Anna Beispiel', ['02.03. (v)', '05.03. (g)']), ('Bert Muster', [])]},
+        'Abgegebene Termine für die Planperiode: 01.03.2035-31.03.2035, Team Nord',
+        'Anna Beispiel: 02.03. (v), 05.03. (g)\nBert Muster: \n'),
+}
+
+
+@pytest.mark.parametrize('name', MAILS)
+def test_render_batch(name):
+    template, shared, context, subject, plain_text = MAILS[name]
+    msgs = template.render_batch(shared, [('anna@example.com', context), ('bert@example.com', context)])
+
+    assert [msg['To'] for msg in msgs] == ['anna@example.com', 'bert@example.com']
+    for msg in msgs:
+        assert msg['From'] == SEND_ADDRESS
+        assert str(msg['Subject']) == subject
+        plain, html = _parts(msg)
+        assert plain == plain_text
+        assert html.lstrip().lower().startswith('<!doctype html>')
+
+
+def test_render_batch_recipient_context_overrides_shared():
+    msgs = send_mail.AVAIL_DAYS_TO_ACTOR.render_batch(
+        {'period': '01.03.2035-31.03.2035', 'dispatcher': 'Dora Dispo', 'project': 'Klinikclowns',
+         'name': 'niemand', 'avail_days': []},
+        [('anna@example.com', {'name': 'Anna Beispiel'}), ('bert@example.com', {'name': 'Bert <Muster>'})])
+
+    anna, bert = (_parts(msg) for msg in msgs)
+    assert anna[0].startswith('Hallo Anna Beispiel,\n')
+    assert 'Keine Spieloptionen.\n' in anna[0]
+    assert bert[0].startswith('Hallo Bert <Muster>,\n')
+    assert 'Bert &lt;Muster&gt;' in bert[1]
@@ -0,0 +1,36 @@
+import datetime
+
+from pony.orm import db_session
+
+from databases import models, services
+
+
+def test_planperiods_follow_db_version_after_foreign_write(make_team, make_plan_period):
+    team_id = make_team()
+    plan_period_id = make_plan_period(team_id, datetime.date(2030, 1, 1), datetime.date(2030, 1, 31))
+    version = services.PlanPeriod.get_planperiods_of_team_version(team_id)
+    assert services.PlanPeriod.get_planperiods_of_team(team_id, version)[0].notes == ''
+
+    # Schreibzugriff eines anderen Prozesses: der metadata_cache dieses Prozesses wird nicht invalidiert.
+    with db_session:
+        models.PlanPeriod[plan_period_id].notes = 'geändert'
+
+    new_version = services.PlanPeriod.get_planperiods_of_team_version(team_id)
+    assert new_version != version
+    assert services.PlanPeriod.get_planperiods_of_team(team_id, new_version)[0].notes == 'geändert'
+
+
+def test_teams_follow_db_version_after_foreign_write(make_team):
+    team_id = make_team()
+    with db_session:
+        dispatcher_id = models.Team[team_id].dispatcher.id
+    version = services.Project.get_version_from_user_id(dispatcher_id)
+    assert [t.name for t in services.Team.get_teams_of_dispatcher(dispatcher_id, version)] != ['Umbenannt']
+
+    with db_session:
+        models.Team[team_id].name = 'Umbenannt'
+
+    new_version = services.Project.get_version_from_user_id(dispatcher_id)
+    assert new_version != version
+    assert [t.name for t in services.Team.get_teams_of_dispatcher(dispatcher_id, new_version)] == ['Umbenannt']
+
@@ -0,0 +1,30 @@
+import os
+import tempfile
+
+from pony.orm import Database, db_session
+
+from databases import migrations
+
+
+def _baseline_db() -> Database:
+    db = Database()
+    db.bind(provider='sqlite', filename=os.path.join(tempfile.mkdtemp(), 'baseline.sqlite'), create_db=True)
+    with db_session:
+        db.execute('CREATE TABLE "Person" (id TEXT PRIMARY KEY, email VARCHAR(50) UNIQUE NOT NULL, '
+                   'last_modified DATETIME NOT NULL)')
+        for person_id, email, last_modified in (('1', 'Dup@x.de', '2024-01-01 10:00:00'),
+                                                ('2', 'dup@x.de', '2024-02-01 10:00:00'),
+                                                ('3', ' Ärger@X.de', '2024-01-01 10:00:00')):
+            db.execute('INSERT INTO "Person" (id, email, last_modified) VALUES ($person_id, $email, $last_modified)')
+    return db
+
+
+def test_email_normalized_handles_case_duplicates_and_non_ascii():
+    db = _baseline_db()
+    with db_session:
+        migrations.add_person_email_normalized(db)
+        normalized = dict(db.select('SELECT id, email_normalized FROM "Person"'))
+        indexes = [row[1] for row in db.execute('PRAGMA index_list("Person")').fetchall()]
+
+    assert normalized == {'1': None, '2': 'dup@x.de', '3': 'ärger@x.de'}
+    assert 'unq_person__email_normalized' in indexes
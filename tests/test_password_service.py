@@ -0,0 +1,43 @@
+import asyncio
+import threading
+
+from utilities.password_service import PasswordService
+
+
+def test_queue_depth_after_cancelled_request():
+    """Ein abgebrochener Auftrag, der noch in der Queue wartet, wird nicht weiter als wartend gezählt."""
+    service = PasswordService(max_workers=1)
+    release = threading.Event()
+
+    async def scenario():
+        running = asyncio.ensure_future(service._submit(release.wait))
+        waiting = asyncio.ensure_future(service._submit(lambda: True))
+        await asyncio.sleep(0.05)
+        assert service.metrics() == {'max_workers': 1, 'queue_depth': 1, 'running': 1}
+        waiting.cancel()
+        await asyncio.sleep(0.05)
+        assert service.queue_depth == 0
+        release.set()
+        assert await running
+        assert await service._submit(lambda: True)
+
+    try:
+        asyncio.run(scenario())
+        assert service.metrics() == {'max_workers': 1, 'queue_depth': 0, 'running': 0}
+    finally:
+        release.set()
+        service.shutdown()
+
+
+def test_queue_depth_after_shutdown():
+    service = PasswordService(max_workers=1)
+    service.shutdown()
+
+    async def scenario():
+        try:
+            await service._submit(lambda: True)
+        except RuntimeError:
+            pass
+
+    asyncio.run(scenario())
+    assert service.queue_depth == 0
@@ -0,0 +1,50 @@
+import datetime
+import uuid
+
+import pytest
+from pony.orm import db_session
+
+from databases import models, services
+from databases.enums import TimeOfDay
+from utilities.plan_period_index import PlanPeriodIndex, PlanPeriodInterval
+
+
+def _interval(start: datetime.date, end: datetime.date) -> PlanPeriodInterval:
+    return PlanPeriodInterval(start, end, uuid.uuid4(), start, None, False)
+
+
+def test_find_on_boundaries_and_in_gaps():
+    january = _interval(datetime.date(2025, 1, 1), datetime.date(2025, 1, 31))
+    february = _interval(datetime.date(2025, 2, 1), datetime.date(2025, 2, 28))
+    april = _interval(datetime.date(2025, 4, 1), datetime.date(2025, 4, 30))
+    index = PlanPeriodIndex([april, january, february])
+
+    assert index.find(datetime.date(2025, 1, 1)) == january
+    assert index.find(datetime.date(2025, 1, 31)) == january
+    assert index.find(datetime.date(2025, 2, 1)) == february
+    assert index.find(datetime.date(2025, 2, 28)) == february
+    assert index.find(datetime.date(2025, 4, 30)) == april
+    # vor der ersten, zwischen zwei und nach der letzten Planperiode
+    assert index.find(datetime.date(2024, 12, 31)) is None
+    assert index.find(datetime.date(2025, 3, 1)) is None
+    assert index.find(datetime.date(2025, 3, 31)) is None
+    assert index.find(datetime.date(2025, 5, 1)) is None
+    assert PlanPeriodIndex([]).find(datetime.date(2025, 1, 1)) is None
+
+
+def test_set_selected_time_rechecks_closed_after_foreign_write(make_team, make_actor, make_plan_period):
+    team_id = make_team()
+    person_id = make_actor(team_id)
+    day = datetime.date(2030, 2, 3)
+    plan_period_id = make_plan_period(team_id, datetime.date(2030, 2, 1), datetime.date(2030, 2, 28))
+    assert services.AvailDay.set_selected_time(person_id, day, TimeOfDay.morning, True)
+
+    # Ein anderer Prozess schließt die Planperiode, der Index im metadata_cache hält sie weiter für offen.
+    with db_session:
+        models.PlanPeriod[plan_period_id].closed = True
+    assert not services.PlanPeriod.get_plan_period_index(team_id).find(day).closed
+
+    with pytest.raises(ValueError):
+        services.AvailDay.set_selected_time(person_id, day, TimeOfDay.afternoon, True)
+    with db_session:
+        assert models.AvailDay.select(lambda ad: ad.availables.person.id == person_id).count() == 1
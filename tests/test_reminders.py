@@ -0,0 +1,67 @@
+import datetime
+from concurrent.futures import ThreadPoolExecutor
+
+from pony.orm import db_session, select
+
+from databases import models
+from utilities import reminders
+
+
+def _spooled_mails(team_id) -> list[str]:
+    with db_session:
+        team = models.Team[team_id]
+        emails = {p.email for p in team.actors} | {team.dispatcher.email}
+        return sorted(m.send_to for m in select(m for m in models.OutgoingMail) if m.send_to in emails)
+
+
+def _reminders(plan_period_id) -> list[datetime.date]:
+    with db_session:
+        return sorted(r.deadline for r in models.PlanPeriod[plan_period_id].deadline_reminders)
+
+
+def test_tick_sends_reminders_once(make_team, make_actor, make_plan_period):
+    team_id = make_team()
+    make_actor(team_id), make_actor(team_id)
+    deadline = datetime.date(2040, 5, 5)
+    plan_period_id = make_plan_period(team_id, datetime.date(2040, 6, 1), datetime.date(2040, 6, 30),
+                                      deadline=deadline, remainder=True)
+
+    assert reminders.tick(deadline) == 1
+    mails = _spooled_mails(team_id)
+    assert len(mails) == 3  # zwei Actors und die Bestätigung an den Dispatcher
+    # Zweiter Durchlauf, z.B. nach einem Neustart am selben Tag
+    assert reminders.tick(deadline) == 0
+    assert _spooled_mails(team_id) == mails
+    assert _reminders(plan_period_id) == [deadline]
+
+
+def test_concurrent_ticks_send_reminders_once(make_team, make_actor, make_plan_period):
+    team_id = make_team()
+    make_actor(team_id)
+    deadline = datetime.date(2040, 7, 7)
+    plan_period_id = make_plan_period(team_id, datetime.date(2040, 8, 1), datetime.date(2040, 8, 31),
+                                      deadline=deadline, remainder=True)
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        completed = list(executor.map(lambda _: reminders.tick(deadline), range(4)))
+    assert sum(completed) == 1
+    assert len(_spooled_mails(team_id)) == 2
+    assert _reminders(plan_period_id) == [deadline]
+
+
+def test_moved_deadline_sends_new_reminder(make_team, make_actor, make_plan_period):
+    team_id = make_team()
+    make_actor(team_id)
+    deadline = datetime.date(2040, 9, 9)
+    plan_period_id = make_plan_period(team_id, datetime.date(2040, 10, 1), datetime.date(2040, 10, 31),
+                                      deadline=deadline, remainder=True)
+    assert reminders.tick(deadline) == 1
+
+    new_deadline = deadline + datetime.timedelta(days=3)
+    with db_session:
+        models.PlanPeriod[plan_period_id].deadline = new_deadline
+    assert reminders.tick(deadline) == 0
+    assert reminders.tick(new_deadline) == 1
+    assert reminders.tick(new_deadline) == 0
+    assert _reminders(plan_period_id) == [deadline, new_deadline]
+    assert len(_spooled_mails(team_id)) == 4
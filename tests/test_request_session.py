@@ -0,0 +1,86 @@
+import threading
+
+import anyio
+from anyio import to_thread
+from pony.orm import db_session
+
+import settings
+from databases import database, models
+from routers import actors
+from utilities import send_mail
+from utilities.request_session import READ_METHODS
+
+
+def test_send_new_password_is_not_a_read_method():
+    """DBSessionRoute behandelt GET/HEAD als lesend; das Zurücksetzen des Passworts schreibt und darf kein GET sein."""
+    routes = [r for r in actors.router.routes if r.name == 'send_new_password']
+    assert routes
+    for route in routes:
+        assert route.methods == {'POST'}
+        assert not route.methods & READ_METHODS
+
+
+def test_get_new_password_only_confirms(client, make_team, make_actor):
+    team_id = make_team()
+    with db_session:
+        person = models.Person[make_actor(team_id)]
+        email, password = person.email, person.password
+
+    response = client.get('/actors/new_passwort', params={'user_email': email})
+    assert response.status_code == 200
+    assert f'value="{email}"' in response.text
+    assert 'method="post"' in response.text
+    with db_session:
+        assert models.Person.get(email=email).password == password
+
+
+def test_post_new_password_resets_password(client, make_team, make_actor, monkeypatch):
+    sent = []
+    monkeypatch.setattr(send_mail, 'send_new_password', lambda **kwargs: sent.append(kwargs))
+    team_id = make_team()
+    with db_session:
+        person = models.Person[make_actor(team_id)]
+        email, password = person.email, person.password
+
+    response = client.post('/actors/new_passwort', data={'user_email': email})
+    assert response.status_code == 200
+    assert [kwargs['person'].email for kwargs in sent] == [email]
+    with db_session:
+        assert models.Person.get(email=email).password != password
+
+
+def test_configure_connection_limit_sizes_thread_limiter(db, monkeypatch):
+    monkeypatch.setattr(settings.settings, 'db_max_connections', 7)
+
+    async def scenario():
+        database.configure_connection_limit()
+        return to_thread.current_default_thread_limiter().total_tokens, database.pool_metrics()
+
+    total_tokens, metrics = anyio.run(scenario)
+    assert total_tokens == 7
+    assert metrics == {'max_connections': 7, 'connections_in_use': 0, 'requests_waiting': 0}
+
+
+def test_pool_metrics_under_concurrent_load(db, monkeypatch):
+    """Mehr gleichzeitige synchrone Aufrufe als Verbindungen: Die überzähligen warten im Limiter."""
+    monkeypatch.setattr(settings.settings, 'db_max_connections', 2)
+    release = threading.Event()
+
+    async def scenario():
+        database.configure_connection_limit()
+        async with anyio.create_task_group() as task_group:
+            for _ in range(5):
+                task_group.start_soon(to_thread.run_sync, release.wait)
+            with anyio.fail_after(5):
+                while database.pool_metrics()['requests_waiting'] < 3:
+                    await anyio.sleep(0.01)
+            metrics = database.pool_metrics()
+            release.set()
+        return metrics, database.pool_metrics()
+
+    try:
+        under_load, after = anyio.run(scenario)
+    finally:
+        release.set()
+    assert under_load == {'max_connections': 2, 'connections_in_use': 2, 'requests_waiting': 3}
+    assert after == {'max_connections': 2, 'connections_in_use': 0, 'requests_waiting': 0}
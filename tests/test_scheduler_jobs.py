@@ -0,0 +1,16 @@
+import uuid
+
+from pony.orm import db_session
+
+from databases import models, services
+
+
+def test_add_job_state_reports_conflict_instead_of_raising(db):
+    """Ein zweites Anlegen derselben Job-Id (z.B. parallel aus einem zweiten Prozess) ergibt False, der Jobstore
+    macht daraus ConflictingIdError. Der gespeicherte Job bleibt unverändert."""
+    job_id = f'job-{uuid.uuid4().hex}'
+    assert services.APSchedulerJob.add_job_state(job_id, 100.0, b'first', None)
+    assert not services.APSchedulerJob.add_job_state(job_id, 200.0, b'second', uuid.uuid4())
+    with db_session:
+        job = models.SchedulerJob[job_id]
+        assert (job.next_run_time, job.job_state, job.plan_period_id) == (100.0, b'first', None)
@@ -0,0 +1,119 @@
+"""Leader-Election mit mehreren Prozessen auf einer SQLite-Datei (der Datenbank aus conftest.py)."""
+import datetime
+import multiprocessing
+import os
+import time
+
+import pytz
+from apscheduler.schedulers.background import BackgroundScheduler
+
+LEASE_SECONDS = 2.0
+HEARTBEAT_SECONDS = 0.3
+TIMEZONE = pytz.timezone('Europe/Berlin')
+
+
+def record_run(path: str, token: str):
+    with open(path, 'a') as f:
+        f.write(f'{token} {os.getpid()}\n')
+
+
+def _scheduler() -> BackgroundScheduler:
+    from utilities.jobstore import PonyJobStore
+    return BackgroundScheduler(jobstores={'default': PonyJobStore()}, timezone=TIMEZONE)
+
+
+def run_node(is_leader, stop):
+    """Ein Prozess wie main.py: Scheduler pausiert starten, Leader-Lease im Hintergrund halten."""
+    from databases import database
+    from utilities.scheduler_leader import SchedulerLeader
+
+    database.start_db()
+    scheduler = _scheduler()
+    scheduler.start(paused=True)
+    leader = SchedulerLeader(scheduler, lease_seconds=LEASE_SECONDS, heartbeat_seconds=HEARTBEAT_SECONDS)
+    leader.start()
+    while not stop.value:
+        is_leader.value = leader.is_leader
+        time.sleep(0.05)
+    leader.stop()
+    is_leader.value = False
+    scheduler.shutdown(wait=False)
+
+
+def _wait_for_leader(nodes: dict, timeout: float) -> tuple[str, float]:
+    """Wartet, bis genau ein Prozess Leader ist. Zu keinem Zeitpunkt dürfen es zwei sein."""
+    start = time.monotonic()
+    while time.monotonic() - start < timeout:
+        leaders = [name for name, (process, is_leader, _) in nodes.items() if process.is_alive() and is_leader.value]
+        assert len(leaders) <= 1
+        if leaders:
+            return leaders[0], time.monotonic() - start
+        time.sleep(0.02)
+    raise AssertionError('kein Leader')
+
+
+def _add_jobs(scheduler: BackgroundScheduler, path: str, tokens: list[str]):
+    run_date = datetime.datetime.now(TIMEZONE) + datetime.timedelta(seconds=0.5)
+    for token in tokens:
+        scheduler.add_job(record_run, 'date', run_date=run_date, args=[path, token], id=token)
+
+
+def _wait_for_runs(path: str, tokens: list[str], timeout: float) -> list[str]:
+    start = time.monotonic()
+    while time.monotonic() - start < timeout:
+        runs = open(path).read().split('\n') if os.path.exists(path) else []
+        if all(any(r.startswith(f'{t} ') for r in runs) for t in tokens):
+            break
+        time.sleep(0.05)
+    time.sleep(3 * HEARTBEAT_SECONDS)
+    return [r.split()[0] for r in open(path).read().splitlines()]
+
+
+def test_one_leader_runs_jobs_once_and_successor_takes_over(db, tmp_path):
+    context = multiprocessing.get_context('spawn')
+    nodes = {}
+    for name in ('a', 'b', 'c'):
+        # Kein multiprocessing.Event: set() blockiert, wenn ein getöteter Prozess darauf gewartet hat.
+        is_leader, stop = context.Value('b', False), context.Value('b', False)
+        process = context.Process(target=run_node, args=(is_leader, stop), daemon=True)
+        process.start()
+        nodes[name] = (process, is_leader, stop)
+    scheduler = _scheduler()
+    scheduler.start(paused=True)
+    path = str(tmp_path / 'runs.txt')
+    try:
+        first, _ = _wait_for_leader(nodes, timeout=30)
+        # Die Leadership bleibt stabil, es kommt kein zweiter Leader dazu.
+        for _ in range(int(3 * LEASE_SECONDS / 0.05)):
+            assert [name for name, (_, is_leader, _) in nodes.items() if is_leader.value] == [first]
+            time.sleep(0.05)
+
+        tokens = [f'job-{i}' for i in range(5)]
+        _add_jobs(scheduler, path, tokens)
+        assert sorted(_wait_for_runs(path, tokens, timeout=10)) == tokens
+
+        # Der Leader fällt aus, ohne die Lease freizugeben: Übernahme nach Ablauf der Lease.
+        nodes[first][0].kill()
+        nodes[first][0].join()
+        second, elapsed = _wait_for_leader(nodes, timeout=LEASE_SECONDS + 5)
+        assert second != first
+        assert elapsed <= LEASE_SECONDS + 2 * HEARTBEAT_SECONDS
+
+        tokens_after_kill = [f'job-after-kill-{i}' for i in range(3)]
+        _add_jobs(scheduler, path, tokens_after_kill)
+        assert sorted(_wait_for_runs(path, tokens_after_kill, timeout=10)) == sorted(tokens + tokens_after_kill)
+
+        # Der Leader gibt die Lease beim Beenden frei: Übernahme ohne Ablauf der Lease.
+        nodes[second][2].value = True
+        nodes[second][0].join(timeout=10)
+        third, elapsed = _wait_for_leader(nodes, timeout=LEASE_SECONDS + 5)
+        assert third not in (first, second)
+        assert elapsed < LEASE_SECONDS
+    finally:
+        scheduler.shutdown(wait=False)
+        for process, _, stop in nodes.values():
+            stop.value = True
+        for process, _, _ in nodes.values():
+            process.join(timeout=10)
+            if process.is_alive():
+                process.kill()
@@ -0,0 +1,109 @@
+import datetime
+
+from pony.orm import db_session
+
+from databases import models, services
+from databases.enums import AuthorizationTypes, TimeOfDay
+
+
+def _actor_cookie(access_token, person_id) -> dict:
+    return {'Cookie': f'hcc_plan_auth={access_token(person_id, AuthorizationTypes.actor)}'}
+
+
+def _stored(person_id, plan_period_id) -> set[tuple[datetime.date, TimeOfDay]]:
+    with db_session:
+        availables = models.Availables.get(person=models.Person[person_id],
+                                           plan_period=models.PlanPeriod[plan_period_id])
+        return {(ad.day, ad.time_of_day) for ad in availables.avail_days} if availables else set()
+
+
+def test_toggle_reads_stored_state(client, access_token, make_team, make_actor, make_plan_period):
+    """Ohne 'selected' wird der Zustand aus der Datenbank umgekehrt, auch wenn der selection_cache dieses Prozesses
+    eine Änderung eines anderen Workers noch nicht kennt."""
+    team_id = make_team()
+    person_id = make_actor(team_id)
+    plan_period_id = make_plan_period(team_id, datetime.date(2032, 3, 1), datetime.date(2032, 3, 31))
+    day = datetime.date(2032, 3, 10)
+    assert services.AvailDay.get_selected_times(person_id) == frozenset()
+    with db_session:
+        availables = models.Availables(person=models.Person[person_id], plan_period=models.PlanPeriod[plan_period_id])
+        models.AvailDay(day=day, time_of_day=TimeOfDay.morning, availables=availables)
+
+    headers = _actor_cookie(access_token, person_id)
+    form = {'date': day.isoformat(), 'period': TimeOfDay.morning.name}
+    response = client.post('/actors_new/select-time-new', data=form, headers=headers)
+    assert response.status_code == 200
+    assert 'gesperrt gespeichert' in response.text
+    assert _stored(person_id, plan_period_id) == set()
+
+    response = client.post('/actors_new/select-time-new', data=form, headers=headers)
+    assert 'verfügbar gespeichert' in response.text
+    assert _stored(person_id, plan_period_id) == {(day, TimeOfDay.morning)}
+
+
+def _post_selection(client, headers, plan_period_id, changes, replace=False):
+    return client.post('/actors_new/api/selection', headers=headers,
+                       json={'plan_period_id': str(plan_period_id), 'replace': replace,
+                             'changes': [{'day': day.isoformat(), 'time_of_day': time_of_day, 'selected': selected}
+                                         for day, time_of_day, selected in changes]})
+
+
+def test_apply_selection_returns_only_real_changes(client, access_token, make_team, make_actor, make_plan_period):
+    team_id = make_team()
+    person_id = make_actor(team_id)
+    plan_period_id = make_plan_period(team_id, datetime.date(2032, 4, 1), datetime.date(2032, 4, 30))
+    first, second, third = datetime.date(2032, 4, 1), datetime.date(2032, 4, 2), datetime.date(2032, 4, 3)
+    headers = _actor_cookie(access_token, person_id)
+    _post_selection(client, headers, plan_period_id, [(first, 'morning', True), (second, 'evening', True)])
+
+    changes = [(first, 'morning', True),  # bereits gespeichert
+               (second, 'evening', False),
+               (third, 'afternoon', False),  # nicht gespeichert
+               (third, 'whole_day', True),
+               (first, 'evening', True), (first, 'evening', False)]  # die letzte Änderung gilt
+    response = _post_selection(client, headers, plan_period_id, changes)
+    assert response.status_code == 200
+    assert response.json() == {'plan_period_id': str(plan_period_id),
+                               'selected': [['2032-04-03', 'whole_day']],
+                               'unselected': [['2032-04-02', 'evening']]}
+    assert _stored(person_id, plan_period_id) == {(first, TimeOfDay.morning), (third, TimeOfDay.whole_day)}
+
+    response = _post_selection(client, headers, plan_period_id, changes)
+    assert response.json() == {'plan_period_id': str(plan_period_id), 'selected': [], 'unselected': []}
+    assert _stored(person_id, plan_period_id) == {(first, TimeOfDay.morning), (third, TimeOfDay.whole_day)}
+
+
+def test_apply_selection_replace_removes_unlisted_cells(client, access_token, make_team, make_actor,
+                                                        make_plan_period):
+    team_id = make_team()
+    person_id = make_actor(team_id)
+    plan_period_id = make_plan_period(team_id, datetime.date(2032, 5, 1), datetime.date(2032, 5, 31))
+    first, second = datetime.date(2032, 5, 1), datetime.date(2032, 5, 2)
+    headers = _actor_cookie(access_token, person_id)
+    _post_selection(client, headers, plan_period_id,
+                    [(first, 'morning', True), (first, 'evening', True), (second, 'afternoon', True)])
+
+    response = _post_selection(client, headers, plan_period_id,
+                               [(first, 'evening', True), (second, 'morning', True)], replace=True)
+    assert response.json() == {'plan_period_id': str(plan_period_id),
+                               'selected': [['2032-05-02', 'morning']],
+                               'unselected': [['2032-05-01', 'morning'], ['2032-05-02', 'afternoon']]}
+    assert _stored(person_id, plan_period_id) == {(first, TimeOfDay.evening), (second, TimeOfDay.morning)}
+    assert services.AvailDay.get_selected_times(person_id) == frozenset(_stored(person_id, plan_period_id))
+
+
+def test_apply_selection_rejects_invalid_changes(client, access_token, make_team, make_actor, make_plan_period):
+    team_id = make_team()
+    person_id = make_actor(team_id)
+    plan_period_id = make_plan_period(team_id, datetime.date(2032, 6, 1), datetime.date(2032, 6, 30))
+    headers = _actor_cookie(access_token, person_id)
+
+    response = _post_selection(client, headers, plan_period_id, [(datetime.date(2032, 6, 1), 'morning', True),
+                                                                 (datetime.date(2032, 7, 1), 'morning', True)])
+    assert response.status_code == 409
+    assert '01.07.2032' in response.json()['detail']
+
+    response = _post_selection(client, headers, plan_period_id, [(datetime.date(2032, 6, 1), 'night', True)])
+    assert response.status_code == 422
+
+    assert _stored(person_id, plan_period_id) == set()
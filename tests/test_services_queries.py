@@ -0,0 +1,186 @@
+import datetime
+import threading
+
+from pony.orm import db_session, select
+
+from databases import models, schemas, services
+from databases.enums import TimeOfDay
+
+
+def test_open_plan_periods_of_actor_query_count_is_constant(capture_sql, make_team, make_actor,
+                                                             make_plan_period):
+    """Regressionstest für das N+1-Problem: Die Anzahl der Abfragen hängt nicht von der Anzahl der Planperioden,
+    Availables und AvailDays ab."""
+    counts = {}
+    for n in (1, 8):
+        team_id = make_team()
+        person_id = make_actor(team_id)
+        for i in range(n):
+            start = datetime.date(2025, 1, 1) + datetime.timedelta(days=30 * i)
+            pp_id = make_plan_period(team_id, start, start + datetime.timedelta(days=27))
+            with db_session:
+                availables = models.Availables(plan_period=models.PlanPeriod[pp_id], person=models.Person[person_id])
+                for d in range(3):
+                    models.AvailDay(day=start + datetime.timedelta(days=d), time_of_day=TimeOfDay.morning,
+                                    availables=availables)
+        make_plan_period(team_id, datetime.date(2024, 1, 1), datetime.date(2024, 1, 31), closed=True)
+
+        with capture_sql() as statements:
+            plan_periods = services.PlanPeriod.get_open_plan_periods_of_actor(person_id)
+        assert len(plan_periods) == n
+        assert all(len(pp.avail_days) == 3 for pp in plan_periods)
+        counts[n] = len(statements)
+
+    assert counts[1] == counts[8] == 4
+
+
+def _query_plans(db, statements: list[tuple[str, object]]) -> list[str]:
+    """EXPLAIN QUERY PLAN (SQLite) aller SELECT-Anweisungen, je Anweisung die Zeilen des Plans."""
+    plans = []
+    with db_session:
+        cursor = db.get_connection().cursor()
+        for sql, arguments in statements:
+            if sql.lstrip().upper().startswith('SELECT'):
+                cursor.execute(f'EXPLAIN QUERY PLAN {sql}', arguments or ())
+                plans.append('\n'.join(row[-1] for row in cursor.fetchall()))
+    return plans
+
+
+def test_hot_queries_use_indexes(db, capture_sql, make_team, make_actor, make_plan_period):
+    """Die häufigen Filter aus services.py laufen über die Indizes aus models.py bzw. Migration 2 und lesen keine
+    Tabelle vollständig. Die Unique-Keys heißen in neuen SQLite-Datenbanken sqlite_autoindex_*, in migrierten
+    unq_*; geprüft werden dort deshalb die Spalten des Index."""
+    team_id = make_team()
+    person_id = make_actor(team_id)
+    start = datetime.date(2025, 1, 1)
+    pp_id = make_plan_period(team_id, start, datetime.date(2025, 1, 31))
+    with db_session:
+        availables = models.Availables(plan_period=models.PlanPeriod[pp_id], person=models.Person[person_id])
+        models.AvailDay(day=start, time_of_day=TimeOfDay.morning, availables=availables)
+
+    with capture_sql() as statements:
+        services.PlanPeriod.get_open_plan_periods_of_actor(person_id)
+        services.AvailDay.set_selected_time(person_id, start, TimeOfDay.morning, False)
+        with db_session:
+            select(ad for ad in models.AvailDay if ad.day == start)[:]
+    plans = '\n'.join(_query_plans(db, statements))
+
+    assert 'SCAN ' not in plans
+    assert 'USING INDEX idx_planperiod__team_closed (team=? AND closed=?)' in plans
+    assert 'USING INDEX idx_planperiod__team_start_end (team=?)' in plans
+    assert 'USING INDEX idx_availday__day (day=?)' in plans
+    assert '(person=? AND plan_period=?)' in plans
+    assert '(availables=? AND day=?)' in plans
+
+
+def test_not_feedbacked_availables_of_plan_periods(capture_sql, make_team, make_actor, make_plan_period):
+    """Als zurückgemeldet gilt ein Actor mit AvailDays oder Anmerkungen; ein leeres Availables zählt nicht."""
+    team_id = make_team()
+    with_day, notes_only, empty, nothing = (make_actor(team_id) for _ in range(4))
+    touched = make_plan_period(team_id, datetime.date(2033, 1, 1), datetime.date(2033, 1, 31))
+    untouched = make_plan_period(team_id, datetime.date(2033, 2, 1), datetime.date(2033, 2, 28))
+    make_actor(make_team())  # Actor eines anderen Teams
+    with db_session:
+        plan_period = models.PlanPeriod[touched]
+        availables = models.Availables(plan_period=plan_period, person=models.Person[with_day])
+        models.AvailDay(day=datetime.date(2033, 1, 2), time_of_day=TimeOfDay.morning, availables=availables)
+        models.Availables(plan_period=plan_period, person=models.Person[notes_only], notes='nur vormittags')
+        models.Availables(plan_period=plan_period, person=models.Person[empty])
+
+    with capture_sql() as statements:
+        not_feedbacked = services.Availables.get_not_feedbacked_availables_of_plan_periods([touched, untouched])
+    assert len(statements) == 3
+    assert {pp_id: {p.id for p in persons} for pp_id, persons in not_feedbacked.items()} == {
+        touched: {empty, nothing},
+        untouched: {with_day, notes_only, empty, nothing}}
+    assert [p.id for p in services.Availables.get_not_feedbacked_availables(str(touched))] in (
+        [empty, nothing], [nothing, empty])
+
+
+def test_available_days_to_db_writes_only_the_difference(capture_sql, make_team, make_actor, make_plan_period):
+    team_id = make_team()
+    person_id = make_actor(team_id)
+    pp_id = make_plan_period(team_id, datetime.date(2035, 1, 1), datetime.date(2035, 1, 31))
+    unchanged, changed, removed, blank, new = (datetime.date(2035, 1, d) for d in (2, 3, 4, 5, 6))
+    long_ago = datetime.date(2034, 12, 1)
+    with db_session:
+        availables = models.Availables(plan_period=models.PlanPeriod[pp_id], person=models.Person[person_id])
+        stored = {day: models.AvailDay(day=day, time_of_day=TimeOfDay.morning, availables=availables,
+                                       created_at=long_ago).id
+                  for day in (unchanged, changed, removed, blank)}
+
+    form = {f'{unchanged}_{pp_id}': 'v', f'{changed}_{pp_id}': 'n', f'{blank}_{pp_id}': 'x',
+            f'{new}_{pp_id}': 'g', f'infos_{pp_id}': 'ab 10 Uhr'}
+    with capture_sql() as statements:
+        plan_periods = services.AvailDay.available_days_to_db(form, person_id)
+    assert [pp.id for pp in plan_periods] == [pp_id]
+    deletes = [sql for sql, _ in statements if sql.lstrip().upper().startswith('DELETE')]
+    assert len(deletes) == 1 and '"AvailDay"' in deletes[0]
+
+    with db_session:
+        availables = models.Availables.get(person=models.Person[person_id], plan_period=models.PlanPeriod[pp_id])
+        assert availables.notes == 'ab 10 Uhr'
+        avail_days = {ad.day: ad for ad in availables.avail_days}
+        assert {day: ad.time_of_day for day, ad in avail_days.items()} == {
+            unchanged: TimeOfDay.morning, changed: TimeOfDay.afternoon, new: TimeOfDay.whole_day}
+        assert (avail_days[unchanged].id, avail_days[unchanged].created_at) == (stored[unchanged], long_ago)
+        assert avail_days[changed].id != stored[changed]
+        assert avail_days[new].created_at == datetime.date.today()
+        assert not models.AvailDay.exists(lambda ad: ad.id in (stored[changed], stored[removed], stored[blank]))
+
+
+def _availables_of(person_id, plan_period_id) -> list[tuple[str, set[tuple[datetime.date, TimeOfDay]]]]:
+    with db_session:
+        return [(a.notes, {(ad.day, ad.time_of_day) for ad in a.avail_days})
+                for a in select(a for a in models.Availables
+                                if a.person.id == person_id and a.plan_period.id == plan_period_id)]
+
+
+def test_mixed_calls_keep_one_availables_per_person_and_plan_period(make_team, make_actor, make_plan_period):
+    team_id = make_team()
+    person_id = make_actor(team_id)
+    pp_id = make_plan_period(team_id, datetime.date(2036, 1, 1), datetime.date(2036, 1, 31))
+    first, second, third = (datetime.date(2036, 1, d) for d in (1, 2, 3))
+
+    services.AvailDay.set_selected_time(person_id, first, TimeOfDay.morning, True)
+    services.Availables.update_notes_for_person_planperiod(person_id, pp_id, 'nur vormittags')
+    services.AvailDay.apply_selection(person_id, schemas.SelectionBatch(
+        plan_period_id=pp_id, changes=[schemas.SelectionChange(day=second, time_of_day='evening', selected=True)]))
+    services.AvailDay.available_days_to_db({f'{first}_{pp_id}': 'v', f'{second}_{pp_id}': 'a',
+                                            f'{third}_{pp_id}': 'g', f'infos_{pp_id}': 'ab 10 Uhr'}, person_id)
+    services.AvailDay.set_selected_time(person_id, third, TimeOfDay.whole_day, False)
+
+    assert _availables_of(person_id, pp_id) == [
+        ('ab 10 Uhr', {(first, TimeOfDay.morning), (second, TimeOfDay.evening)})]
+
+
+def test_concurrent_calls_keep_one_availables_per_person_and_plan_period(make_team, make_actor, make_plan_period):
+    """Parallele Requests (Doppelklick, zwei Tabs) legen über den Upsert kein zweites Availables an."""
+    team_id = make_team()
+    person_id = make_actor(team_id)
+    pp_id = make_plan_period(team_id, datetime.date(2036, 2, 1), datetime.date(2036, 2, 29))
+    days = [datetime.date(2036, 2, d) for d in range(1, 9)]
+    calls = [lambda: services.Availables.update_notes_for_person_planperiod(person_id, pp_id, 'Notiz')]
+    calls += [lambda day=day: services.AvailDay.set_selected_time(person_id, day, TimeOfDay.morning, True)
+              for day in days[:4]]
+    calls += [lambda day=day: services.AvailDay.apply_selection(person_id, schemas.SelectionBatch(
+        plan_period_id=pp_id, changes=[schemas.SelectionChange(day=day, time_of_day='morning', selected=True)]))
+              for day in days[4:]]
+    barrier = threading.Barrier(len(calls))
+    errors = []
+
+    def run(call):
+        barrier.wait()
+        try:
+            call()
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=run, args=(call,)) for call in calls]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(30)
+
+    assert errors == []
+    assert _availables_of(person_id, pp_id) == [('Notiz', {(day, TimeOfDay.morning) for day in days})]
@@ -0,0 +1,56 @@
+import smtplib
+
+import pytest
+
+from utilities import smtp_pool
+
+
+class FakeSMTP:
+    def __init__(self, extensions: set[str]):
+        self.extensions = extensions
+        self.calls: list[str] = []
+
+    def __call__(self, host, port):
+        return self
+
+    def ehlo(self):
+        self.calls.append('ehlo')
+
+    def has_extn(self, name):
+        return name in self.extensions
+
+    def starttls(self, context=None):
+        self.calls.append('starttls')
+
+    def login(self, user, password):
+        self.calls.append('login')
+
+    def close(self):
+        self.calls.append('close')
+
+
+def test_connect_refuses_server_without_starttls(monkeypatch):
+    smtp = FakeSMTP({'auth'})
+    monkeypatch.setattr(smtp_pool.smtplib, 'SMTP', smtp)
+    session = smtp_pool.SMTPSession()
+    with pytest.raises(smtplib.SMTPNotSupportedError):
+        session._connect()
+    assert 'login' not in smtp.calls
+    assert not session.connected
+
+
+def test_connect_logs_in_after_starttls(monkeypatch):
+    smtp = FakeSMTP({'starttls', 'auth'})
+    monkeypatch.setattr(smtp_pool.smtplib, 'SMTP', smtp)
+    session = smtp_pool.SMTPSession()
+    session._connect()
+    assert smtp.calls == ['ehlo', 'starttls', 'ehlo', 'login']
+    assert session.connected
+
+
+def test_connect_without_starttls_never_logs_in(monkeypatch):
+    smtp = FakeSMTP({'auth'})
+    monkeypatch.setattr(smtp_pool.smtplib, 'SMTP', smtp)
+    monkeypatch.setattr(smtp_pool, 'STARTTLS', False)
+    smtp_pool.SMTPSession()._connect()
+    assert 'login' not in smtp.calls
@@ -0,0 +1,85 @@
+"""Misst gleichzeitige Requests eines async-Endpunkts, der Services direkt (blockierend im Event-Loop) bzw. über
+databases/async_services.py aufruft. Die DB-Abfrage wird durch eine blockierende Wartezeit von --query-ms
+simuliert, der Thread-Pool wird wie in database.configure_connection_limit() auf --threads begrenzt.
+
+Aufruf: python -m utilities.async_services_benchmark [--requests N] [--query-ms MS] [--threads N] [--repeat N]"""
+import argparse
+import asyncio
+import time
+
+from anyio import to_thread
+
+import settings
+from databases.async_services import _AsyncService
+
+TICK = 0.005
+
+
+async def event_loop_lag(stop: asyncio.Event) -> float:
+    """Größte Verspätung eines asyncio.sleep(TICK) in Sekunden, solange stop nicht gesetzt ist."""
+    loop = asyncio.get_running_loop()
+    max_lag = 0.0
+    while not stop.is_set():
+        start = loop.time()
+        await asyncio.sleep(TICK)
+        max_lag = max(max_lag, loop.time() - start - TICK)
+    return max_lag
+
+
+class BenchmarkService:
+    query_seconds = 0.005
+
+    @staticmethod
+    def get_rows(request_id: int) -> int:
+        time.sleep(BenchmarkService.query_seconds)
+        return request_id
+
+
+AsyncBenchmarkService = _AsyncService(BenchmarkService)
+
+
+async def endpoint_direct(request_id: int) -> int:
+    return BenchmarkService.get_rows(request_id)
+
+
+async def endpoint_async_services(request_id: int) -> int:
+    return await AsyncBenchmarkService.get_rows(request_id)
+
+
+async def run_requests(endpoint, requests: int, threads: int) -> tuple[float, float]:
+    to_thread.current_default_thread_limiter().total_tokens = threads
+    stop = asyncio.Event()
+    lag = asyncio.create_task(event_loop_lag(stop))
+    await asyncio.sleep(0)
+    start = time.perf_counter()
+    results = await asyncio.gather(*(endpoint(i) for i in range(requests)))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    assert results == list(range(requests))
+    return elapsed, await lag
+
+
+def benchmark(endpoint, requests: int, threads: int, repeat: int) -> tuple[float, float]:
+    times, lags = zip(*(asyncio.run(run_requests(endpoint, requests, threads)) for _ in range(repeat)))
+    return sum(times) / repeat, max(lags)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--query-ms', type=float, default=5.0)
+    parser.add_argument('--threads', type=int, default=settings.settings.db_max_connections)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    BenchmarkService.query_seconds = args.query_ms / 1000
+    print(f'{"Aufruf":<30}{"Requests":>10}{"gesamt ms":>12}{"je Request ms":>15}{"max. Loop-Verzögerung ms":>26}')
+    for name, endpoint in {'direkt (blockierend)': endpoint_direct,
+                           f'async_services ({args.threads} Threads)': endpoint_async_services}.items():
+        elapsed, lag = benchmark(endpoint, args.requests, args.threads, args.repeat)
+        print(f'{name:<30}{args.requests:>10}{elapsed * 1000:>12.1f}{elapsed / args.requests * 1000:>15.2f}'
+              f'{lag * 1000:>26.1f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,174 @@
+"""In-Process-Caches für selten geänderte, aber häufig gelesene Daten."""
+import functools
+import inspect
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from collections import OrderedDict, defaultdict
+from typing import Any, Callable, Hashable
+
+import settings
+
+_MISSING = object()
+
+
+class CacheBackend(ABC):
+    """Speicher für ReadThroughCache. Ein geteilter Cache (z.B. Redis) für mehrere Worker muss nur diese drei
+    Methoden implementieren, Schlüssel und Werte müssen dafür serialisierbar sein."""
+
+    @abstractmethod
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        ...
+
+    @abstractmethod
+    def set(self, key: Hashable, value: Any, ttl: float | None = None):
+        ...
+
+    @abstractmethod
+    def delete(self, key: Hashable):
+        ...
+
+
+class TTLCache(CacheBackend):
+    """Thread-sicherer LRU-Cache mit begrenzter Größe, dessen Einträge nach ttl Sekunden verfallen."""
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is _MISSING:
+                return default
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: Hashable, value: Any, ttl: float | None = None):
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        with self._lock:
+            self._data[key] = (time.monotonic() + ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key: Hashable):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def delete_where(self, predicate: Callable[[Hashable], bool]):
+        with self._lock:
+            for key in [k for k in self._data if predicate(k)]:
+                del self._data[key]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+class ReadThroughCache:
+    """Cacht die Ergebnisse von Service-Funktionen, Schlüssel sind der Namespace und die Argumente.
+
+    Invalidiert wird explizit von den schreibenden Services, nach dem commit(): invalidate(*namespaces) verwirft
+    alle Einträge der Namespaces, invalidate() den ganzen Cache. Für jeden Namespace liegt im Backend eine
+    Generation, die Teil jedes Schlüssels ist. Eine neue Generation macht alle bisherigen Einträge unerreichbar,
+    sie verfallen dann über LRU/TTL. Das Backend muss dafür nicht über seine Schlüssel iterieren, und ein Lesevorgang,
+    der vor der Invalidierung begonnen hat, speichert sein Ergebnis unter der alten Generation. Fehlt die
+    Generation (verdrängt oder verfallen), wird eine neue angelegt.
+
+    Die gecachten Werte werden von allen Aufrufern geteilt und dürfen nicht verändert werden."""
+
+    def __init__(self, backend: CacheBackend):
+        self.backend = backend
+        self._namespaces: set[str] = set()
+        self._counts: defaultdict[str, dict[str, int]] = defaultdict(lambda: {'hits': 0, 'misses': 0,
+                                                                            'invalidations': 0})
+        self._lock = threading.Lock()
+
+    def cached(self, namespace: str):
+        """Decorator für Service-Funktionen. Die Argumente werden über die Signatur normalisiert und als str
+        verglichen, get(team_id=UUID(...)) und get('...') treffen denselben Eintrag. Exceptions werden nicht
+        gecacht."""
+        self._namespaces.add(namespace)
+
+        def decorator(func):
+            signature = inspect.signature(func)
+
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                bound = signature.bind(*args, **kwargs)
+                bound.apply_defaults()
+                key = self._key(namespace, bound.arguments.values())
+                value = self.backend.get(key, _MISSING)
+                if value is not _MISSING:
+                    self._count(namespace, 'hits')
+                    return value
+                self._count(namespace, 'misses')
+                value = func(*args, **kwargs)
+                self.backend.set(key, value)
+                return value
+
+            return wrapper
+
+        return decorator
+
+    def invalidate(self, *namespaces: str):
+        for namespace in namespaces or list(self._namespaces):
+            self.backend.set(('generation', namespace), uuid.uuid4().hex)
+            self._count(namespace, 'invalidations')
+
+    def metrics(self) -> dict[str, dict[str, int | float]]:
+        with self._lock:
+            return {ns: {**counts, 'hit_ratio': round(counts['hits'] / ((counts['hits'] + counts['misses']) or 1), 3)}
+                    for ns, counts in self._counts.items()}
+
+    def _key(self, namespace: str, args) -> tuple:
+        generation_key = ('generation', namespace)
+        generation = self.backend.get(generation_key)
+        if generation is None:
+            generation = uuid.uuid4().hex
+            self.backend.set(generation_key, generation)
+        return namespace, generation, tuple(str(arg) for arg in args)
+
+    def _count(self, namespace: str, name: str):
+        with self._lock:
+            self._counts[namespace][name] += 1
+
+
+# Eingeloggte Benutzer (schemas.PersonShow), Schlüssel: (user_id, exp des Tokens)
+principal_cache = TTLCache(maxsize=settings.settings.principal_cache_size,
+                           ttl=settings.settings.principal_cache_ttl_seconds)
+
+
+def invalidate_principal(user_id):
+    user_id = str(user_id)
+    principal_cache.delete_where(lambda key: key[0] == user_id)
+
+
+# Teams, Planperioden und Projekte (services.py), werden auf fast jeder Seite gelesen und selten geändert
+metadata_cache = ReadThroughCache(TTLCache(maxsize=settings.settings.metadata_cache_size,
+                                           ttl=settings.settings.metadata_cache_ttl_seconds))
+
+
+# Ausgewählte Tage/Tageszeiten der Actors in offenen Planperioden (services.AvailDay.get_selected_times),
+# Schlüssel: str(person_id)
+selection_cache = TTLCache(maxsize=settings.settings.selection_cache_size,
+                           ttl=settings.settings.selection_cache_ttl_seconds)
+
+
+def invalidate_selection(person_id):
+    selection_cache.delete(str(person_id))
+
+
+def update_selection(person_id, selected: set, unselected: set):
+    """Write-Through nach dem Speichern: aktualisiert den Eintrag der Person, falls er im Cache liegt."""
+    key = str(person_id)
+    if (cached := selection_cache.get(key)) is not None:
+        selection_cache.set(key, (cached - unselected) | selected)
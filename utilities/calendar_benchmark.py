@@ -0,0 +1,62 @@
+"""Misst die Dauer von CalendarModel (utilities/calendar_model.py) für lange Planperioden.
+
+Aufruf: python -m utilities.calendar_benchmark [--repeat N] [--periods N]"""
+import argparse
+import random
+import time
+import uuid
+from datetime import date, timedelta
+
+from databases import schemas
+from databases.enums import TimeOfDay
+from utilities.calendar_model import CalendarModel, month_chunks
+
+MONTHS = (1, 3, 6, 12)
+
+
+def plan_periods(months: int, count: int) -> list[schemas.PlanPeriodOfActor]:
+    """count aufeinanderfolgende Planperioden von je months Monaten, an etwa jedem dritten Tag ist eine
+    Tageszeit ausgewählt."""
+    periods = []
+    start = date(2025, 1, 1)
+    for _ in range(count):
+        end = start + timedelta(days=months * 30 - 1)
+        days = [start + timedelta(days=i) for i in range((end - start).days + 1)]
+        avail_days = {day: [random.choice(list(TimeOfDay))] for day in days if random.random() < 0.3}
+        periods.append(schemas.PlanPeriodOfActor(id=uuid.uuid4(), start=start, end=end, deadline=start,
+                                                 closed=False, avail_days=avail_days))
+        start = end + timedelta(days=1)
+    return periods
+
+
+def benchmark(periods: list[schemas.PlanPeriodOfActor], repeat: int) -> tuple[float, float]:
+    """Dauer eines Aufbaus mit leerem Cache und mit gefülltem Cache (gleiche Planperioden)."""
+    time_cold = 0.0
+    for _ in range(repeat):
+        month_chunks.cache_clear()
+        start = time.perf_counter()
+        CalendarModel(periods)
+        time_cold += time.perf_counter() - start
+    start = time.perf_counter()
+    for _ in range(repeat):
+        CalendarModel(periods)
+    time_warm = time.perf_counter() - start
+    return time_cold / repeat, time_warm / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--repeat', type=int, default=200)
+    parser.add_argument('--periods', type=int, default=2)
+    args = parser.parse_args()
+
+    print(f'{"Monate je Periode":<20}{"Tage":>8}{"kalt ms":>10}{"warm ms":>10}')
+    for months in MONTHS:
+        periods = plan_periods(months, args.periods)
+        days = sum((pp.end - pp.start).days + 1 for pp in periods)
+        time_cold, time_warm = benchmark(periods, args.repeat)
+        print(f'{months:<20}{days:>8}{time_cold * 1000:>10.3f}{time_warm * 1000:>10.3f}')
+
+
+if __name__ == '__main__':
+    main()
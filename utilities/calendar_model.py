@@ -0,0 +1,64 @@
+"""Daten für den Kalender von actors_new (templates/calendar_new.html).
+
+Die Tage der offenen Planperioden eines Actors werden nach (Jahr, Monat) gruppiert, die Planperioden sind
+nach Start- und Enddatum sortiert. Die ausgewählten Tageszeiten stammen aus
+services.PlanPeriod.get_open_plan_periods_of_actor(), die alle AvailDays des Actors mit einer Abfrage lädt."""
+import calendar
+import functools
+from datetime import date, timedelta
+
+from databases import schemas
+
+MonthKey = tuple[int, int]
+
+
+def period_label(start: date, end: date) -> str:
+    """Bezeichnung der Planperiode im Kalender und in den Formularen von actors_new."""
+    return f'{start.strftime("%d.%m.%y")} - {end.strftime("%d.%m.%y")}'
+
+
+@functools.lru_cache(maxsize=512)
+def month_chunks(start: date, end: date) -> tuple[tuple[MonthKey, tuple[date, ...]], ...]:
+    """Tage von start bis end, aufgeteilt nach (Jahr, Monat). Der Zeitraum ist die Version der Planperiode, die
+    das Raster bestimmt: Wird start oder end geändert, entsteht ein neuer Cache-Eintrag."""
+    chunks = []
+    chunk_start = start
+    while chunk_start <= end:
+        month_end = chunk_start.replace(day=calendar.monthrange(chunk_start.year, chunk_start.month)[1])
+        chunk_end = min(end, month_end)
+        chunks.append(((chunk_start.year, chunk_start.month),
+                       tuple(chunk_start + timedelta(days=i) for i in range((chunk_end - chunk_start).days + 1))))
+        chunk_start = chunk_end + timedelta(days=1)
+    return tuple(chunks)
+
+
+class CalendarModel:
+    def __init__(self, plan_periods: list[schemas.PlanPeriodOfActor]):
+        self.plan_periods = sorted(plan_periods, key=lambda pp: (pp.start, pp.end))
+        self.sorted_periods: list[str] = []
+        self.period_plan_periods: dict[str, schemas.PlanPeriodOfActor] = {}
+        self.period_deadlines: dict[str, date] = {}
+        self.period_messages: dict[str, str | None] = {}
+        self.period_first_month: dict[str, MonthKey] = {}
+        self.grouped_dates: dict[MonthKey, dict] = {}
+
+        for plan_period in self.plan_periods:
+            label = period_label(plan_period.start, plan_period.end)
+            self.sorted_periods.append(label)
+            self.period_plan_periods[label] = plan_period
+            self.period_deadlines[label] = plan_period.deadline
+            self.period_messages[label] = plan_period.notes
+            self.period_first_month[label] = (plan_period.start.year, plan_period.start.month)
+            for (year, month), days in month_chunks(plan_period.start, plan_period.end):
+                group = self.grouped_dates.setdefault((year, month), {'year': year, 'month': month, 'periods': {}})
+                group['periods'][label] = days
+        # Planperioden können sich überschneiden, die Monate werden deshalb nach dem Einsammeln sortiert.
+        self.grouped_dates = dict(sorted(self.grouped_dates.items()))
+
+    def template_context(self) -> dict:
+        return {'grouped_dates': self.grouped_dates,
+                'period_deadlines': self.period_deadlines,
+                'period_messages': self.period_messages,
+                'period_first_month': self.period_first_month,
+                'period_plan_periods': self.period_plan_periods,
+                'sorted_periods': self.sorted_periods}
@@ -0,0 +1,53 @@
+"""Bedingte GET-Requests: schwache ETags und Last-Modified aus der Version einer Collection.
+
+Die Version liefern die *_version()-Services in services.py (Anzahl und jüngstes last_modified je Tabelle).
+Stimmt der ETag mit If-None-Match überein, antwortet der Endpunkt mit 304, ohne die Daten zu laden und zu
+serialisieren. If-Modified-Since wird nicht ausgewertet: Gelöschte Einträge verändern das jüngste
+last_modified nicht, nur die Anzahl und damit den ETag."""
+import datetime
+import email.utils
+import hashlib
+
+from fastapi import Request, Response
+
+CACHE_CONTROL = 'private, no-cache'
+
+
+class Validators:
+    def __init__(self, scope, version: tuple):
+        """scope unterscheidet gleiche Versionen in verschiedenen Kontexten (z.B. Endpunkt und Benutzer)."""
+        digest = hashlib.sha1(repr((scope, version)).encode()).hexdigest()
+        self.etag = f'W/"{digest}"'
+        self.last_modified = max(_datetimes(version), default=None)
+
+    @property
+    def headers(self) -> dict[str, str]:
+        headers = {'ETag': self.etag, 'Cache-Control': CACHE_CONTROL}
+        if self.last_modified is not None:
+            headers['Last-Modified'] = email.utils.format_datetime(
+                self.last_modified.replace(tzinfo=datetime.timezone.utc, microsecond=0), usegmt=True)
+        return headers
+
+    def matches(self, request: Request) -> bool:
+        """Schwacher Vergleich nach RFC 9110, 13.1.2."""
+        if_none_match = request.headers.get('if-none-match')
+        if not if_none_match:
+            return False
+        if if_none_match.strip() == '*':
+            return True
+        tags = {tag.strip().removeprefix('W/') for tag in if_none_match.split(',')}
+        return self.etag.removeprefix('W/') in tags
+
+    def not_modified(self) -> Response:
+        return Response(status_code=304, headers=self.headers)
+
+    def apply(self, response: Response):
+        response.headers.update(self.headers)
+
+
+def _datetimes(version):
+    if isinstance(version, datetime.datetime):
+        yield version
+    elif isinstance(version, (tuple, list)):
+        for value in version:
+            yield from _datetimes(value)
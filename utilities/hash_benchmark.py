@@ -0,0 +1,53 @@
+"""Misst auf dem aktuellen Host die Dauer von Hashing und Prüfung je Hash-Profil.
+
+Aufruf: python -m utilities.hash_benchmark [--repeat N]"""
+import argparse
+import time
+
+import settings
+from utilities.utils import create_pwd_context
+
+PROFILES = {
+    'bcrypt-10': dict(scheme='bcrypt', bcrypt_rounds=10),
+    'bcrypt-12': dict(scheme='bcrypt', bcrypt_rounds=12),
+    'bcrypt-13': dict(scheme='bcrypt', bcrypt_rounds=13),
+    'argon2id-64MiB-t3': dict(scheme='argon2', argon2_memory_cost=65536, argon2_time_cost=3),
+    'argon2id-19MiB-t2': dict(scheme='argon2', argon2_memory_cost=19456, argon2_time_cost=2),
+}
+
+
+def benchmark(profile: dict, repeat: int) -> tuple[float, float]:
+    params = dict(scheme='bcrypt', bcrypt_rounds=12, argon2_memory_cost=settings.settings.argon2_memory_cost,
+                  argon2_time_cost=settings.settings.argon2_time_cost,
+                  argon2_parallelism=settings.settings.argon2_parallelism) | profile
+    context = create_pwd_context(**params)
+    start = time.perf_counter()
+    hashes = [context.hash('benchmark-password') for _ in range(repeat)]
+    time_hash = (time.perf_counter() - start) / repeat
+    start = time.perf_counter()
+    for hashed in hashes:
+        context.verify('benchmark-password', hashed)
+    time_verify = (time.perf_counter() - start) / repeat
+    return time_hash, time_verify
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    current = dict(scheme=settings.settings.password_hash_scheme, bcrypt_rounds=settings.settings.bcrypt_rounds,
+                   argon2_memory_cost=settings.settings.argon2_memory_cost,
+                   argon2_time_cost=settings.settings.argon2_time_cost)
+    print(f'{"Profil":<22}{"hash ms":>10}{"verify ms":>12}')
+    for name, profile in {'aktuell (Settings)': current, **PROFILES}.items():
+        try:
+            time_hash, time_verify = benchmark(profile, args.repeat)
+        except RuntimeError as e:
+            print(f'{name:<22}  übersprungen: {e}')
+            continue
+        print(f'{name:<22}{time_hash * 1000:>10.1f}{time_verify * 1000:>12.1f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+"""APScheduler-Job-Store auf Basis der Pony-Datenbank (models.SchedulerJob).
+
+Wie beim SQLAlchemyJobStore von APScheduler wird pro Job nur der gepickelte Zustand gespeichert. Abfragen nach
+Id und next_run_time laufen über den Primärschlüssel bzw. einen Index, der Scheduler lädt beim Start also nur die
+fälligen Jobs und den Zeitpunkt des nächsten Jobs."""
+import pickle
+from uuid import UUID
+
+from apscheduler.job import Job
+from apscheduler.jobstores.base import BaseJobStore, ConflictingIdError, JobLookupError
+from apscheduler.util import datetime_to_utc_timestamp, utc_timestamp_to_datetime
+
+from databases import services
+
+
+class PonyJobStore(BaseJobStore):
+    def __init__(self, pickle_protocol: int = pickle.HIGHEST_PROTOCOL):
+        super().__init__()
+        self.pickle_protocol = pickle_protocol
+
+    def lookup_job(self, job_id):
+        job_state = services.APSchedulerJob.get_job_state(job_id)
+        return self._reconstitute_job(job_state) if job_state else None
+
+    def get_due_jobs(self, now):
+        return self._reconstitute_jobs(services.APSchedulerJob.get_job_states(datetime_to_utc_timestamp(now)))
+
+    def get_next_run_time(self):
+        return utc_timestamp_to_datetime(services.APSchedulerJob.get_next_run_time())
+
+    def get_all_jobs(self):
+        jobs = self._reconstitute_jobs(services.APSchedulerJob.get_job_states())
+        self._fix_paused_jobs_sorting(jobs)
+        return jobs
+
+    def add_job(self, job: Job):
+        if not services.APSchedulerJob.add_job_state(job.id, datetime_to_utc_timestamp(job.next_run_time),
+                                                     self._serialize(job), self._plan_period_id(job)):
+            raise ConflictingIdError(job.id)
+
+    def update_job(self, job: Job):
+        if not services.APSchedulerJob.update_job_state(job.id, datetime_to_utc_timestamp(job.next_run_time),
+                                                        self._serialize(job)):
+            raise JobLookupError(job.id)
+
+    def remove_job(self, job_id):
+        if not services.APSchedulerJob.delete_job_state(job_id):
+            raise JobLookupError(job_id)
+
+    def remove_all_jobs(self):
+        services.APSchedulerJob.delete_all_job_states()
+
+    def _serialize(self, job: Job) -> bytes:
+        return pickle.dumps(job.__getstate__(), self.pickle_protocol)
+
+    @staticmethod
+    def _plan_period_id(job: Job) -> UUID | None:
+        """Die Remainder-Jobs der Planperioden haben die Id der Planperiode als Job-Id."""
+        try:
+            return UUID(job.id)
+        except ValueError:
+            return None
+
+    def _reconstitute_job(self, job_state: bytes) -> Job:
+        job_state = pickle.loads(job_state)
+        job_state['jobstore'] = self
+        job = Job.__new__(Job)
+        job.__setstate__(job_state)
+        job._scheduler = self._scheduler
+        job._jobstore_alias = self._alias
+        return job
+
+    def _reconstitute_jobs(self, job_states: list[tuple[str, bytes]]) -> list[Job]:
+        jobs = []
+        for job_id, job_state in job_states:
+            try:
+                jobs.append(self._reconstitute_job(job_state))
+            except Exception:
+                self._logger.exception('Unable to restore job "%s" -- removing it', job_id)
+                services.APSchedulerJob.delete_job_state(job_id)
+        return jobs
+
+    def __repr__(self):
+        return f'<{self.__class__.__name__}>'
@@ -0,0 +1,60 @@
+"""Misst die Suche eines Users beim Login über lower(email) (vor Migration 1) gegenüber der Suche über die Spalte
+email_normalized mit Unique-Index (services.Person.find_user_by_email). Gemessen wird auf einer temporären
+SQLite-Datenbank mit --persons Personen, die Datenbank aus den Settings wird nicht benutzt.
+
+Aufruf: python -m utilities.login_lookup_benchmark [--persons N] [--repeat N]"""
+import argparse
+import os
+import random
+import sqlite3
+import tempfile
+import time
+import uuid
+
+from databases.models import normalize_email
+
+QUERIES = {
+    'lower(email) = ?': 'SELECT "id", "email", "password" FROM "Person" WHERE lower("email") = ?',
+    'email_normalized = ?': 'SELECT "id", "email", "password" FROM "Person" WHERE "email_normalized" = ?',
+}
+
+
+def create_db(path: str, persons: int) -> list[str]:
+    """Legt die Tabelle Person mit den für den Login relevanten Spalten an, gibt die E-Mails zurück."""
+    emails = [f'Vorname{i}.Nachname{i}@Example.com' for i in range(persons)]
+    with sqlite3.connect(path) as connection:
+        connection.execute('CREATE TABLE "Person" ("id" TEXT PRIMARY KEY, "email" VARCHAR(50) UNIQUE NOT NULL, '
+                           '"email_normalized" VARCHAR(50) UNIQUE, "password" TEXT NOT NULL)')
+        connection.executemany('INSERT INTO "Person" VALUES (?, ?, ?, ?)',
+                               [(str(uuid.uuid4()), email, normalize_email(email), '-') for email in emails])
+    return emails
+
+
+def benchmark(connection: sqlite3.Connection, sql: str, emails: list[str]) -> tuple[float, str]:
+    plan = ' '.join(row[-1] for row in connection.execute(f'EXPLAIN QUERY PLAN {sql}', (emails[0],)))
+    start = time.perf_counter()
+    for email in emails:
+        assert connection.execute(sql, (normalize_email(email),)).fetchone()
+    return (time.perf_counter() - start) / len(emails), plan
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--persons', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=200)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, 'login_lookup.sqlite')
+        emails = create_db(path, args.persons)
+        lookups = random.choices(emails, k=args.repeat)
+        connection = sqlite3.connect(path)
+        print(f'{"Abfrage":<24}{"Personen":>10}{"je Login ms":>13}  Plan')
+        for name, sql in QUERIES.items():
+            elapsed, plan = benchmark(connection, sql, lookups)
+            print(f'{name:<24}{args.persons:>10}{elapsed * 1000:>13.3f}  {plan}')
+        connection.close()
+
+
+if __name__ == '__main__':
+    main()
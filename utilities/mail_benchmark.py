@@ -0,0 +1,89 @@
+"""Misst das Rendern der E-Mails aus templates/mails (utilities/mail_templates.py) für eine Planperiode mit vielen
+Empfängern, einmal mit den beim Start kompilierten Vorlagen und einmal mit für jede Mail neu kompilierten Vorlagen.
+
+Aufruf: python -m utilities.mail_benchmark [--recipients N] [--repeat N]"""
+import argparse
+import random
+import time
+import uuid
+from datetime import date, timedelta
+
+from databases import schemas
+from databases.enums import TimeOfDay
+from utilities import send_mail
+from utilities.mail_templates import MailTemplate, environment
+
+
+def plan_period(recipients: int) -> tuple[schemas.PlanPeriod, list[schemas.Person]]:
+    project = schemas.Project(id=uuid.uuid4(), name='Benchmark-Projekt', active=True)
+    dispatcher = schemas.Person(id=uuid.uuid4(), f_name='Dis', l_name='Patcher', email='dispatcher@example.com',
+                                username='dispatcher', project=project)
+    team = schemas.Team(id=uuid.uuid4(), name='Team', dispatcher=dispatcher)
+    persons = [schemas.Person(id=uuid.uuid4(), f_name=f'Vorname{i}', l_name=f'Nachname{i}',
+                              email=f'actor{i}@example.com', username=f'actor{i}', project=project)
+               for i in range(recipients)]
+    return schemas.PlanPeriod(id=uuid.uuid4(), start=date(2025, 1, 1), end=date(2025, 3, 31),
+                              deadline=date(2024, 12, 15), team=team, closed=False), persons
+
+
+def avail_days_recipients(plan_period: schemas.PlanPeriod, persons: list[schemas.Person]) -> list[tuple[str, dict]]:
+    """Empfänger von send_avail_days_to_actors() mit je etwa 20 Tagen."""
+    day_labels = send_mail._day_labels(plan_period, '%d.%m.%Y')
+    days = list(day_labels)
+    recipients = []
+    for person in persons:
+        avail_days = sorted(random.sample(days, 20))
+        recipients.append((person.email, {
+            'name': send_mail._full_name(person),
+            'avail_days': [f'{day_labels[day]} ({send_mail.TIME_OF_DAY_EXPLICIT[random.choice("vng")]})'
+                           for day in avail_days]}))
+    return recipients
+
+
+def render_uncompiled(template: MailTemplate, shared: dict, recipients: list[tuple[str, dict]]):
+    """Wie render_batch(), aber die Vorlagen werden für jede Mail neu geladen und kompiliert."""
+    for send_to, context in recipients:
+        environment.cache.clear()
+        MailTemplate(template.name, template.subject.render(shared)).render(send_to, shared | context)
+
+
+def measure(func, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - start) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--recipients', type=int, default=500)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    pp, persons = plan_period(args.recipients)
+    dispatcher = pp.team.dispatcher
+    remainder_shared = {'period': send_mail._period(pp), 'dispatcher': send_mail._full_name(dispatcher),
+                        'project': dispatcher.project.name, 'homepage': send_mail.HOMEPAGE}
+    remainder_recipients = [(p.email, {'name': send_mail._full_name(p)}) for p in persons]
+    avail_days_shared = {'period': send_mail._period(pp, '%d.%m.%Y', '-'),
+                         'dispatcher': send_mail._full_name(dispatcher), 'project': dispatcher.project.name}
+    recipients = avail_days_recipients(pp, persons)
+
+    cases = {
+        'remainder_deadline': (
+            lambda: send_mail.remainder_deadline_messages(pp, persons),
+            lambda: render_uncompiled(send_mail.REMAINDER_DEADLINE, remainder_shared, remainder_recipients)),
+        'avail_days_to_actor': (
+            lambda: send_mail.AVAIL_DAYS_TO_ACTOR.render_batch(avail_days_shared, recipients),
+            lambda: render_uncompiled(send_mail.AVAIL_DAYS_TO_ACTOR, avail_days_shared, recipients)),
+    }
+    print(f'{"Mail":<22}{"Empfänger":>10}{"Batch ms":>10}{"je Mail µs":>12}{"neu kompiliert ms":>20}')
+    for name, (batch, uncompiled) in cases.items():
+        time_batch = measure(batch, args.repeat)
+        time_uncompiled = measure(uncompiled, 1)
+        print(f'{name:<22}{args.recipients:>10}{time_batch * 1000:>10.1f}'
+              f'{time_batch / args.recipients * 1e6:>12.1f}{time_uncompiled * 1000:>20.1f}')
+
+
+if __name__ == '__main__':
+    main()
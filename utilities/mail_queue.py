@@ -0,0 +1,118 @@
+"""Versand der E-Mails aus dem Spool (models.OutgoingMail) durch einen Pool von Hintergrund-Threads.
+
+Die Request-Handler und Scheduler-Jobs legen Mails über send_mail.send_email(s) nur im Spool ab. Jeder Worker
+verschickt alle gerade fälligen Mails über eine Verbindung aus utilities.smtp_pool."""
+import email
+import threading
+import time
+from datetime import timedelta
+from email import policy
+
+import settings
+from databases import services
+from utilities import smtp_pool
+from utilities.smtp_pool import SMTPSession
+
+MAIL_WORKERS = settings.settings.mail_workers
+MAX_ATTEMPTS = settings.settings.mail_max_attempts
+RETRY_DELAY = timedelta(seconds=settings.settings.mail_retry_delay_seconds)
+POLL_INTERVAL = settings.settings.mail_poll_interval_seconds
+BATCH_SIZE = 20
+LEASE = timedelta(minutes=5)  # So lange ist eine Mail für einen Worker reserviert.
+MARK_SENT_RETRY_SECONDS = 2.0  # Wartezeit zwischen zwei Versuchen, eine verschickte Mail als verschickt zu speichern.
+
+_wake_up = threading.Event()
+_stop = threading.Event()
+_workers: list['MailWorker'] = []
+# Verschickte Mails, deren Status noch nicht gespeichert werden konnte. Werden sie nach Ablauf von LEASE erneut
+# vergeben, wird nur noch der Status gespeichert und nicht ein zweites Mal verschickt.
+_sent_unconfirmed: set = set()
+_sent_unconfirmed_lock = threading.Lock()
+
+
+class MailWorker(threading.Thread):
+    def __init__(self, number: int):
+        super().__init__(name=f'mail-worker-{number}', daemon=True)
+
+    def run(self):
+        while not _stop.is_set():
+            try:
+                mails = services.OutgoingMail.claim_due_mails(BATCH_SIZE, LEASE)
+            except Exception as e:
+                print(f'{self.name}: Mails konnten nicht geladen werden: {e}', flush=True)
+                mails = []
+            if not mails:
+                _wake_up.wait(POLL_INTERVAL)
+                _wake_up.clear()
+                continue
+            try:
+                with smtp_pool.pool.session() as session:
+                    for mail in mails:
+                        self._send(session, mail)
+            except Exception as e:
+                # Nicht abgeschlossene Mails bleiben reserviert und werden nach Ablauf von LEASE erneut vergeben.
+                print(f'{self.name}: Batch abgebrochen: {e}', flush=True)
+                _stop.wait(POLL_INTERVAL)
+
+    def _send(self, session: SMTPSession, mail):
+        """Fehler beim Versand und beim Aktualisieren des Spools werden protokolliert, der Worker läuft weiter."""
+        with _sent_unconfirmed_lock:
+            already_sent = mail.id in _sent_unconfirmed
+        if already_sent:
+            self._mark_sent(mail)
+            return
+        try:
+            session.send(email.message_from_string(mail.message, policy=policy.default))
+        except Exception as e:
+            session.close()
+            print(f'{self.name}: Versand an {mail.send_to} fehlgeschlagen: {e}', flush=True)
+            try:
+                services.OutgoingMail.mark_failed(mail.id, str(e), MAX_ATTEMPTS, RETRY_DELAY)
+            except Exception as db_error:
+                print(f'{self.name}: Fehlversuch für {mail.id} nicht gespeichert: {db_error}', flush=True)
+            return
+        self._mark_sent(mail)
+
+    def _mark_sent(self, mail):
+        """Speichert den Versand. Schlägt das fehl, wird es bis zur Hälfte von LEASE wiederholt, also bevor die Mail
+        einem anderen Worker erneut zugeteilt werden kann. Gelingt es auch dann nicht, bleibt die Mail in
+        _sent_unconfirmed vorgemerkt."""
+        deadline = time.monotonic() + LEASE.total_seconds() / 2
+        while True:
+            try:
+                services.OutgoingMail.mark_sent(mail.id)
+            except Exception as e:
+                if time.monotonic() + MARK_SENT_RETRY_SECONDS < deadline and not _stop.is_set():
+                    _stop.wait(MARK_SENT_RETRY_SECONDS)
+                    continue
+                print(f'{self.name}: Mail {mail.id} verschickt, aber nicht als verschickt gespeichert: {e}',
+                      flush=True)
+                with _sent_unconfirmed_lock:
+                    _sent_unconfirmed.add(mail.id)
+                return
+            with _sent_unconfirmed_lock:
+                _sent_unconfirmed.discard(mail.id)
+            return
+
+
+def notify_new_mail():
+    """Weckt die wartenden Worker, damit neue Mails nicht erst nach POLL_INTERVAL verschickt werden."""
+    _wake_up.set()
+
+
+def start_workers(number: int = MAIL_WORKERS):
+    _stop.clear()
+    for i in range(number):
+        worker = MailWorker(i)
+        worker.start()
+        _workers.append(worker)
+    print(f'{number} mail workers started', flush=True)
+
+
+def stop_workers(timeout: float = 10):
+    _stop.set()
+    _wake_up.set()
+    for worker in _workers:
+        worker.join(timeout)
+    _workers.clear()
+    smtp_pool.pool.close_all()
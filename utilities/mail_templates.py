@@ -0,0 +1,52 @@
+"""Jinja2-Vorlagen der E-Mails (templates/mails) für utilities/send_mail.py.
+
+Je Mail gibt es eine Text-Vorlage <name>.txt und eine HTML-Vorlage <name>.html, verschickt wird multipart/alternative.
+Die Vorlagen werden beim Anlegen der MailTemplate-Objekte in send_mail.py, also beim Start, einmal kompiliert.
+render_batch() erzeugt die Mails aller Empfänger aus einem gemeinsamen Kontext (Planperiode, Dispatcher, Projekt,
+einmal je Aufruf formatiert) und dem Kontext des jeweiligen Empfängers. Zusammengesetzt werden die Mails mit den
+email.mime-Klassen (Policy compat32): EmailMessage.set_content() parst und prüft jeden Header und kostet ein
+Vielfaches des Renderns (python -m utilities.mail_benchmark)."""
+from email.message import Message
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+
+from jinja2 import Environment, FileSystemLoader, StrictUndefined, select_autoescape
+
+import settings
+
+SEND_ADDRESS = settings.settings.send_address
+TEMPLATE_DIR = 'templates/mails'
+
+# Nur die HTML-Vorlagen werden escaped, Text-Vorlagen und Betreffzeilen nicht. Ohne auto_reload prüft Jinja2 beim
+# Rendern nicht, ob sich die Vorlagen geändert haben.
+environment = Environment(loader=FileSystemLoader(TEMPLATE_DIR),
+                          autoescape=select_autoescape(['html'], default_for_string=False),
+                          undefined=StrictUndefined, trim_blocks=True, lstrip_blocks=True, keep_trailing_newline=True,
+                          auto_reload=False)
+
+
+class MailTemplate:
+    def __init__(self, name: str, subject: str):
+        """subject ist selbst eine Vorlage, sie wird mit dem gemeinsamen Kontext gerendert."""
+        self.name = name
+        self.subject = environment.from_string(subject)
+        self.text = environment.get_template(f'{name}.txt')
+        self.html = environment.get_template(f'{name}.html')
+
+    def render(self, send_to: str, context: dict) -> Message:
+        return self._message(send_to, self.subject.render(context), context)
+
+    def render_batch(self, shared: dict, recipients: list[tuple[str, dict]]) -> list[Message]:
+        """Eine Mail je (Adresse, Kontext des Empfängers). Der Betreff wird einmal aus shared erzeugt,
+        der Kontext des Empfängers ergänzt bzw. überschreibt shared."""
+        subject = self.subject.render(shared)
+        return [self._message(send_to, subject, shared | context) for send_to, context in recipients]
+
+    def _message(self, send_to: str, subject: str, context: dict) -> Message:
+        msg = MIMEMultipart('alternative')
+        msg['From'] = SEND_ADDRESS
+        msg['To'] = send_to
+        msg['Subject'] = subject
+        msg.attach(MIMEText(self.text.render(context), 'plain', 'utf-8'))
+        msg.attach(MIMEText(self.html.render(context), 'html', 'utf-8'))
+        return msg
@@ -0,0 +1,71 @@
+"""Asynchroner Zugriff auf Passwort-Hashing und -Prüfung.
+
+bcrypt braucht pro Aufruf einige hundert Millisekunden CPU. Damit ein Login nicht den Event-Loop von uvicorn
+blockiert, laufen Hashing und Prüfung in einem eigenen, in der Größe begrenzten Thread-Pool (bcrypt gibt
+während der Berechnung den GIL frei). Weitere Logins warten in der Queue des Pools."""
+import asyncio
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import settings
+from utilities import utils
+
+
+class PasswordService:
+    def __init__(self, max_workers: int):
+        self.max_workers = max_workers
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='password')
+        self._lock = threading.Lock()
+        self._waiting = 0
+        self._running = 0
+
+    @property
+    def queue_depth(self) -> int:
+        """Anzahl der Aufträge, die auf einen freien Worker warten."""
+        return self._waiting
+
+    def metrics(self) -> dict[str, int]:
+        return {'max_workers': self.max_workers, 'queue_depth': self._waiting, 'running': self._running}
+
+    def _run(self, func, *args):
+        with self._lock:
+            self._waiting -= 1
+            self._running += 1
+        try:
+            return func(*args)
+        finally:
+            with self._lock:
+                self._running -= 1
+
+    def _done(self, future: Future):
+        # Ein abgebrochener Auftrag (Request abgebrochen, shutdown()) ist nie gestartet und wartet nicht mehr.
+        if future.cancelled():
+            with self._lock:
+                self._waiting -= 1
+
+    async def _submit(self, func, *args):
+        with self._lock:
+            self._waiting += 1
+        try:
+            future = self._executor.submit(self._run, func, *args)
+        except BaseException:
+            with self._lock:
+                self._waiting -= 1
+            raise
+        future.add_done_callback(self._done)
+        return await asyncio.wrap_future(future)
+
+    async def hash(self, password: str) -> str:
+        return await self._submit(utils.hash_psw, password)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return await self._submit(utils.verify, plain_password, hashed_password)
+
+    async def verify_and_update(self, plain_password: str, hashed_password: str) -> tuple[bool, str | None]:
+        return await self._submit(utils.verify_and_update, plain_password, hashed_password)
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+password_service = PasswordService(max_workers=settings.settings.password_hash_workers)
@@ -0,0 +1,117 @@
+"""Misst die Antwortzeiten eines anderen Endpunkts (p50/p99) während gleichzeitiger Logins, einmal mit der
+Passwort-Prüfung direkt im Event-Loop und einmal über utilities/password_service.py. Die Requests laufen ohne
+Netzwerk direkt über die ASGI-Schnittstelle einer FastAPI-App mit einem Login- und einem Ping-Endpunkt.
+Hash-Verfahren und Kosten kommen aus den Settings.
+
+Aufruf: python -m utilities.password_service_benchmark [--logins N] [--workers N] [--repeat N]"""
+import argparse
+import asyncio
+import time
+
+from fastapi import FastAPI
+
+from utilities import utils
+from utilities.password_service import PasswordService
+
+PASSWORD = 'benchmark-password'
+PING_INTERVAL = 0.005
+
+
+def create_app(service: PasswordService, hashed: str) -> FastAPI:
+    app = FastAPI()
+
+    @app.post('/login-inline')
+    async def login_inline():
+        """Wie vor password_service: bcrypt blockiert den Event-Loop."""
+        return {'valid': utils.verify(PASSWORD, hashed)}
+
+    @app.post('/login-service')
+    async def login_service():
+        return {'valid': await service.verify(PASSWORD, hashed)}
+
+    @app.get('/ping')
+    async def ping():
+        return {}
+
+    return app
+
+
+async def request(app: FastAPI, method: str, path: str) -> int:
+    """Ein Request über die ASGI-Schnittstelle, liefert den Statuscode."""
+    scope = {'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': method, 'path': path,
+             'raw_path': path.encode(), 'root_path': '', 'scheme': 'http', 'query_string': b'', 'headers': [],
+             'client': ('127.0.0.1', 0), 'server': ('benchmark', 80)}
+    status = 0
+
+    async def receive():
+        return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+    async def send(message):
+        nonlocal status
+        if message['type'] == 'http.response.start':
+            status = message['status']
+
+    await app(scope, receive, send)
+    return status
+
+
+async def ping_latencies(app: FastAPI, end: asyncio.Future) -> list[float]:
+    """Requests an /ping nach festem Takt (alle PING_INTERVAL Sekunden), bis zu dem in end gesetzten Zeitpunkt.
+    Die Antwortzeit zählt ab dem geplanten Zeitpunkt, ein blockierter Event-Loop verlängert also die Antwortzeiten
+    aller Pings, die in dieser Zeit hätten geschickt werden sollen."""
+    latencies = []
+    start = time.perf_counter()
+    while not end.done() or start + len(latencies) * PING_INTERVAL <= end.result():
+        planned = start + len(latencies) * PING_INTERVAL
+        if (delay := planned - time.perf_counter()) > 0:
+            await asyncio.sleep(delay)
+        assert await request(app, 'GET', '/ping') == 200
+        latencies.append(time.perf_counter() - planned)
+    return latencies
+
+
+async def run_logins(app: FastAPI, path: str, logins: int) -> tuple[float, list[float]]:
+    end = asyncio.get_running_loop().create_future()
+    pings = asyncio.create_task(ping_latencies(app, end))
+    await asyncio.sleep(0)
+    start = time.perf_counter()
+    statuses = await asyncio.gather(*(request(app, 'POST', path) for _ in range(logins)))
+    end.set_result(time.perf_counter())
+    assert statuses == [200] * logins
+    return end.result() - start, await pings
+
+
+def percentile(values: list[float], p: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(p / 100 * len(values)))]
+
+
+def benchmark(app: FastAPI, path: str, logins: int, repeat: int) -> tuple[float, list[float]]:
+    times, latencies = 0.0, []
+    for _ in range(repeat):
+        elapsed, pings = asyncio.run(run_logins(app, path, logins))
+        times += elapsed
+        latencies += pings
+    return times / repeat, latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--logins', type=int, default=20)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    service = PasswordService(max_workers=args.workers)
+    app = create_app(service, utils.hash_psw(PASSWORD))
+    print(f'{"Verfahren":<28}{"Logins":>8}{"gesamt ms":>12}{"Pings":>8}{"Ping p50 ms":>13}{"Ping p99 ms":>13}')
+    for name, path in {'im Event-Loop': '/login-inline',
+                       f'password_service ({args.workers} Threads)': '/login-service'}.items():
+        elapsed, latencies = benchmark(app, path, args.logins, args.repeat)
+        print(f'{name:<28}{args.logins:>8}{elapsed * 1000:>12.1f}{len(latencies):>8}'
+              f'{percentile(latencies, 50) * 1000:>13.2f}{percentile(latencies, 99) * 1000:>13.2f}')
+    service.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,34 @@
+"""Intervall-Index der Planperioden eines Teams für die Zuordnung Datum -> Planperiode.
+
+Die Planperioden eines Teams überschneiden sich nicht (services.PlanPeriod.create_new_plan_period), nach Start
+sortiert findet bisect die Planperiode zu einem Datum in O(log n). Der Index wird von
+services.PlanPeriod.get_plan_period_index() aufgebaut und im metadata_cache gehalten."""
+import bisect
+from datetime import date
+from typing import NamedTuple
+from uuid import UUID
+
+
+class PlanPeriodInterval(NamedTuple):
+    start: date
+    end: date
+    id: UUID
+    deadline: date
+    notes: str | None
+    closed: bool
+
+
+class PlanPeriodIndex:
+    def __init__(self, intervals: list[PlanPeriodInterval]):
+        self.intervals = sorted(intervals, key=lambda interval: interval.start)
+        self._starts = [interval.start for interval in self.intervals]
+
+    def find(self, day: date) -> PlanPeriodInterval | None:
+        """Planperiode, die day enthält, oder None."""
+        i = bisect.bisect_right(self._starts, day) - 1
+        if i >= 0 and day <= self.intervals[i].end:
+            return self.intervals[i]
+        return None
+
+    def __len__(self):
+        return len(self.intervals)
@@ -0,0 +1,48 @@
+"""Remainder an die Actors am Tag der Deadline einer Planperiode.
+
+Ein periodischer Scheduler-Job (tick(), eingerichtet in main.scheduler_startup()) sammelt mit einer Abfrage die
+Planperioden aller Teams, deren Deadline heute ist, und bestimmt die Actors ohne Rückmeldung für alle diese
+Planperioden gemeinsam. Die Mails werden in einem Thread-Pool begrenzter Größe erzeugt. Je Planperiode werden der
+Eintrag in models.DeadlineReminder und die Mails im Spool in einer Transaktion angelegt, nach einem Neustart oder in
+einem zweiten Prozess werden deshalb keine Remainder doppelt verschickt. Den Versand übernehmen die Worker in
+utilities/mail_queue.py."""
+import datetime
+from concurrent.futures import ThreadPoolExecutor
+
+import pytz
+
+import settings
+from databases import schemas, services
+from utilities import mail_queue
+from utilities.send_mail import remainder_deadline_messages
+
+JOB_ID = 'deadline-reminders'
+TICK_MINUTES = settings.settings.reminder_tick_minutes
+WORKERS = settings.settings.reminder_workers
+TIMEZONE = pytz.timezone('Europe/Berlin')
+
+
+def tick(day: datetime.date | None = None) -> int:
+    """Verschickt die Remainder aller Planperioden mit Deadline day (Standard: heute in Europe/Berlin).
+    Gibt die Anzahl der Planperioden zurück, deren Remainder in diesem Durchlauf im Spool abgelegt wurden."""
+    day = day or datetime.datetime.now(TIMEZONE).date()
+    plan_periods = services.DeadlineReminder.get_due_plan_periods(day)
+    if not plan_periods:
+        return 0
+    recipients = services.Availables.get_not_feedbacked_availables_of_plan_periods([pp.id for pp in plan_periods])
+    with ThreadPoolExecutor(max_workers=WORKERS, thread_name_prefix='reminder') as executor:
+        completed = sum(executor.map(lambda pp: _send_reminders(pp, recipients[pp.id]), plan_periods))
+    if completed:
+        mail_queue.notify_new_mail()
+    print(f'Remainder zur Deadline {day}: {completed} von {len(plan_periods)} Planperioden', flush=True)
+    return completed
+
+
+def _send_reminders(plan_period: schemas.PlanPeriod, persons: list[schemas.Person]) -> bool:
+    msgs = remainder_deadline_messages(plan_period, persons)
+    try:
+        return services.DeadlineReminder.complete(plan_period.id, plan_period.deadline, len(persons), msgs)
+    except Exception as e:
+        # Ohne Eintrag in DeadlineReminder wird die Planperiode beim nächsten tick() erneut versucht.
+        print(f'Remainder für Planperiode {plan_period.id} nicht verschickt: {e}', flush=True)
+        return False
@@ -0,0 +1,34 @@
+"""Eine db_session pro Request für lesende Endpunkte."""
+import functools
+import inspect
+
+from fastapi.routing import APIRoute
+from pony.orm import db_session
+
+READ_METHODS = {'GET', 'HEAD'}
+
+
+def _in_db_session(endpoint):
+    @functools.wraps(endpoint)
+    def wrapper(*args, **kwargs):
+        with db_session:
+            return endpoint(*args, **kwargs)
+    return wrapper
+
+
+class DBSessionRoute(APIRoute):
+    """Synchrone GET-Endpunkte laufen vollständig in einer db_session. Die db_sessions der aufgerufenen
+    Services werden dadurch zu verschachtelten Sessions: Der Request nutzt eine Verbindung, eine Transaktion und
+    sieht einen konsistenten Stand der Daten.
+    Voraussetzung ist, dass GET- und HEAD-Endpunkte nichts schreiben; schreibende Endpunkte (z.B.
+    actors.send_new_password) müssen POST/PUT/DELETE verwenden. Sie behalten die Transaktionsgrenzen der Services,
+    damit Fehler beim Schreiben weiterhin im Service auftreten und vom Endpunkt behandelt werden können.
+    async-Endpunkte laufen im Event-Loop und können keine db_session über await hinweg halten: Dort öffnet jeder
+    Aufruf über databases/async_services.py eine eigene db_session im Thread-Pool (z.B. zwei in
+    admin.get_persons). Eine Session je Request gilt also nur für die synchronen GET-Endpunkte."""
+
+    def __init__(self, path: str, endpoint, **kwargs):
+        methods = set(kwargs.get('methods') or ['GET'])
+        if methods <= READ_METHODS and not inspect.iscoroutinefunction(endpoint):
+            endpoint = _in_db_session(endpoint)
+        super().__init__(path, endpoint, **kwargs)
@@ -1,8 +1,10 @@
 from apscheduler.schedulers.background import BackgroundScheduler
 import pytz
 
-# Konfiguration mit timezone
-scheduler = BackgroundScheduler({
+from utilities.jobstore import PonyJobStore
+
+# Konfiguration mit timezone, die Jobs werden über den PonyJobStore in der Datenbank gehalten
+scheduler = BackgroundScheduler(jobstores={'default': PonyJobStore()}, gconfig={
     'apscheduler.job_defaults.max_instances': 2,
     'apscheduler.job_defaults.misfire_grace_time': 1200,
     'apscheduler.timezone': pytz.timezone('Europe/Berlin')  # Zeitzone für den Scheduler
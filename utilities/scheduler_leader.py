@@ -0,0 +1,62 @@
+"""Leader-Election für den Scheduler über eine Lease-Zeile in der Datenbank (models.SchedulerLease).
+
+Der Scheduler läuft in jedem Prozess (uvicorn-Worker, Instanz), damit Jobs überall angelegt und geändert werden
+können. Ausgeführt werden die Jobs aber nur von dem Prozess, der die Lease hält; in allen anderen bleibt der
+Scheduler pausiert. Fällt der Leader aus, übernimmt ein anderer Prozess nach Ablauf der Lease."""
+import os
+import socket
+import threading
+from uuid import uuid4
+
+from apscheduler.schedulers.base import BaseScheduler
+
+import settings
+from databases import services
+
+LEASE_NAME = 'scheduler'
+LEASE_SECONDS = settings.settings.scheduler_lease_seconds
+HEARTBEAT_SECONDS = settings.settings.scheduler_heartbeat_seconds
+
+
+class SchedulerLeader(threading.Thread):
+    def __init__(self, scheduler: BaseScheduler, lease_seconds: float = LEASE_SECONDS,
+                 heartbeat_seconds: float = HEARTBEAT_SECONDS):
+        super().__init__(name='scheduler-leader', daemon=True)
+        self.scheduler = scheduler
+        self.lease_seconds = lease_seconds
+        self.heartbeat_seconds = heartbeat_seconds
+        self.owner = f'{socket.gethostname()}:{os.getpid()}:{uuid4().hex[:8]}'
+        self.is_leader = False
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.is_set():
+            try:
+                acquired = services.SchedulerLease.acquire(LEASE_NAME, self.owner, self.lease_seconds)
+            except Exception as e:
+                # Ohne erneuerte Lease darf dieser Prozess keine Jobs mehr ausführen.
+                print(f'scheduler lease could not be renewed: {e}', flush=True)
+                acquired = False
+            if acquired and not self.is_leader:
+                self.scheduler.resume()
+                print(f'scheduler leader: {self.owner}', flush=True)
+            elif not acquired and self.is_leader:
+                self.scheduler.pause()
+                print(f'scheduler leadership lost: {self.owner}', flush=True)
+            elif acquired:
+                # Jobs, die andere Prozesse angelegt oder verschoben haben, werden so zeitnah berücksichtigt.
+                self.scheduler.wakeup()
+            self.is_leader = acquired
+            self._stop_event.wait(self.heartbeat_seconds)
+
+    def stop(self):
+        """Gibt die Lease frei, damit ein anderer Prozess sofort übernehmen kann."""
+        self._stop_event.set()
+        self.join(self.heartbeat_seconds + 1)
+        if self.is_leader:
+            self.scheduler.pause()
+            self.is_leader = False
+            try:
+                services.SchedulerLease.release(LEASE_NAME, self.owner)
+            except Exception as e:
+                print(f'scheduler lease could not be released: {e}', flush=True)
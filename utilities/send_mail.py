@@ -1,40 +1,58 @@
-import asyncio
-from email.message import EmailMessage
-import smtplib
+import datetime
+from email.message import Message
 from uuid import UUID
 
 from databases import schemas
 import settings
-from databases import services
+from databases import services, async_services
+from utilities import mail_queue
+from utilities.mail_templates import MailTemplate
 
 SEND_ADDRESS = settings.settings.send_address
-SEND_PASSWORD = settings.settings.send_password
-POST_AUSG_SERVER = settings.settings.post_ausg_server
-SEND_PORT = settings.settings.send_port
+HOMEPAGE = 'https://hcc-plan-api.onrender.com/'
+TIME_OF_DAY_EXPLICIT = {'v': 'Vormittag', 'n': 'Nachmittag', 'g': 'Ganztag'}
 
+# Vorlagen in templates/mails, beim Import einmal kompiliert (utilities/mail_templates.py)
+NEW_PASSWORD = MailTemplate('new_password', 'Account bei "{{ project }}" Online-Planung')
+CONFIRMED_AVAIL_DAYS = MailTemplate('confirmed_avail_days', 'HHH-Planung - deine Spieloptionen')
+REMAINDER_DEADLINE = MailTemplate('remainder_deadline', 'Remainder: Abgabe deiner Spieloptionen')
+REMAINDER_CONFIRMATION = MailTemplate('remainder_confirmation', 'hcc Remainder verschickt')
+AVAIL_DAYS_TO_ACTOR = MailTemplate('avail_days_to_actor', 'Deine Spieloptionen: Planung von {{ period }}')
+ONLINE_AVAILABLES_TO_DISPATCHER = MailTemplate('online_availables_to_dispatcher',
+                                               'Abgegebene Termine für die Planperiode: {{ period }}, Team {{ team }}')
 
-def send_email(msg: EmailMessage):
-    with smtplib.SMTP(POST_AUSG_SERVER, SEND_PORT) as smtp:
-        smtp.ehlo()
-        smtp.starttls()
-        smtp.ehlo()
-        smtp.login(SEND_ADDRESS, SEND_PASSWORD)
-        smtp.send_message(msg)
 
+def _full_name(person: schemas.Person) -> str:
+    return f'{person.f_name} {person.l_name}'
+
+
+def _period(plan_period: schemas.PlanPeriod, date_format: str = '%d.%m.%y', separator: str = ' - ') -> str:
+    return f'{plan_period.start.strftime(date_format)}{separator}{plan_period.end.strftime(date_format)}'
+
+
+def _day_labels(plan_period: schemas.PlanPeriod, date_format: str) -> dict[datetime.date, str]:
+    """Formatierte Tage der Planperiode, einmal je Planperiode statt einmal je Empfänger und Tag."""
+    days = (plan_period.start + datetime.timedelta(days=i)
+            for i in range((plan_period.end - plan_period.start).days + 1))
+    return {day: day.strftime(date_format) for day in days}
+
+
+def send_emails(msgs: list[Message]):
+    """Legt die Mails gemeinsam im Spool ab. Verschickt werden sie von den Workern in utilities/mail_queue.py,
+    die einen Batch über eine gemeinsame SMTP-Verbindung versenden."""
+    if not msgs:
+        return
+    services.OutgoingMail.enqueue(msgs)
+    mail_queue.notify_new_mail()
 
-def send_new_password(person: schemas.Person, project: str, new_psw: str):
-    send_to = person.email
-    msg = EmailMessage()
-    msg['From'] = SEND_ADDRESS
-    msg['To'] = send_to
-    msg['Subject'] = f'Account bei "{project}" Online-Planung'
 
-    msg.set_content(f'Hallo {person.f_name} {person.l_name},\n\ndein neues Passwort für den Online-Zugang lautet:\n\n'
-                    f'{new_psw}\n'
-                    f'Du kannst dieses Passwort jederzeit unter "Einstellungen im Online-Portal" ändern.\n\n'
-                    f'Viele Grüße\nTeam hcc-plan')
+def send_email(msg: Message):
+    send_emails([msg])
 
-    send_email(msg)
+
+def send_new_password(person: schemas.Person, project: str, new_psw: str):
+    send_email(NEW_PASSWORD.render(person.email, {'name': _full_name(person), 'project': project,
+                                                  'password': new_psw}))
 
     return True
 
@@ -42,98 +60,46 @@ def send_new_password(person: schemas.Person, project: str, new_psw: str):
 async def send_confirmed_avail_days(person_id: UUID):
     """sendet alle zur Verfügung gestellten Tage der nicht geschlossenen Planperioden
     der betreffenden Person per E-Mail"""
-    person = services.Person.get_user_by_id(person_id)
-    plan_periods_et_filled_in = services.PlanPeriod.get_open_plan_periods(person_id)
-    text_avail_days = ''
-    for p in plan_periods_et_filled_in:
-        if not p.filled_in:
-            continue
-        text_avail_days += (f'Zeitraum {p.plan_period.start.strftime("%d.%m.%y")}-'
-                            f'{p.plan_period.end.strftime("%d.%m.%y")} '
-                            f'(Deadline: {p.plan_period.deadline.strftime("%d.%m.%y")}):\n')
-        avail_days = p.plan_period.avail_days(person_id)
-        avail_days = ', '.join(sorted([f'{d:%d.%m.}({time_of_day})' for d, time_of_day in avail_days.items()],
-                                      key=lambda d: d))
-        text_avail_days += f'{avail_days}'
-        notes_of_availables = p.plan_period.notes_of_availables(person_id) or 'Keine'
-        text_avail_days += f'\nAnmerkungen:\n{notes_of_availables}'
-        text_avail_days += '\n\n'
-    send_to = person.email
-    msg = EmailMessage()
-    msg['From'] = SEND_ADDRESS
-    msg['To'] = send_to
-    msg['Subject'] = 'HHH-Planung - deine Spieloptionen'
-    msg.set_content(
-        f'Hallo {person.f_name} {person.l_name},\n\n'
-        f'deine Spieloptionen wurden von https://hcc-plan-api.onrender.com/ erfolgreich übertragen.\n\n'
-        f'Das sind deine soeben übertragenen Tage, an denen du Visiten übernehmen kannst:\n\n'
-        f'Abkürzungen: g = ganztags, v = vormittags, n = nachmittags\n\n'
-        f'{text_avail_days}\n'
-        f'Du kannst deine Spieloptionen jederzeit bis zur beim jeweiligen Planungszeitraum angegebenen Deadline '
-        f'ändern oder ergänzen.\n\n'
-        f'Viele Grüsse\n'
-        f'{person.team_of_actor.dispatcher.f_name} {person.team_of_actor.dispatcher.l_name}\n'
-        f'(Spielplanung {person.project.name})\n\n'
-        f'--- Diese Email wurde automatisch generiert. Bitte nicht antworten. ---'
-    )
-
-    loop = asyncio.get_event_loop()
-    await loop.run_in_executor(None, send_email, msg)
-
-
-def send_remainder_confirmation(planperiod: schemas.PlanPeriod, persons: list[schemas.Person]):
-    text_empfaenger = ', '.join([f'{p.f_name} {p.l_name}' for p in persons])
-    send_to = planperiod.team.dispatcher.email
-    msg = EmailMessage()
-    msg['From'] = SEND_ADDRESS
-    msg['To'] = send_to
-    msg['Subject'] = 'hcc Remainder verschickt'
-    msg.set_content(
-        f'Hallo {planperiod.team.dispatcher.f_name} {planperiod.team.dispatcher.l_name},\n\n'
-        f'es wurden Remainder verschickt.\n'
-        f'Planungszeitraum: {planperiod.start.strftime("%d.%m.%y")} - {planperiod.end.strftime("%d.%m.%y")}\n'
-        f'Empfänger: {text_empfaenger}\n\n'
-        f'Team hcc-dispo\n\n'
-        f'--- Diese Email wurde automatisch generiert. Bitte nicht antworten. ---'
-    )
-
-    send_email(msg)
-
-
-def send_remainder_deadline(plan_period_id: str):
-    planperiod = services.PlanPeriod.get_planperiod(UUID(plan_period_id))
-    persons = services.Availables.get_not_feedbacked_availables(plan_period_id)
-    text_planperiod = f"Zeitraum: {planperiod.start.strftime('%d.%m.%y')} - {planperiod.end.strftime('%d.%m.%y')}"
-    for person in persons:
-        send_to = person.email
-        msg = EmailMessage()
-        msg['From'] = SEND_ADDRESS
-        msg['To'] = send_to
-        msg['Subject'] = 'Remainder: Abgabe deiner Spieloptionen'
-        msg.set_content(f'Hallo {person.f_name} {person.l_name},\n\n'
-                        f'heute ist die Deadline für die Abgabe deiner Spieloptionen.\n'
-                        f'Es sind noch keine Rückmeldungen über den Online-Planungsservice von {person.project.name} '
-                        f'für die folgende Planung eingegangen:\n\n'
-                        f'- {text_planperiod}.\n\n'
-                        f'Du solltest das noch heute erledigen, damit ich dich bei der Planung der '
-                        f'Einsätze berücksichtigen kann.\n'
-                        f'Homepage Planungsservice: https://hcc-plan-api.onrender.com/\n\n'
-                        f'{planperiod.team.dispatcher.f_name} {planperiod.team.dispatcher.l_name}\n'
-                        f'(Spielplanung {person.project.name})\n'
-                        f'--- Diese Email wurde automatisch generiert. Bitte nicht antworten. ---')
-
-        send_email(msg)
-
-    services.APSchedulerJob.delete_job_from_db(plan_period_id)
-    send_remainder_confirmation(planperiod, persons)
-    return True
+    person = await async_services.Person.get_user_by_id(person_id)
+    plan_periods = await async_services.PlanPeriod.get_open_plan_periods_of_actor(person_id)
+    context = {
+        'name': _full_name(person),
+        'homepage': HOMEPAGE,
+        'dispatcher': _full_name(person.team_of_actor.dispatcher),
+        'project': person.project.name,
+        'plan_periods': [{'start': p.start.strftime('%d.%m.%y'),
+                          'end': p.end.strftime('%d.%m.%y'),
+                          'deadline': p.deadline.strftime('%d.%m.%y'),
+                          'avail_days': [f'{d:%d.%m.}({time_of_day.value})' for d, times_of_day
+                                         in sorted(p.avail_days.items()) for time_of_day in times_of_day],
+                          'notes': p.notes_of_availables or 'Keine'}
+                         for p in plan_periods if p.filled_in]
+    }
+
+    await async_services.run_sync(send_email, CONFIRMED_AVAIL_DAYS.render(person.email, context))
+
+
+def remainder_deadline_messages(planperiod: schemas.PlanPeriod, persons: list[schemas.Person]) -> list[Message]:
+    """Remainder an die Actors, die zur Deadline der Planperiode noch keine Rückmeldung gegeben haben, und als
+    letzte Mail die Bestätigung an den Dispatcher. Verschickt werden die Mails von utilities/reminders.py."""
+    dispatcher = planperiod.team.dispatcher
+    shared = {'period': _period(planperiod), 'dispatcher': _full_name(dispatcher),
+              'project': dispatcher.project.name, 'homepage': HOMEPAGE}
+    msgs = REMAINDER_DEADLINE.render_batch(shared, [(p.email, {'name': _full_name(p)}) for p in persons])
+    msgs.append(REMAINDER_CONFIRMATION.render(dispatcher.email, shared | {
+        'recipients': [_full_name(p) for p in persons]}))
+    return msgs
 
 
 def send_avail_days_to_actors(plan_period_id: str):
     plan_period = services.PlanPeriod.get_planperiod(UUID(plan_period_id))
     persons = services.Person.get_persons__from_plan_period(UUID(plan_period_id))
-    time_of_day_explicit = {'v': 'Vormittag', 'n': 'Nachmittag', 'g': 'Ganztag'}
+    dispatcher = plan_period.team.dispatcher
+    day_labels = _day_labels(plan_period, '%d.%m.%Y')
+    shared = {'period': _period(plan_period, '%d.%m.%Y', '-'), 'dispatcher': _full_name(dispatcher),
+              'project': dispatcher.project.name}
     persons_with_availables: list[tuple[schemas.PersonShow, list[schemas.AvailDayShow]]] = []
+    recipients = []
     for person in persons:
         avail_days_from_service = services.AvailDay.get_avail_days__from_actor_planperiod(person.id,
                                                                                           UUID(plan_period_id))
@@ -141,29 +107,13 @@ def send_avail_days_to_actors(plan_period_id: str):
             continue
         avail_days = sorted(avail_days_from_service, key=lambda x: x.day)
         persons_with_availables.append((person, avail_days))
-        if avail_days:
-            avail_days_txt = '\n'.join([f'{ad.day.strftime("%d.%m.%Y")} ({time_of_day_explicit[ad.time_of_day.value]})'
-                                        for ad in avail_days])
-        else:
-            avail_days_txt = 'Keine Spieloptionen.'
-        send_to = person.email
-        msg = EmailMessage()
-        msg['From'] = SEND_ADDRESS
-        msg['To'] = send_to
-        msg['Subject'] = f'Deine Spieloptionen: Planung von ' \
-                         f'{plan_period.start.strftime("%d.%m.%Y")}-{plan_period.end.strftime("%d.%m.%Y")}'
-        msg.set_content(f'Hallo {person.f_name} {person.l_name},\n\n'
-                        f'für den im Betreff genannten Planungszeitraum können '
-                        f'keine Spieloptionen mehr abgegeben werden.\n'
-                        f'Du hast im Online-Portal folgende Tage/Zeiten angegeben, an denen du verfügbar bist:\n\n'
-                        f'{avail_days_txt}\n\n'
-                        f'{plan_period.team.dispatcher.f_name} {plan_period.team.dispatcher.l_name}\n'
-                        f'(Spielplanung {person.project.name})\n'
-                        f'--- Diese Email wurde automatisch generiert. Bitte nicht antworten. ---')
-
-        send_email(msg)
-
-    send_online_availables_to_dispatcher(persons_with_availables, plan_period, plan_period.team.dispatcher)
+        recipients.append((person.email, {
+            'name': _full_name(person),
+            'avail_days': [f'{day_labels[ad.day]} ({TIME_OF_DAY_EXPLICIT[ad.time_of_day.value]})'
+                           for ad in avail_days]}))
+
+    send_emails(AVAIL_DAYS_TO_ACTOR.render_batch(shared, recipients))
+    send_online_availables_to_dispatcher(persons_with_availables, plan_period, dispatcher)
 
     return True
 
@@ -171,15 +121,12 @@ def send_avail_days_to_actors(plan_period_id: str):
 def send_online_availables_to_dispatcher(persons_with_availables: list[tuple[schemas.PersonShow, list[schemas.AvailDayShow]]],
                                          plan_period: schemas.PlanPeriod, dispatcher: schemas.Person):
     """Die online abgegebenen Termine werden per E-Mail an den Dispatcher gesendet."""
-
-    text_content = '\n'.join([f'{p.f_name} {p.l_name}: {", ".join([av_d.day.strftime("%d.%m.") + f" ({av_d.time_of_day.value})" for av_d in av])}'
-                              for p, av in persons_with_availables])
-    msg = EmailMessage()
-    msg['From'] = SEND_ADDRESS
-    msg['To'] = dispatcher.email
-    msg['Subject'] = f'Abgegebene Termine für die Planperiode: ' \
-                     f'{plan_period.start.strftime("%d.%m.%Y")}-{plan_period.end.strftime("%d.%m.%Y")}, ' \
-                     f'Team {plan_period.team.name}'
-    msg.set_content(f'{text_content}')
-
-    send_email(msg)
+    day_labels = _day_labels(plan_period, '%d.%m.')
+    context = {
+        'period': _period(plan_period, '%d.%m.%Y', '-'),
+        'team': plan_period.team.name,
+        'persons': [(_full_name(p), [f'{day_labels[av_d.day]} ({av_d.time_of_day.value})' for av_d in av])
+                    for p, av in persons_with_availables]
+    }
+
+    send_email(ONLINE_AVAILABLES_TO_DISPATCHER.render(dispatcher.email, context))
@@ -0,0 +1,116 @@
+"""Pool authentifizierter SMTP-Verbindungen, die zwischen den Versandvorgängen offen gehalten werden.
+
+Eine Verbindung, die länger als NOOP_AFTER_SECONDS unbenutzt war, wird vor der Wiederverwendung mit NOOP geprüft.
+Hat der Server sie inzwischen geschlossen, wird beim nächsten Versand neu verbunden."""
+import queue
+import smtplib
+import ssl
+import time
+from contextlib import contextmanager
+from email.message import EmailMessage
+
+import settings
+
+SEND_ADDRESS = settings.settings.send_address
+SEND_PASSWORD = settings.settings.send_password
+POST_AUSG_SERVER = settings.settings.post_ausg_server
+SEND_PORT = settings.settings.send_port
+
+POOL_SIZE = settings.settings.smtp_pool_size
+NOOP_AFTER_SECONDS = settings.settings.smtp_noop_after_seconds
+STARTTLS = settings.settings.smtp_starttls
+
+
+class SMTPSession:
+    """Authentifizierte SMTP-Verbindung, die für beliebig viele Nachrichten wiederverwendet wird."""
+
+    def __init__(self):
+        self._smtp: smtplib.SMTP | None = None
+        self.last_used = time.monotonic()
+
+    @property
+    def connected(self) -> bool:
+        return self._smtp is not None
+
+    def _connect(self):
+        """Mit STARTTLS (Standard) muss der Server STARTTLS anbieten, sonst wird abgebrochen. Eingeloggt wird nur
+        über die verschlüsselte Verbindung."""
+        self.close()
+        smtp = smtplib.SMTP(POST_AUSG_SERVER, SEND_PORT)
+        try:
+            smtp.ehlo()
+            if STARTTLS:
+                if not smtp.has_extn('starttls'):
+                    raise smtplib.SMTPNotSupportedError(f'{POST_AUSG_SERVER} bietet kein STARTTLS an.')
+                smtp.starttls(context=ssl.create_default_context())
+                smtp.ehlo()
+                smtp.login(SEND_ADDRESS, SEND_PASSWORD)
+        except Exception:
+            smtp.close()
+            raise
+        self._smtp = smtp
+
+    def is_alive(self) -> bool:
+        try:
+            return self._smtp.noop()[0] == 250
+        except (smtplib.SMTPException, OSError):
+            return False
+
+    def send(self, msg: EmailMessage):
+        if self._smtp is None:
+            self._connect()
+        try:
+            self._smtp.send_message(msg)
+        except smtplib.SMTPServerDisconnected:
+            # Der Server hat die Verbindung zwischenzeitlich geschlossen.
+            self._connect()
+            self._smtp.send_message(msg)
+
+    def close(self):
+        if self._smtp is None:
+            return
+        try:
+            self._smtp.quit()
+        except (smtplib.SMTPException, OSError):
+            pass
+        self._smtp = None
+
+
+class SMTPConnectionPool:
+    def __init__(self, size: int = POOL_SIZE, noop_after_seconds: float = NOOP_AFTER_SECONDS):
+        self.noop_after_seconds = noop_after_seconds
+        # LIFO, damit bevorzugt die zuletzt benutzte (noch offene) Verbindung wiederverwendet wird.
+        self._sessions: queue.LifoQueue[SMTPSession] = queue.LifoQueue(maxsize=size)
+        for _ in range(size):
+            self._sessions.put(SMTPSession())
+
+    @contextmanager
+    def session(self, timeout: float | None = None):
+        """Leiht eine Verbindung aus dem Pool aus. Alle Nachrichten eines Batches sollten über dieselbe Session
+        verschickt werden."""
+        session = self._sessions.get(timeout=timeout)
+        try:
+            if (session.connected and time.monotonic() - session.last_used > self.noop_after_seconds
+                    and not session.is_alive()):
+                session.close()
+            yield session
+        except Exception:
+            session.close()
+            raise
+        finally:
+            session.last_used = time.monotonic()
+            self._sessions.put(session)
+
+    def close_all(self):
+        sessions = []
+        while True:
+            try:
+                sessions.append(self._sessions.get_nowait())
+            except queue.Empty:
+                break
+        for session in sessions:
+            session.close()
+            self._sessions.put(session)
+
+
+pool = SMTPConnectionPool()
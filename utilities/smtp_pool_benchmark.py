@@ -0,0 +1,120 @@
+"""Misst den Versand vieler Mails über eine Verbindung aus utilities/smtp_pool.py gegenüber einer neuen
+SMTP-Verbindung je Mail. Verschickt wird an einen lokalen SMTP-Server ohne TLS und Login, der jede Antwort um
+--latency Millisekunden verzögert (Round-Trip zum Mailserver).
+
+Aufruf: python -m utilities.smtp_pool_benchmark [--mails N] [--latency MS] [--repeat N]"""
+import argparse
+import socketserver
+import threading
+import time
+from email.message import EmailMessage
+
+from utilities import smtp_pool
+
+
+class BenchmarkSMTPHandler(socketserver.StreamRequestHandler):
+    """Minimaler SMTP-Server: nimmt jede Mail an und merkt sich Empfänger und Inhalt in server.messages."""
+
+    def reply(self, line: str):
+        time.sleep(self.server.latency)
+        self.wfile.write(f'{line}\r\n'.encode())
+
+    def handle(self):
+        self.server.connections += 1
+        self.reply('220 benchmark ESMTP')
+        recipients = []
+        while line := self.rfile.readline():
+            command = line[:4].upper()
+            if command == b'EHLO':
+                self.reply('250-benchmark\r\n250 8BITMIME')
+            elif command == b'DATA':
+                self.reply('354 End data with <CR><LF>.<CR><LF>')
+                lines = []
+                while (data := self.rfile.readline()) and data != b'.\r\n':
+                    lines.append(data)
+                self.server.messages.append((recipients, b''.join(lines)))
+                recipients = []
+                self.reply('250 OK')
+            elif command == b'QUIT':
+                self.reply('221 Bye')
+                break
+            elif command == b'RCPT':
+                recipients.append(line[8:].strip(b' <>\r\n').decode())
+                self.reply('250 OK')
+            elif command in (b'HELO', b'MAIL', b'RSET', b'NOOP'):
+                self.reply('250 OK')
+            else:
+                self.reply('502 Command not implemented')
+
+
+class BenchmarkSMTPServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, latency: float):
+        super().__init__(('127.0.0.1', 0), BenchmarkSMTPHandler)
+        self.latency = latency
+        self.connections = 0
+        self.messages: list[tuple[list[str], bytes]] = []
+
+
+def messages(count: int) -> list[EmailMessage]:
+    msgs = []
+    for i in range(count):
+        msg = EmailMessage()
+        msg['From'] = 'hcc-plan@example.com'
+        msg['To'] = f'actor{i}@example.com'
+        msg['Subject'] = 'Benchmark'
+        msg.set_content('Hallo,\n\ndies ist eine Test-Mail.\n')
+        msgs.append(msg)
+    return msgs
+
+
+def send_pooled(msgs: list[EmailMessage]):
+    """Wie mail_queue.MailWorker: alle Mails eines Batches über eine Session des Pools."""
+    pool = smtp_pool.SMTPConnectionPool(size=1)
+    with pool.session() as session:
+        for msg in msgs:
+            session.send(msg)
+    pool.close_all()
+
+
+def send_connection_per_mail(msgs: list[EmailMessage]):
+    for msg in msgs:
+        session = smtp_pool.SMTPSession()
+        session.send(msg)
+        session.close()
+
+
+def benchmark(func, msgs: list[EmailMessage], server: BenchmarkSMTPServer, repeat: int) -> tuple[float, int]:
+    server.connections = 0
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func(msgs)
+    return (time.perf_counter() - start) / repeat, server.connections // repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--mails', type=int, default=200)
+    parser.add_argument('--latency', type=float, default=2.0)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    server = BenchmarkSMTPServer(args.latency / 1000)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    smtp_pool.POST_AUSG_SERVER, smtp_pool.SEND_PORT = server.server_address
+    smtp_pool.STARTTLS = False
+    msgs = messages(args.mails)
+
+    print(f'{"Verfahren":<26}{"Mails":>8}{"Verbindungen":>14}{"gesamt ms":>12}{"je Mail ms":>12}')
+    for name, func in {'Pool (eine Session)': send_pooled,
+                       'Verbindung je Mail': send_connection_per_mail}.items():
+        elapsed, connections = benchmark(func, msgs, server, args.repeat)
+        print(f'{name:<26}{args.mails:>8}{connections:>14}{elapsed * 1000:>12.1f}'
+              f'{elapsed / args.mails * 1000:>12.2f}')
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
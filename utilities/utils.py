@@ -4,8 +4,31 @@ import secrets
 
 from passlib.context import CryptContext
 
+import settings
 
-pwd_context = CryptContext(schemes=['bcrypt'], deprecated='auto')
+
+def create_pwd_context(scheme: str, bcrypt_rounds: int, argon2_memory_cost: int, argon2_time_cost: int,
+                       argon2_parallelism: int) -> CryptContext:
+    """Neue Hashes werden mit 'scheme' ('bcrypt' oder 'argon2') und den angegebenen Kosten erzeugt.
+    Hashes des anderen Verfahrens oder mit geringeren Kosten gelten als veraltet und werden bei erfolgreicher
+    Prüfung durch verify_and_update() ersetzt. Für argon2 muss argon2-cffi installiert sein."""
+    if scheme not in ('bcrypt', 'argon2'):
+        raise ValueError(f'Unbekanntes Hash-Verfahren: {scheme}')
+    schemes = ['argon2', 'bcrypt'] if scheme == 'argon2' else ['bcrypt', 'argon2']
+    context = CryptContext(schemes=schemes, default=scheme, deprecated='auto',
+                           bcrypt__rounds=bcrypt_rounds, bcrypt__min_rounds=bcrypt_rounds,
+                           argon2__type='ID', argon2__memory_cost=argon2_memory_cost,
+                           argon2__time_cost=argon2_time_cost, argon2__parallelism=argon2_parallelism)
+    if scheme == 'argon2' and not context.handler('argon2').has_backend():
+        raise RuntimeError('Für password_hash_scheme="argon2" muss argon2-cffi installiert sein.')
+    return context
+
+
+pwd_context = create_pwd_context(scheme=settings.settings.password_hash_scheme,
+                                 bcrypt_rounds=settings.settings.bcrypt_rounds,
+                                 argon2_memory_cost=settings.settings.argon2_memory_cost,
+                                 argon2_time_cost=settings.settings.argon2_time_cost,
+                                 argon2_parallelism=settings.settings.argon2_parallelism)
 
 
 def generate_secure_password(length: int = 12):
@@ -45,6 +68,11 @@ def verify(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
 
+def verify_and_update(plain_password: str, hashed_password: str) -> tuple[bool, str | None]:
+    """Gibt zusätzlich einen neuen Hash zurück, falls der gespeicherte nicht mehr der Hash-Policy entspricht."""
+    return pwd_context.verify_and_update(plain_password, hashed_password)
+
+
 def all_days_between_dates(date_start: datetime.date, date_end: datetime.date):
     delta: datetime.timedelta = date_start - date_end
     all_days: list[datetime.date] = []